@@ -0,0 +1,205 @@
+"""Streaming batch evaluator.
+
+Reads one expression per line from a file or stdin and writes
+``expression,result`` CSV rows as it goes; input is never loaded into memory
+as a whole. Chunks of lines are evaluated in child processes (``--workers N``
+of them) while output keeps input order.
+
+    python batch.py formulas.txt --workers 8 > results.csv
+    cat formulas.txt | python calc.py --batch -
+
+Rows get the same budgets as the display (see ``worker``): a row that runs
+longer than EVALUATION_TIMEOUT has its process killed and replaced, and
+integers beyond MAX_RESULT_DIGITS are written as a summary. A child sends
+its results back in groups; when one goes quiet for the whole budget it is
+restarted with one reply per row to find the row that stalled, which is
+then marked and skipped.
+
+Failed rows carry the same text ``calculate`` shows on the display:
+"Cannot divide by zero", "Timed out", "Result too large" or "Error".
+"""
+import argparse
+import csv
+import multiprocessing
+import sys
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+import engine
+import precision
+import worker
+
+DEFAULT_CHUNK_SIZE = 2000
+RESULT_BATCH = 256  # rows per reply from a child
+FLUSH_S = 0.05  # a child replies at least this often while making progress
+
+TIMED_OUT = "Timed out"
+TOO_LARGE = "Result too large"
+
+# Button labels as shown on the display -> the operators they insert
+_DISPLAY_SYMBOLS = str.maketrans({"×": "*", "÷": "/", "−": "-", "π": "pi"})
+
+
+def evaluate_line(expression, angle_mode="DEG", max_digits=worker.MAX_RESULT_DIGITS):
+    """Result text for one row. Runs in-process, without a time budget."""
+    try:
+        value = engine.format_result(engine.evaluate(expression.translate(_DISPLAY_SYMBOLS), angle_mode))
+        if isinstance(value, int) and not isinstance(value, bool):
+            if value.bit_length() > worker.MAX_RESULT_BITS:
+                return TOO_LARGE
+            value = precision.render(value, max_digits)
+            if isinstance(value, int):
+                return precision.full_digits(value)  # Past the 4300-digit str() limit
+        return str(value)
+    except ZeroDivisionError:
+        return "Cannot divide by zero"
+    except Exception:
+        return "Error"
+
+
+def _serve_rows(conn, angle_mode):
+    while True:
+        try:
+            rows, batch_size = conn.recv()
+        except EOFError:
+            return
+        done, flushed = [], time.monotonic()
+        for expression in rows:
+            done.append(evaluate_line(expression, angle_mode))
+            if len(done) >= batch_size or time.monotonic() - flushed >= FLUSH_S:
+                conn.send(done)
+                done, flushed = [], time.monotonic()
+        if done:
+            conn.send(done)
+
+
+class _RowRunner:
+    """One child process evaluating chunks of rows under a per-row budget."""
+
+    def __init__(self, angle_mode, timeout):
+        self.angle_mode = angle_mode
+        self.timeout = timeout
+        self._process = None
+        self._conn = None
+
+    def evaluate(self, chunk):
+        results, batch_size = [], RESULT_BATCH
+        while len(results) < len(chunk):
+            self._ensure_process()
+            self._conn.send((chunk[len(results):], batch_size))
+            try:
+                while len(results) < len(chunk):
+                    if not self._conn.poll(self.timeout):
+                        raise TimeoutError
+                    results.extend(self._conn.recv())
+            except (TimeoutError, EOFError, OSError) as exc:
+                # Stalled, or the process died (e.g. out of memory)
+                self.close()
+                if batch_size == 1:
+                    results.append(TIMED_OUT if isinstance(exc, TimeoutError) else "Error")
+                    batch_size = RESULT_BATCH
+                else:
+                    batch_size = 1
+        return results
+
+    def _ensure_process(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        parent_conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve_rows, args=(child_conn, self.angle_mode), daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+    def close(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(timeout=1)
+            self._process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _chunks(lines, chunk_size):
+    expressions = (line.strip() for line in lines)
+    expressions = (expression for expression in expressions if expression)
+    while True:
+        chunk = list(islice(expressions, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_results(lines, angle_mode="DEG", workers=1, chunk_size=DEFAULT_CHUNK_SIZE,
+                 timeout=worker.EVALUATION_TIMEOUT):
+    """Yield (expression, result) pairs in input order.
+
+    ``lines`` is any iterable of strings and is consumed lazily. With
+    ``workers > 1`` at most ``2 * workers`` chunks are in flight at once, so
+    memory stays bounded regardless of input size. ``timeout`` is the
+    budget per row, in seconds.
+    """
+    runners = []
+    local = threading.local()
+
+    def evaluate(chunk):
+        # One child per thread; threads only wait on their pipes
+        runner = getattr(local, "runner", None)
+        if runner is None:
+            runner = local.runner = _RowRunner(angle_mode, timeout)
+            runners.append(runner)
+        return list(zip(chunk, runner.evaluate(chunk)))
+
+    try:
+        if workers <= 1:
+            for chunk in _chunks(lines, chunk_size):
+                yield from evaluate(chunk)
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in _chunks(lines, chunk_size):
+                pending.append(pool.submit(evaluate, chunk))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    finally:
+        for runner in runners:
+            runner.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate calculator expressions line by line.")
+    parser.add_argument("input", nargs="?", default="-", help="expression file, '-' for stdin")
+    parser.add_argument("-o", "--output", default="-", help="CSV output file, '-' for stdout")
+    parser.add_argument("--angle-mode", choices=engine.ANGLE_MODES, default="DEG")
+    parser.add_argument("--workers", type=int, default=1, help="process pool size")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--timeout", type=float, default=worker.EVALUATION_TIMEOUT,
+                        help="seconds allowed per row")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        writer = csv.writer(target)
+        for row in iter_results(source, args.angle_mode, args.workers, args.chunk_size, args.timeout):
+            writer.writerow(row)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Function evaluations per second inside the calculus toolkit.
+
+Compares three ways of evaluating a Scientific expression in x many times:
+substituting x into the string and calling engine.evaluate (the path a
+naive solver on the display string would take), the compiled scalar
+function calculus.compile_scalar, and the compiled batch function
+calculus.compile_vectorized. Then times solve, integrate and derivative.
+Exits with status 1 when the compiled scalar path is not at least
+MIN_SPEEDUP times faster than string substitution.
+
+Run from the repository root:  python benchmarks/bench_calculus.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import calculus
+import engine
+
+EXPRESSION = "sin(x)*x**2 - sqrt(x+10)/3 + log(x**2+1)"
+POINTS = 20000
+MIN_SPEEDUP = 5
+
+
+def rate(function, count):
+    start = time.perf_counter()
+    function()
+    return count / (time.perf_counter() - start)
+
+
+def substituted():
+    for x in np.linspace(-5, 5, POINTS).tolist():
+        # A new string per point: parsed and compiled every time
+        engine.evaluate(EXPRESSION.replace("x", f"({x!r})"), "RAD")
+
+
+def compiled_scalar():
+    f = calculus.compile_scalar(EXPRESSION, "RAD")
+    for x in np.linspace(-5, 5, POINTS).tolist():
+        f(x)
+
+
+def compiled_batch():
+    calculus.compile_vectorized(EXPRESSION, "RAD")(np.linspace(-5, 5, POINTS))
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<24} {elapsed:8.2f} ms   {result.evaluations:>7,} evaluations")
+
+
+def main():
+    calculus.compile_scalar(EXPRESSION, "RAD")
+    calculus.compile_vectorized(EXPRESSION, "RAD")
+    rates = {
+        "string substitution": rate(substituted, POINTS),
+        "compiled scalar": rate(compiled_scalar, POINTS),
+        "compiled batch": rate(compiled_batch, POINTS),
+    }
+    for name, value in rates.items():
+        print(f"{name:<24} {value:14,.0f} evaluations/s")
+
+    timed("solve [-100, 100]", lambda: calculus.solve(EXPRESSION, -100, 100, "RAD"))
+    timed("integrate [-10, 10]", lambda: calculus.integrate(EXPRESSION, -10, 10, "RAD"))
+    timed("derivative at 1.5", lambda: calculus.derivative(EXPRESSION, 1.5, angle_mode="RAD"))
+
+    speedup = rates["compiled scalar"] / rates["string substitution"]
+    print(f"compiled scalar speedup {speedup:.1f}x (minimum {MIN_SPEEDUP}x)")
+    if speedup < MIN_SPEEDUP:
+        print("FAIL: below minimum speedup")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
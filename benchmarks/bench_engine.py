@@ -0,0 +1,54 @@
+"""Expressions per second: legacy string-rewrite + eval() vs. the cached engine.
+
+Run from the repository root:  python benchmarks/bench_engine.py
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+
+EXPRESSIONS = [
+    "7+8*9-4/2",
+    "math.sin(30)+math.cos(60",
+    "math.sqrt(2)**2*math.pi",
+    "(1+2)*(3+4)/(5-6)",
+    "math.log10(1000)+math.log(math.e)",
+    "2**10 % 7",
+]
+
+
+def legacy_calculate(expression, angle_mode="DEG"):
+    # Copy of the pre-engine AdvancedCalculator.calculate evaluation path
+    if angle_mode in ("DEG", "GRAD"):
+        expression = expression.replace("math.sin(", "math.sin(math.radians(")
+        expression = expression.replace("math.cos(", "math.cos(math.radians(")
+        expression = expression.replace("math.tan(", "math.tan(math.radians(")
+    missing_parens = expression.count("(") - expression.count(")")
+    expression += ")" * missing_parens
+    return eval(expression)
+
+
+def run(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for expression in EXPRESSIONS:
+            func(expression, "DEG")
+    elapsed = time.perf_counter() - start
+    return rounds * len(EXPRESSIONS) / elapsed
+
+
+def main(rounds=20000):
+    legacy = run(legacy_calculate, rounds)
+    engine.clear_cache()
+    cached = run(engine.evaluate, rounds)
+    print(f"legacy eval():  {legacy:12,.0f} expr/s")
+    print(f"engine (LRU):   {cached:12,.0f} expr/s  ({cached / legacy:.1f}x)")
+    print(f"cache: {engine.cache_info()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
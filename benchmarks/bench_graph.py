@@ -0,0 +1,74 @@
+"""Frame time of Graph mode pan and zoom.
+
+Plots several curves over a 2,000,000-unit range on an 800 px wide view,
+then pans and zooms step by step the way mouse drags and wheel ticks do,
+timing graphing.Graph.frame (sampling, refinement and decimation) for each
+frame. The first frame, which samples every visible tile, is reported
+separately, and so is the number of frames that drew some tiles from a
+neighbouring zoom level to stay within graphing.SAMPLE_BUDGET_MS. Exits with status 1 when the p99 pan/zoom frame time exceeds
+graphing.FRAME_BUDGET_MS.
+
+Run from the repository root:  python benchmarks/bench_graph.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graphing import FRAME_BUDGET_MS, ZOOM_STEP, Graph
+
+EXPRESSIONS = ["sin(x)", "tan(x)/100", "sqrt(x)*cos(x)", "1/x", "log(x**2+1)"]
+WIDTH, HEIGHT = 800, 600
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def timed_frame(graph, deferred=None):
+    start = time.perf_counter()
+    graph.frame(WIDTH, HEIGHT)
+    elapsed = (time.perf_counter() - start) * 1000
+    if deferred is not None and not graph.complete:
+        deferred.append(elapsed)
+    return elapsed
+
+
+def main():
+    graph = Graph(EXPRESSIONS, "RAD", x_range=(-1e6, 1e6))
+    first = timed_frame(graph)
+
+    pans, deferred = [], []
+    for _ in range(120):
+        graph.pan(-15, 0, WIDTH, HEIGHT)
+        pans.append(timed_frame(graph, deferred))
+
+    zooms = []
+    for step in range(60):
+        # In for 30 wheel ticks, then back out
+        factor = 1 / ZOOM_STEP if step < 30 else ZOOM_STEP
+        graph.zoom(factor, WIDTH / 2, HEIGHT / 2, WIDTH, HEIGHT)
+        zooms.append(timed_frame(graph, deferred))
+
+    print(f"{len(EXPRESSIONS)} curves, first frame {first:.1f} ms")
+    for name, samples in (("pan", pans), ("zoom", zooms)):
+        print(f"{name:<5} median {statistics.median(samples):.2f} ms   "
+              f"p99 {percentile(samples, 0.99):.2f} ms   max {max(samples):.2f} ms")
+    tiles = sum(curve.cache_info()["tiles"] for curve in graph.curves)
+    evaluations = sum(curve.cache_info()["evaluations"] for curve in graph.curves)
+    print(f"cached tiles {tiles:,}, points evaluated {evaluations:,}")
+    print(f"frames with tiles from a neighbouring level {len(deferred)} of {len(pans) + len(zooms)}")
+
+    p99 = percentile(pans + zooms, 0.99)
+    print(f"budget {FRAME_BUDGET_MS} ms per frame")
+    if p99 > FRAME_BUDGET_MS:
+        print("FAIL: over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""History append and search at scale.
+
+Appends N entries (default 1,000,000) through HistoryStore with a log file in
+a temporary directory, then times substring/prefix searches and reloading
+the log. Then times the history drawer's HistoryView: typing a filter one
+character at a time, reading a screen of rows, and taking in appends.
+
+Run from the repository root:  python benchmarks/bench_history.py [entries]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import HistoryStore, HistoryView
+
+SCREEN_ROWS = 20
+TYPED_QUERY = "sqrt(12"
+QUERIES = ["12345", "sqrt(", "*7", "42", "math.sqrt(3", "9999"]
+
+
+def make_entries(count, seed=1):
+    rng = random.Random(seed)
+    ops = ["+", "-", "*", "/"]
+    for i in range(count):
+        a, b = rng.randint(0, 99999), rng.randint(1, 999)
+        if i % 5 == 0:
+            yield f"math.sqrt({a})*{b}", f"{(a ** 0.5) * b:g}"
+        else:
+            op = rng.choice(ops)
+            yield f"{a}{op}{b}", str(eval(f"{a}{op}{b}"))
+
+
+def main(count=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.jsonl")
+        store = HistoryStore(path)
+        entries = list(make_entries(count))
+
+        start = time.perf_counter()
+        for expression, result in entries:
+            store.append(expression, result)
+        elapsed = time.perf_counter() - start
+        print(f"append:  {count:,} entries in {elapsed:.2f} s ({count / elapsed:,.0f}/s)")
+
+        start = time.perf_counter()
+        store.close()
+        print(f"final flush: {time.perf_counter() - start:.2f} s, "
+              f"log size {os.path.getsize(path) / 1e6:.1f} MB")
+
+        for query in QUERIES:
+            start = time.perf_counter()
+            matches = store.search(query, limit=100)
+            print(f"search {query!r:>14}: {len(matches):3d} hits in "
+                  f"{(time.perf_counter() - start) * 1000:7.2f} ms")
+
+        start = time.perf_counter()
+        reloaded = HistoryStore(path)
+        reloaded.load()
+        print(f"reload:  {len(reloaded):,} entries in {time.perf_counter() - start:.2f} s")
+
+        bench_view(reloaded)
+        reloaded.close()
+
+
+def bench_view(store):
+    view = HistoryView(store)
+    for i in range(1, len(TYPED_QUERY) + 1):
+        start = time.perf_counter()
+        view.set_query(TYPED_QUERY[:i])
+        print(f"filter {TYPED_QUERY[:i]!r:>14}: {len(view):9,} rows in "
+              f"{(time.perf_counter() - start) * 1000:7.2f} ms")
+
+    tracemalloc.start()
+    view = HistoryView(store)
+    for i in range(1, len(TYPED_QUERY) + 1):
+        view.set_query(TYPED_QUERY[:i])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"view memory peak while filtering: {peak / 1e6:.1f} MB")
+
+    start = time.perf_counter()
+    for top in range(0, len(view), max(1, len(view) // 100)):
+        [view[row] for row in range(top, min(top + SCREEN_ROWS, len(view)))]
+    print(f"screen of {SCREEN_ROWS} rows: {(time.perf_counter() - start) * 10:.3f} ms")
+
+    view.set_query("")
+    appends = 10000
+    start = time.perf_counter()
+    for i in range(appends):
+        store.append(f"math.sqrt({i})", str(i ** 0.5))
+        view.sync()
+    print(f"append + sync: {(time.perf_counter() - start) / appends * 1e6:.1f} us each, "
+          f"{len(view):,} rows")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
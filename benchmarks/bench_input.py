@@ -0,0 +1,62 @@
+"""Redraw count and latency for pasted and fast-typed input.
+
+Pastes a 10 KB expression through the clipboard path and replays a burst of
+2,000 key events, then reports how many display refreshes each caused and
+how long it took until the display settled. Needs a display; on a headless
+box run it under a virtual X server:
+
+    xvfb-run python benchmarks/bench_input.py
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calc import FRAME_MS, AdvancedCalculator
+
+TERM = "math.sqrt(16)*2+"
+
+
+def settle(calculator):
+    # Run the event loop until the coalesced refresh has happened
+    while calculator.display_pending:
+        calculator.window.update()
+        time.sleep(FRAME_MS / 4000)
+    calculator.window.update()
+
+
+def measure(calculator, action):
+    calculator.clear()
+    settle(calculator)
+    before = calculator.redraw_count
+    start = time.perf_counter()
+    action()
+    settle(calculator)
+    return calculator.redraw_count - before, (time.perf_counter() - start) * 1000
+
+
+def main():
+    calculator = AdvancedCalculator()
+    calculator.window.update()
+
+    text = (TERM * (10240 // len(TERM) + 1))[:10240]
+    calculator.window.clipboard_clear()
+    calculator.window.clipboard_append(text)
+    redraws, elapsed = measure(calculator, calculator.paste)
+    print(f"paste {len(text):,} chars:     {redraws} redraw(s), {elapsed:7.2f} ms to settle")
+
+    def burst():
+        # Key events as Tk would deliver them to the window binding
+        for ch in (TERM * 200)[:2000]:
+            calculator.on_key(SimpleNamespace(char=ch, keysym=ch, state=0, widget=calculator.window))
+    redraws, elapsed = measure(calculator, burst)
+    print(f"burst of 2,000 keys:   {redraws} redraw(s), {elapsed:7.2f} ms to settle")
+
+    calculator.worker.close()
+    calculator.window.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Cost of the instrumentation wrapper.
+
+Times a trivial method called directly, through ``instrumentation.timed``
+with instrumentation disabled (the default), and enabled.
+
+Run from the repository root:  python benchmarks/bench_instrumentation.py [calls]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrumentation
+
+
+class Target:
+    def plain(self, value):
+        return value + 1
+
+    @instrumentation.timed
+    def wrapped(self, value):
+        return value + 1
+
+
+def per_call_ns(method, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        method(i)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main(calls=1_000_000):
+    target = Target()
+    instrumentation.disable()
+    plain = per_call_ns(target.plain, calls)
+    disabled = per_call_ns(target.wrapped, calls)
+    instrumentation.enable()
+    enabled = per_call_ns(target.wrapped, calls)
+    instrumentation.disable()
+
+    print(f"plain call                {plain:7.1f} ns")
+    print(f"timed, disabled           {disabled:7.1f} ns   (+{disabled - plain:.1f} ns)")
+    print(f"timed, enabled            {enabled:7.1f} ns   (+{enabled - plain:.1f} ns)")
+    print(instrumentation.format_report())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
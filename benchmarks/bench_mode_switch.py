@@ -0,0 +1,72 @@
+"""Mode switch and angle/base toggle latency.
+
+Compares the cached-panel switch_mode against the old behaviour of
+destroying and rebuilding the whole button panel on every switch (emulated
+by dropping the panel cache before each switch). Needs a display; on a
+headless box run it under a virtual X server:
+
+    xvfb-run python benchmarks/bench_mode_switch.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calc import AdvancedCalculator
+
+MODES = ["Standard", "Scientific", "Programming", "Date", "Converter", "Graph", "Statistics", "Matrix", "Calculus", "Worksheet"]
+
+
+def drop_panels(calculator):
+    for panel in calculator.panels.values():
+        panel.destroy()
+    calculator.panels.clear()
+    calculator.active_panel = None
+
+
+def timed(calculator, action, rounds):
+    samples = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        action(i)
+        calculator.window.update()  # include layout and paint
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def report(name, result):
+    median, worst = result
+    print(f"{name:<28} median {median:7.2f} ms   max {worst:7.2f} ms")
+
+
+def main(rounds=50):
+    calculator = AdvancedCalculator()
+    calculator.window.update()
+
+    def rebuild_switch(i):
+        drop_panels(calculator)
+        calculator.switch_mode(MODES[i % len(MODES)])
+
+    report("switch_mode (rebuild)", timed(calculator, rebuild_switch, rounds))
+
+    for mode in MODES:  # warm the panel cache
+        calculator.switch_mode(mode)
+    report("switch_mode (cached)",
+           timed(calculator, lambda i: calculator.switch_mode(MODES[i % len(MODES)]), rounds))
+
+    calculator.switch_mode("Scientific")
+    report("set_angle_mode",
+           timed(calculator, lambda i: calculator.set_angle_mode(("DEG", "RAD", "GRAD")[i % 3]), rounds))
+
+    calculator.switch_mode("Programming")
+    report("set_base_mode",
+           timed(calculator, lambda i: calculator.set_base_mode(("DEC", "HEX", "OCT", "BIN")[i % 4]), rounds))
+
+    calculator.worker.close()
+    calculator.window.destroy()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,85 @@
+"""Per-keystroke latency of the live preview.
+
+Types a ~1,000-character Scientific expression one character at a time
+(with a backspace/retype every 25 characters) into IncrementalPreview and
+compares against re-evaluating the whole string with the engine on every
+keystroke. Exits with status 1 when the p99 keystroke latency of the
+incremental preview exceeds preview.PREVIEW_BUDGET_MS.
+
+Run from the repository root:  python benchmarks/bench_preview.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+from preview import PREVIEW_BUDGET_MS, IncrementalPreview
+
+TERMS = ["math.sin(30)*2", "(1.5+2.25)/3", "math.sqrt(16)", "7**2", "math.log10(1000)"]
+
+
+def build_expression(length=1000):
+    parts = []
+    i = 0
+    while len("+".join(parts)) < length:
+        parts.append(TERMS[i % len(TERMS)])
+        i += 1
+    return "+".join(parts)[:length]
+
+
+def keystrokes(expression):
+    text = ""
+    for i, ch in enumerate(expression):
+        text += ch
+        yield text
+        if i % 25 == 24:
+            yield text[:-1]
+            yield text
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(update, texts):
+    samples = []
+    for text in texts:
+        start = time.perf_counter()
+        update(text)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def full_reparse(text):
+    try:
+        # Every keystroke yields a new string, so this parses from scratch
+        engine.evaluate(text)
+    except Exception:
+        pass
+
+
+def main():
+    expression = build_expression()
+    texts = list(keystrokes(expression))
+
+    incremental = measure(IncrementalPreview().update, texts)
+    full = measure(full_reparse, texts)
+
+    for name, samples in (("incremental preview", incremental), ("full re-parse", full)):
+        print(f"{name:<20} median {statistics.median(samples):.3f} ms   "
+              f"p99 {percentile(samples, 0.99):.3f} ms   max {max(samples):.3f} ms")
+
+    p99 = percentile(incremental, 0.99)
+    print(f"budget {PREVIEW_BUDGET_MS} ms per keystroke on {len(expression)} characters")
+    if p99 > PREVIEW_BUDGET_MS:
+        print("FAIL: over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Load test for the JSON-RPC service.
+
+Starts service.serve on a free localhost port in a background thread, then
+drives it from keep-alive HTTP clients at several concurrency levels. Half
+of the calls repeat a small set of popular expressions (served from the
+result cache), the rest are unique. Reports throughput and p50/p99
+latency per level. Nothing outside this machine is contacted. Exits with status 1 if any call fails.
+
+Run from the repository root:  python benchmarks/bench_service.py [--workers N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import service
+
+CONCURRENCY = (1, 8, 64, 256)
+CALLS_PER_LEVEL = 4000
+POPULAR = ["sin(30)*2", "sqrt(2)**2", "factorial(20)", "log10(1000)+1", "2**64"]
+
+
+def start_server(workers):
+    started = threading.Event()
+    state = {}
+
+    def ready(port):
+        state["port"] = port
+        started.set()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        state["loop"] = loop
+        state["task"] = loop.create_task(service.serve(port=0, workers=workers, ready=ready))
+        try:
+            loop.run_until_complete(state["task"])
+        except asyncio.CancelledError:
+            pass
+        finally:
+            # Let connection handlers see their clients' EOF before closing
+            pending = asyncio.all_tasks(loop)
+            if pending:
+                loop.run_until_complete(asyncio.wait(pending, timeout=5))
+            loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    if not started.wait(30):
+        raise RuntimeError("Service did not start")
+
+    def stop():
+        state["loop"].call_soon_threadsafe(state["task"].cancel)
+        thread.join(10)
+    return state["port"], stop
+
+
+def call_for(i):
+    if i % 2:
+        expression = POPULAR[i % len(POPULAR)]
+    else:
+        expression = f"{i}*{i}+sin({i})"
+    return {"jsonrpc": "2.0", "id": i, "method": "evaluate", "params": {"expression": expression}}
+
+
+async def client(port, calls, latencies, failures):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for call in calls:
+            body = json.dumps(call).encode()
+            start = time.perf_counter()
+            writer.write(b"POST / HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            await reader.readline()  # Status line
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            response = json.loads(await reader.readexactly(length))
+            latencies.append((time.perf_counter() - start) * 1000)
+            if "error" in response:
+                failures.append(response["error"])
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_level(port, concurrency, offset):
+    calls = [call_for(offset + i) for i in range(CALLS_PER_LEVEL)]
+    latencies, failures = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, calls[k::concurrency], latencies, failures) for k in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    print(f"concurrency {concurrency:>4}   {len(latencies) / elapsed:9,.0f} calls/s   "
+          f"p50 {statistics.median(latencies):7.2f} ms   p99 {percentile(latencies, 0.99):7.2f} ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=None, help="service process pool size")
+    args = parser.parse_args(argv)
+
+    port, stop = start_server(args.workers)
+    failures = []
+    try:
+        for level, concurrency in enumerate(CONCURRENCY):
+            # Unique expressions differ between levels, popular ones repeat
+            failures += asyncio.run(run_level(port, concurrency, level * CALLS_PER_LEVEL))
+    finally:
+        stop()
+
+    if failures:
+        print(f"FAIL: {len(failures)} calls returned errors, e.g. {failures[0]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Session snapshot write time and restore-to-first-paint.
+
+Writes a history log of N entries (default 200,000) and a snapshot with a
+1,000-line worksheet to a temporary directory, then times:
+
+- encoding plus atomic write of a snapshot (what the Autosaver thread does)
+  and Autosaver.save (all the Tk thread pays);
+- constructing the window from that snapshot until the first paint, against
+  starting in Standard and switching to the saved mode afterwards.
+
+The window timings need a display; on a headless box run them under a
+virtual X server:
+
+    xvfb-run python benchmarks/bench_session.py [entries]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import session
+from bench_history import make_entries
+from core import CalculatorCore
+from history import HistoryStore
+
+SHEET = "\n".join(["base = 100"] + [f"v{i} = base * {i} + 1" for i in range(999)])
+UI = {
+    "mode": "Worksheet",
+    "expression": "12345*678",
+    "theme": "dark",
+    "panels": {
+        "Worksheet": {"sheet_input": SHEET},
+        "Converter": {"conv_type": "Length", "from_unit": "m", "to_unit": "km", "conv_input": "42"},
+        "Date": {"date1_entry": "2025-01-01", "date2_entry": "2025-12-31", "holidays_entry": ""}
+    }
+}
+
+
+def timed(action, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        action()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def report(name, result):
+    median, worst = result
+    print(f"{name:<28} median {median:8.3f} ms   max {worst:8.3f} ms")
+
+
+def bench_write(tmp, rounds):
+    core = CalculatorCore()
+    core.angle_mode = "RAD"
+    core.worksheet.load(SHEET)
+    path = os.path.join(tmp, "session.json")
+    state = core.snapshot()
+
+    report("encode + atomic write", timed(lambda: session.write(path, session.encode(state, UI)), rounds))
+    print(f"snapshot size: {os.path.getsize(path) / 1024:.1f} KiB")
+    autosaver = session.Autosaver(os.path.join(tmp, "autosave.json"))
+    report("Autosaver.save (Tk thread)", timed(lambda: autosaver.save(core.snapshot(), UI), rounds))
+    autosaver.close()
+    return path
+
+
+def bench_restore(tmp, session_path, rounds):
+    try:
+        from calc import AdvancedCalculator
+    except ImportError as exc:
+        print(f"window timings skipped: {exc}")
+        return
+    history_path = os.path.join(tmp, "history.jsonl")
+    empty = os.path.join(tmp, "missing.json")
+
+    def restored():
+        calculator = AdvancedCalculator(history_path, session_path)
+        calculator.window.update()
+        return calculator
+
+    def standard_first():
+        calculator = AdvancedCalculator(history_path, empty)
+        calculator.window.update()
+        calculator.switch_mode(UI["mode"])
+        calculator.window.update()
+        return calculator
+
+    for name, start in (("restore to first paint", restored), ("Standard, then switch", standard_first)):
+        samples = []
+        for _ in range(rounds):
+            begin = time.perf_counter()
+            calculator = start()
+            samples.append((time.perf_counter() - begin) * 1000)
+            calculator.autosaver.close()
+            calculator.worker.close()
+            calculator.core.close()
+            calculator.window.destroy()
+        report(name, (statistics.median(samples), max(samples)))
+
+
+def main(count=200_000, rounds=20):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.jsonl"))
+        for expression, result in make_entries(count):
+            store.append(expression, result)
+        store.close()
+        print(f"history: {count:,} entries")
+
+        session_path = bench_write(tmp, rounds * 5)
+        bench_restore(tmp, session_path, rounds)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,58 @@
+"""Cold-start budget for the headless core.
+
+Measures ``import core`` plus the first evaluation in fresh interpreters and
+fails (exit status 1) when the median exceeds core.STARTUP_BUDGET_MS, or when
+the import pulls in tkinter/customtkinter.
+
+Run from the repository root:  python benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core import STARTUP_BUDGET_MS
+
+PROBE = """
+import time
+start = time.perf_counter()
+import core
+core.CalculatorCore().evaluate("math.sin(30)+2**8")
+elapsed = (time.perf_counter() - start) * 1000
+import sys
+gui = [m for m in ("tkinter", "customtkinter") if m in sys.modules]
+print(elapsed, ",".join(gui))
+"""
+
+
+def measure_once():
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True,
+        text=True, check=True,
+    ).stdout.split()
+    return float(out[0]), out[1:]
+
+
+def main(runs=15):
+    samples = []
+    for _ in range(runs):
+        elapsed, gui_modules = measure_once()
+        if gui_modules:
+            print(f"FAIL: core imported GUI modules: {gui_modules}")
+            return 1
+        samples.append(elapsed)
+
+    median = statistics.median(samples)
+    print(f"import + first evaluate: median {median:.1f} ms, "
+          f"max {max(samples):.1f} ms over {runs} runs (budget {STARTUP_BUDGET_MS} ms)")
+    if median > STARTUP_BUDGET_MS:
+        print("FAIL: over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 15))
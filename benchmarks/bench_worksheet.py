@@ -0,0 +1,64 @@
+"""Edit latency on a large pricing worksheet.
+
+Builds a sheet of 50 independent products, each a chain of 100 formulas
+over its own base price plus a shared tax rate (5,000+ lines), then times
+editing one product's base price and the shared rate. An edit must
+re-evaluate only the formulas downstream of the edited line; the benchmark
+checks that count and compares the edit time to evaluating the whole sheet.
+Exits with status 1 if an edit re-evaluates anything it should not.
+
+Run from the repository root:  python benchmarks/bench_worksheet.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worksheet import Worksheet
+
+PRODUCTS = 50
+CHAIN = 100
+
+
+def build():
+    lines = ["tax = 0.2", "with_tax(p) = p * (1 + tax)"]
+    for product in range(PRODUCTS):
+        lines.append(f"base{product} = {10 + product}")
+        lines.append(f"p{product}_0 = with_tax(base{product})")
+        for step in range(1, CHAIN):
+            lines.append(f"p{product}_{step} = p{product}_{step - 1} * 1.01 + sqrt({step})")
+    return "\n".join(lines)
+
+
+def timed_edit(sheet, line):
+    before = sheet.evaluations
+    start = time.perf_counter()
+    recomputed = sheet.define(line)
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, sheet.evaluations - before, len(recomputed)
+
+
+def main():
+    text = build()
+    sheet = Worksheet()
+    start = time.perf_counter()
+    sheet.load(text)
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"{len(sheet.cells):,} definitions, full load and evaluation {load_ms:.1f} ms")
+
+    failures = 0
+    for label, line, expected in (
+        ("edit one base price", "base7 = 99", CHAIN + 1),
+        ("edit shared tax rate", "tax = 0.25", 1 + 1 + PRODUCTS * CHAIN),
+    ):
+        elapsed, evaluations, recomputed = timed_edit(sheet, line)
+        print(f"{label:<22} {elapsed:8.2f} ms   {evaluations:>5,} evaluations")
+        if evaluations != expected:
+            print(f"FAIL: expected {expected} evaluations")
+            failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+"""Reproducible benchmark suite for the engine and GUI hot paths.
+
+Every case times one operation: evaluating the Standard, Scientific and
+Programming expressions ``calculate`` hands to the worker, large
+factorials and powers including rendering, unit conversion and date
+differences, and on the GUI side switch_mode, set_angle_mode, the display
+refresh of a long expression, a calculate round trip through the worker
+and cold start of AdvancedCalculator. Inputs are fixed (or drawn from a
+seeded generator), each case is warmed up, the garbage collector is off
+while timing, and every case is repeated REPEAT times with enough calls
+per round to last at least MIN_ROUND_S. The median is the reported number.
+
+    python benchmarks/suite.py run -o results.json [--only calculate.] [--repeat 7]
+    python benchmarks/suite.py compare baseline.json results.json [--threshold 0.1]
+
+GUI cases need a display. Without one, ``run`` re-runs itself for those
+cases under ``xvfb-run`` when that is installed, and otherwise lists them
+as skipped in the results. ``compare`` exits with status 1 when a case is
+slower than the baseline by more than the threshold (10% by default).
+Keep a baseline per machine; numbers from different machines do not compare.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+REPEAT = 7
+MIN_ROUND_S = 0.05
+THRESHOLD = 0.10
+SEED = 1
+
+CASES = {}  # name -> (setup function, needs a display)
+
+
+def case(name, gui=False):
+    """Register ``setup(context) -> (step, operations per step)``."""
+    def register(setup):
+        CASES[name] = (setup, gui)
+        return setup
+    return register
+
+
+# Engine cases
+STANDARD = ["7+8*9-4/2", "(1+2)*(3+4)/(5-6)", "123456789*987654321", "2**10 % 7", "0.1+0.2-0.3", "100/7*7"]
+SCIENTIFIC = [
+    "math.sin(30)+math.cos(60)", "math.sqrt(2)**2*math.pi", "math.log10(1000)+math.log(math.e)",
+    "math.tan(45)*math.e", "math.asin(0.5)+math.atan(1)", "math.factorial(10)/math.degrees(1)"
+]
+PROGRAMMING = [
+    ("FF & 0F | 1A2B << 4", "HEX"), ("~0 ^ 12345 % 7", "DEC"), ("777 + 1234 >> 2", "OCT"),
+    ("1011 | 1100 & 1111", "BIN"), ("(DEAD * BEEF) % 10000", "HEX"), ("-128 / 3", "DEC")
+]
+
+
+@case("calculate.standard")
+def calculate_standard(context):
+    import worker
+    return lambda: [worker._evaluate(e, "DEG") for e in STANDARD], len(STANDARD)
+
+
+@case("calculate.scientific")
+def calculate_scientific(context):
+    import worker
+    return lambda: [worker._evaluate(e, "DEG") for e in SCIENTIFIC], len(SCIENTIFIC)
+
+
+@case("calculate.decimal64")
+def calculate_decimal(context):
+    import worker
+    expressions = STANDARD + SCIENTIFIC
+    return lambda: [worker._evaluate(e, "DEG", "decimal", 64) for e in expressions], len(expressions)
+
+
+@case("calculate.programming")
+def calculate_programming(context):
+    import worker
+    return lambda: [worker._evaluate_integer(e, base, 64, True) for e, base in PROGRAMMING], len(PROGRAMMING)
+
+
+def _rendered(task, *args):
+    import worker
+    if hasattr(sys, "set_int_max_str_digits"):
+        sys.set_int_max_str_digits(max(worker.MAX_RESULT_DIGITS, 640))
+    return lambda: worker._render(worker.TASKS[task](*args), worker.MAX_RESULT_DIGITS), 1
+
+
+@case("factorial.1000")
+def factorial_small(context):
+    return _rendered("factorial", 1000)
+
+
+@case("factorial.20000")
+def factorial_large(context):
+    return _rendered("factorial", 20000)
+
+
+@case("power.2**100000")
+def power_large(context):
+    return _rendered("evaluate", "2**100000", "DEG")
+
+
+@case("convert_units")
+def convert_units(context):
+    import units
+    from core import CalculatorCore
+    core = CalculatorCore()
+    rng = random.Random(SEED)
+    conversions = []
+    for category in units.categories():
+        names = units.units(category)
+        for _ in range(25):
+            conversions.append((rng.uniform(-500, 500), rng.choice(names), rng.choice(names), category))
+    return lambda: [core.convert_units(*c) for c in conversions], len(conversions)
+
+
+@case("date_difference")
+def date_difference(context):
+    import datetime
+    from core import CalculatorCore
+    core = CalculatorCore()
+    rng = random.Random(SEED)
+    start = datetime.date(2000, 1, 1)
+    pairs = []
+    for _ in range(100):
+        a = start + datetime.timedelta(days=rng.randrange(10000))
+        b = a + datetime.timedelta(days=rng.randrange(3000))
+        pairs.append((a.isoformat(), b.isoformat()))
+    holidays = ["2025-12-25", "2025-12-26", "2026-01-01"]
+    return lambda: [core.date_difference(a, b, holidays) for a, b in pairs], len(pairs)
+
+
+# GUI cases; context["calculator"] is one window shared by these cases
+MODES = ["Standard", "Scientific", "Programming", "Date", "Converter", "Graph", "Statistics", "Matrix", "Calculus", "Worksheet"]
+
+
+def _calculator(context):
+    calculator = context.get("calculator")
+    if calculator is None:
+        from calc import AdvancedCalculator
+        calculator = context["calculator"] = AdvancedCalculator(None, None)
+        calculator.window.update()
+    return calculator
+
+
+@case("gui.cold_start", gui=True)
+def cold_start(context):
+    from calc import AdvancedCalculator
+
+    def step():
+        calculator = AdvancedCalculator(None, None)
+        calculator.window.update()
+        calculator.worker.close()
+        calculator.window.destroy()
+    return step, 1
+
+
+@case("gui.switch_mode", gui=True)
+def switch_mode(context):
+    calculator = _calculator(context)
+    for mode in MODES:  # Time the cached switch, not first construction
+        calculator.switch_mode(mode)
+
+    def step():
+        for mode in MODES:
+            calculator.switch_mode(mode)
+            calculator.window.update()
+    return step, len(MODES)
+
+
+@case("gui.set_angle_mode", gui=True)
+def set_angle_mode(context):
+    calculator = _calculator(context)
+    calculator.switch_mode("Scientific")
+    calculator.current_expression = "math.sin(30)+math.cos(60)"
+
+    def step():
+        for mode in ("DEG", "RAD", "GRAD"):
+            calculator.set_angle_mode(mode)
+            calculator.window.update()
+    return step, 3
+
+
+@case("gui.update_display_long", gui=True)
+def update_display_long(context):
+    calculator = _calculator(context)
+    calculator.switch_mode("Standard")
+    expression = "+".join(f"{i}*math.pi/{i + 1}" for i in range(1, 200))
+
+    def step():
+        calculator.current_expression = expression
+        calculator.display_pending = True
+        calculator.refresh_display()
+        calculator.window.update()
+    return step, 1
+
+
+@case("gui.calculate_roundtrip", gui=True)
+def calculate_roundtrip(context):
+    calculator = _calculator(context)
+    calculator.switch_mode("Standard")
+
+    def step():
+        calculator.current_expression = "123456789*987654321"
+        calculator.calculate()
+        while calculator.worker.busy:
+            calculator.window.update()
+            time.sleep(0.001)
+    return step, 1
+
+
+@case("gui.calculate_date_difference", gui=True)
+def gui_date_difference(context):
+    calculator = _calculator(context)
+    calculator.switch_mode("Date")
+    calculator.set_field_value(calculator.date1_entry, "2001-03-04")
+    calculator.set_field_value(calculator.date2_entry, "2025-10-17")
+    calculator.set_field_value(calculator.holidays_entry, "2025-12-25, 2025-12-26")
+
+    def step():
+        calculator.calculate_date_difference()
+        calculator.window.update()
+    return step, 1
+
+
+def close_context(context):
+    calculator = context.pop("calculator", None)
+    if calculator is not None:
+        calculator.worker.close()
+        calculator.window.destroy()
+
+
+# Running
+def measure(step, operations, repeat):
+    """Median, min and max seconds per operation over ``repeat`` rounds."""
+    step()  # Warm-up: imports, caches, first paint
+    start = time.perf_counter()
+    step()
+    once = max(time.perf_counter() - start, 1e-9)
+    number = max(1, int(MIN_ROUND_S / once))
+    samples = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                step()
+            samples.append((time.perf_counter() - start) / (number * operations))
+    finally:
+        gc.enable()
+    return statistics.median(samples), min(samples), max(samples), number
+
+
+def run_cases(names, repeat):
+    results, context = {}, {}
+    try:
+        for name in names:
+            setup, _ = CASES[name]
+            step, operations = setup(context)
+            median, best, worst, number = measure(step, operations, repeat)
+            results[name] = {
+                "median_us": median * 1e6,
+                "min_us": best * 1e6,
+                "max_us": worst * 1e6,
+                "ops_per_s": 1 / median,
+                "calls_per_round": number,
+                "repeat": repeat
+            }
+            print(f"{name:<32} {median * 1e6:12.2f} us/op  {1 / median:12.0f} ops/s", file=sys.stderr)
+    finally:
+        close_context(context)
+    return results
+
+
+def has_display():
+    return sys.platform != "linux" or bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def run_gui_elsewhere(names, repeat):
+    """GUI cases under xvfb-run in a child process; (results, skipped)."""
+    xvfb = shutil.which("xvfb-run")
+    if xvfb is None:
+        return {}, {name: "no display and xvfb-run is not installed" for name in names}
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "gui.json")
+        command = [xvfb, "-a", sys.executable, os.path.abspath(__file__), "run", "--gui-only",
+                   "--repeat", str(repeat), "-o", output]
+        for name in names:
+            command += ["--only", name]
+        if subprocess.call(command) != 0 or not os.path.exists(output):
+            return {}, {name: "xvfb-run failed" for name in names}
+        with open(output, encoding="utf-8") as f:
+            data = json.load(f)
+    return data["results"], data["skipped"]
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+
+
+def run(args):
+    names = [n for n in CASES if not args.only or any(n.startswith(p) for p in args.only)]
+    engine = [n for n in names if not CASES[n][1] and not args.gui_only]
+    gui = [n for n in names if CASES[n][1]]
+
+    results, skipped = run_cases(engine, args.repeat), {}
+    if gui:
+        if has_display():
+            try:
+                import customtkinter  # noqa: F401
+            except ImportError as exc:
+                skipped.update({name: str(exc) for name in gui})
+            else:
+                results.update(run_cases(gui, args.repeat))
+        elif args.gui_only:
+            skipped.update({name: "no display" for name in gui})
+        else:
+            gui_results, gui_skipped = run_gui_elsewhere(gui, args.repeat)
+            results.update(gui_results)
+            skipped.update(gui_skipped)
+    for name, reason in skipped.items():
+        print(f"{name:<32} skipped: {reason}", file=sys.stderr)
+
+    data = {"environment": environment(), "results": results, "skipped": skipped}
+    text = json.dumps(data, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+def compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    with open(args.results, encoding="utf-8") as f:
+        current = json.load(f)["results"]
+
+    regressions = 0
+    print(f"{'case':<32}{'baseline us':>14}{'current us':>14}{'change':>9}")
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            print(f"{name:<32}  only in {'results' if name in current else 'baseline'}")
+            continue
+        old, new = baseline[name]["median_us"], current[name]["median_us"]
+        change = new / old - 1
+        flag = ""
+        if change > args.threshold:
+            flag, regressions = "  REGRESSION", regressions + 1
+        elif change < -args.threshold:
+            flag = "  faster"
+        print(f"{name:<32}{old:>14.2f}{new:>14.2f}{change:>+9.1%}{flag}")
+    print(f"\n{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Engine and GUI benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the cases and write JSON results")
+    run_parser.add_argument("-o", "--output", help="results file (default: stdout)")
+    run_parser.add_argument("--only", action="append", help="run cases starting with this prefix (repeatable)")
+    run_parser.add_argument("--repeat", type=int, default=REPEAT)
+    run_parser.add_argument("--gui-only", action="store_true", help=argparse.SUPPRESS)
+    compare_parser = commands.add_parser("compare", help="flag regressions against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
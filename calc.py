@@ -1,51 +1,157 @@
+import sys
+
+# Entry points that need no window -> module whose main(argv) runs them
+HEADLESS = {"--batch": "batch", "--serve": "service", "--stats": "stats"}
+
+
+def run_headless(argv):
+    """Run a HEADLESS mode without importing the GUI toolkit."""
+    import importlib
+    module = importlib.import_module(HEADLESS[argv[0]])
+    # Spawned worker processes re-import __main__; make that the headless
+    # module rather than this file and its Tk imports
+    sys.modules["__main__"] = module
+    return module.main(argv[1:])
+
+
+if __name__ == "__main__" and sys.argv[1:2] and sys.argv[1] in HEADLESS:
+    sys.exit(run_headless(sys.argv[1:]))
+
 import customtkinter as ctk
-from tkinter import messagebox, filedialog
+import tkinter
+from tkinter import messagebox, filedialog, TclError
 import math
-import datetime
 import json
 import os
+import threading
+import time
 from typing import Dict, List, Any
 
-ctk.set_appearance_mode("dark")
-ctk.set_default_color_theme("dark-blue")
+import engine
+import graphing
+import history
+import instrumentation
+import matrix
+import precision
+import programmer
+import session
+import stats
+import units
+import worksheet
+from core import CalculatorCore
+from precision import LazyResult
+from preview import IncrementalPreview
+from styles import StyleRegistry, THEMES
+from worker import EvaluationWorker, FULL_DIGITS_TIMEOUT, TIMEOUT, TOO_LARGE, ZERO_DIVISION
+
+FRAME_MS = 16  # Display refresh interval while input is arriving
+CONTROL_MASK = 0x4
+HISTORY_ROW_HEIGHT = 26  # pixels per row in the history drawer
+
+# Display symbols typed or pasted -> the operators they stand for
+INPUT_SYMBOLS = str.maketrans({"×": "*", "÷": "/", "−": "-", "π": "pi", "\n": None, "\r": None, "\t": " "})
+EXPRESSION_INPUT = set("0123456789.+-*/%()&|^~<> ,abcdefghijklmnopqrstuvwxyz_")
+PROGRAMMING_INPUT = set("0123456789+-*/%()&|^~<> ")
+HEX_DIGITS = set("ABCDEF")
+
+# Precision menu entry -> (precision mode, significant digits)
+PRECISION_CHOICES = {
+    "Float": ("float", 50),
+    "Decimal 32": ("decimal", 32),
+    "Decimal 64": ("decimal", 64),
+    "Decimal 256": ("decimal", 256),
+    "Fraction": ("fraction", 50)
+}
+
+MODES_PER_ROW = 4
+
+# Calculus menu entry -> (calculus function, label of the first bound)
+CALCULUS_OPERATIONS = {
+    "Solve for x": ("solve", "From"),
+    "Integrate": ("integrate", "From"),
+    "Derivative": ("derivative", "At x")
+}
+
+# Palette keys for successive curves in Graph mode
+CURVE_COLORS = ["accent_blue", "accent_orange", "accent_green", "accent_red", "accent_purple"]
+
+# Input widgets saved in session snapshots, per mode, in restore order
+# (a category or operation menu comes before the fields it reconfigures)
+PANEL_FIELDS = {
+    "Date": ("date1_entry", "date2_entry", "holidays_entry"),
+    "Converter": ("conv_type", "from_unit", "to_unit", "conv_input"),
+    "Graph": ("graph_entry",),
+    "Statistics": ("stats_input",),
+    "Matrix": ("matrix_operation", "matrix_function"),
+    "Calculus": ("calculus_operation", "calculus_entry", "calculus_a", "calculus_b"),
+    "Worksheet": ("sheet_input",)
+}
 
 class AdvancedCalculator:
-    def __init__(self):
+    def __init__(self, history_path=history.DEFAULT_PATH, session_path=session.DEFAULT_PATH):
+        # Last session, read before any widget exists so the window is built
+        # directly in the saved mode and theme
+        snapshot = session.read(session_path) if session_path else None
+        ui = snapshot["ui"] if snapshot else {}
+        theme = ui.get("theme") if ui.get("theme") in THEMES else "dark"
+        
+        ctk.set_appearance_mode(theme)
+        ctk.set_default_color_theme("dark-blue")
+        
         self.window = ctk.CTk()
         self.window.title("🧮 Elite Calculator")
-        self.window.geometry("400x600")
+        self.window.geometry(ui.get("geometry") or "400x600")
         self.window.resizable(True, True)
         
-        # Color scheme
-        self.colors = {
-            "bg_primary": "#0a0a0a",
-            "bg_secondary": "#1a1a1a", 
-            "bg_tertiary": "#2a2a2a",
-            "accent_blue": "#00d4ff",
-            "accent_purple": "#8b5cf6",
-            "accent_green": "#10b981",
-            "accent_orange": "#f59e0b",
-            "accent_red": "#ef4444",
-            "text_primary": "#ffffff",
-            "text_secondary": "#a1a1aa"
-        }
+        # Shared fonts, button styles and the active color scheme
+        self.styles = StyleRegistry(theme)
+        self.colors = self.styles.colors
         
-        # Calculator state
-        self.current_expression = ""
-        self.display_var = ctk.StringVar(value="0")
-        self.memory = 0
-        self.history = []
-        self.current_mode = "Standard"
-        self.angle_mode = "DEG"  # DEG, RAD, GRAD
+        # Calculator state (memory, history, angle and base live in the core)
+        self.core = CalculatorCore(history_path=history_path)
+        if snapshot:
+            self.core.restore(snapshot["core"])
+        self.core.history.load(background=True)
+        # Heavy evaluations run in a worker process, results come back via after()
+        self.worker = EvaluationWorker(self.window.after)
+        self.current_expression = ui.get("expression", "")
+        self.display_var = ctk.StringVar(value=self.current_expression or "0")
+        self.current_mode = ui.get("mode", "Standard")
+        # Saved panel fields, applied when each panel is first built
+        self.panel_state = ui.get("panels", {})
+        # Snapshots are written off the Tk thread every AUTOSAVE_INTERVAL_MS
+        self.autosaver = session.Autosaver(session_path) if session_path else None
+        # Running result shown under the expression while typing
+        self.preview = IncrementalPreview(self.core.angle_mode)
         
-        # Variables for programming mode
-        self.current_base = "DEC"  # DEC, HEX, OCT, BIN
+        # Display refreshes are coalesced to at most one per frame
+        self.display_pending = False
+        self.redraw_count = 0
+        # Huge result currently shown as a summary, if any
+        self.lazy_result = None
+        # Graph mode state, created when the first expressions are plotted
+        self.graph = None
+        self.graph_pending = False
+        self.graph_drag = None
+        self.curve_items = []
+        # Worksheet lines and their rendered results, as of the last refresh
+        self.sheet_pending = False
+        self.sheet_lines = []
+        self.sheet_results = []
+        # History drawer, built on first open; rows are a fixed pool of canvas items
+        self.history_view = None
+        self.history_open = False
+        self.history_pending = False
+        self.history_top = 0
+        self.history_rows = []
         
         self.setup_window()
         self.create_widgets()
+        self.bind_keys()
         
     def setup_window(self):
         self.window.configure(fg_color=self.colors["bg_primary"])
+        self.styles.register(self.window, fg_color="bg_primary")
         
     def create_widgets(self):
         # Main container
@@ -56,6 +162,7 @@ class AdvancedCalculator:
             border_width=2,
             border_color=self.colors["accent_blue"]
         )
+        self.styles.register(main_frame, fg_color="bg_secondary", border_color="accent_blue")
         main_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
         # Mode selector
@@ -64,32 +171,50 @@ class AdvancedCalculator:
         # Display area
         self.create_display_area(main_frame)
         
-        # Button area (will change based on mode)
+        # Button area, one cached panel per mode is shown at a time
         self.button_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
         self.button_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        self.panels = {}
+        self.active_panel = None
+        self.panel_builders = {
+            "Standard": self.create_standard_buttons,
+            "Scientific": self.create_scientific_buttons,
+            "Programming": self.create_programming_buttons,
+            "Date": self.create_date_calculator,
+            "Converter": self.create_converter,
+            "Graph": self.create_graph_panel,
+            "Statistics": self.create_statistics_panel,
+            "Matrix": self.create_matrix_panel,
+            "Calculus": self.create_calculus_panel,
+            "Worksheet": self.create_worksheet_panel
+        }
         
-        # Create initial standard mode
-        self.switch_mode("Standard")
+        # Open in the mode of the last session, building only that panel
+        if self.current_mode not in self.panel_builders:
+            self.current_mode = "Standard"
+        self.switch_mode(self.current_mode)
         
     def create_mode_selector(self, parent):
         mode_frame = ctk.CTkFrame(parent, fg_color="transparent")
         mode_frame.pack(fill="x", padx=10, pady=(10, 5))
         
-        modes = ["Standard", "Scientific", "Programming", "Date", "Converter"]
+        modes = ["Standard", "Scientific", "Programming", "Date", "Converter", "Graph", "Statistics", "Matrix", "Calculus", "Worksheet"]
+        self.mode_buttons = {}
         for i, mode in enumerate(modes):
             btn = ctk.CTkButton(
                 mode_frame,
                 text=mode,
                 width=70,
                 height=30,
-                font=ctk.CTkFont(size=10),
+                font=self.styles.font(10),
                 command=lambda m=mode: self.switch_mode(m),
                 fg_color=self.colors["accent_purple"] if mode == self.current_mode else self.colors["bg_tertiary"]
             )
-            btn.grid(row=0, column=i, padx=2, pady=2)
+            btn.grid(row=i // MODES_PER_ROW, column=i % MODES_PER_ROW, padx=2, pady=2, sticky="ew")
+            self.mode_buttons[mode] = btn
             
         # Configure grid
-        for i in range(len(modes)):
+        for i in range(MODES_PER_ROW):
             mode_frame.grid_columnconfigure(i, weight=1)
     
     def create_display_area(self, parent):
@@ -100,6 +225,7 @@ class AdvancedCalculator:
             border_width=2,
             border_color=self.colors["accent_purple"]
         )
+        self.styles.register(display_frame, fg_color="bg_tertiary", border_color="accent_purple")
         display_frame.pack(fill="x", padx=10, pady=5)
         
         # Mode and angle indicator
@@ -108,35 +234,74 @@ class AdvancedCalculator:
         
         self.mode_label = ctk.CTkLabel(
             info_frame,
-            text=f"{self.current_mode} | {self.angle_mode}",
-            font=ctk.CTkFont(size=10),
+            text=f"{self.current_mode} | {self.core.angle_mode}",
+            font=self.styles.font(10),
             text_color=self.colors["text_secondary"]
         )
+        self.styles.register(self.mode_label, text_color="text_secondary")
         self.mode_label.pack(side="left")
         
         self.memory_indicator = ctk.CTkLabel(
             info_frame,
-            text="M" if self.memory != 0 else "",
-            font=ctk.CTkFont(size=10, weight="bold"),
+            text="M" if self.core.memory != 0 else "",
+            font=self.styles.font(10, "bold"),
             text_color=self.colors["accent_orange"]
         )
+        self.styles.register(self.memory_indicator, text_color="accent_orange")
         self.memory_indicator.pack(side="right")
         
+        self.busy_indicator = ctk.CTkLabel(
+            info_frame,
+            text="",
+            font=self.styles.font(10, "bold"),
+            text_color=self.colors["accent_blue"]
+        )
+        self.styles.register(self.busy_indicator, text_color="accent_blue")
+        self.busy_indicator.pack(side="right", padx=5)
+        
+        theme_button = ctk.CTkButton(
+            info_frame,
+            text="◐",
+            width=24,
+            height=18,
+            font=self.styles.font(10),
+            command=self.toggle_theme,
+            fg_color="transparent",
+            text_color=self.colors["text_secondary"]
+        )
+        self.styles.register(theme_button, text_color="text_secondary", hover_color="bg_secondary")
+        theme_button.pack(side="right")
+        
+        for text, cmd in [("Import", self.import_history), ("Export", self.export_history), ("History", self.toggle_history)]:
+            btn = ctk.CTkButton(
+                info_frame,
+                text=text,
+                width=40,
+                height=18,
+                font=self.styles.font(10),
+                command=cmd,
+                fg_color="transparent",
+                text_color=self.colors["text_secondary"]
+            )
+            self.styles.register(btn, text_color="text_secondary", hover_color="bg_secondary")
+            btn.pack(side="right")
+        
         # Expression display
         self.expression_display = ctk.CTkLabel(
             display_frame,
             text="",
-            font=ctk.CTkFont(size=12),
+            font=self.styles.font(12),
             text_color=self.colors["text_secondary"],
             anchor="e"
         )
+        self.styles.register(self.expression_display, text_color="text_secondary")
         self.expression_display.pack(fill="x", padx=10)
         
         # Main display
         self.display = ctk.CTkEntry(
             display_frame,
             textvariable=self.display_var,
-            font=ctk.CTkFont(size=24, weight="bold"),
+            font=self.styles.font(24, "bold"),
             height=60,
             justify="right",
             state="readonly",
@@ -144,33 +309,80 @@ class AdvancedCalculator:
             border_width=0,
             text_color=self.colors["text_primary"]
         )
-        self.display.pack(fill="x", padx=10, pady=(0, 10))
+        self.styles.register(self.display, text_color="text_primary")
+        self.display.pack(fill="x", padx=10, pady=(0, 0))
+        
+        # Live preview of the running result
+        self.preview_label = ctk.CTkLabel(
+            display_frame,
+            text="",
+            font=self.styles.font(12),
+            text_color=self.colors["accent_blue"],
+            anchor="e"
+        )
+        self.styles.register(self.preview_label, text_color="accent_blue")
+        self.preview_label.pack(fill="x", padx=10, pady=(0, 6))
+        
+        # Shown only while a huge result is displayed as a summary
+        self.digits_button = ctk.CTkButton(
+            display_frame,
+            text="Show all digits",
+            height=22,
+            font=self.styles.font(10),
+            command=self.show_all_digits,
+            fg_color="transparent",
+            text_color=self.colors["accent_blue"]
+        )
+        self.styles.register(self.digits_button, text_color="accent_blue", hover_color="bg_secondary")
     
+    @instrumentation.timed
     def switch_mode(self, mode):
         self.current_mode = mode
+        if self.history_open:
+            self.history_frame.pack_forget()
+            self.history_open = False
         
-        # Clear button frame
-        for widget in self.button_frame.winfo_children():
-            widget.destroy()
-            
-        # Update mode label
-        self.mode_label.configure(text=f"{self.current_mode} | {self.angle_mode}")
-        
-        # Create appropriate button layout
-        if mode == "Standard":
-            self.create_standard_buttons()
-        elif mode == "Scientific":
-            self.create_scientific_buttons()
-        elif mode == "Programming":
-            self.create_programming_buttons()
-        elif mode == "Date":
-            self.create_date_calculator()
-        elif mode == "Converter":
-            self.create_converter()
-    
-    def create_standard_buttons(self):
+        # Hide the current panel, build the new one only on first use
+        if self.active_panel is not None:
+            self.active_panel.pack_forget()
+        panel = self.panels.get(mode)
+        if panel is None:
+            panel = ctk.CTkFrame(self.button_frame, fg_color="transparent")
+            self.panel_builders[mode](panel)
+            self.panels[mode] = panel
+            self.restore_panel(mode)
+        panel.pack(fill="both", expand=True)
+        self.active_panel = panel
+        
+        self.update_preview()
+        
+        # Update mode label and selector colors
+        self.mode_label.configure(text=f"{self.current_mode} | {self.core.angle_mode}")
+        self.highlight_button(self.mode_buttons, mode, self.colors["accent_purple"])
+    
+    def toggle_theme(self):
+        themes = list(THEMES)
+        theme = themes[(themes.index(self.styles.theme) + 1) % len(themes)]
+        # Reconfigure existing widgets, then restore selector highlights
+        ctk.set_appearance_mode(theme)
+        self.styles.set_theme(theme)
+        self.highlight_button(self.mode_buttons, self.current_mode, self.colors["accent_purple"])
+        if "Scientific" in self.panels:
+            self.highlight_button(self.angle_buttons, self.core.angle_mode, self.colors["accent_green"])
+        if "Programming" in self.panels:
+            self.highlight_button(self.base_buttons, self.core.current_base, self.colors["accent_orange"])
+        if "Graph" in self.panels:
+            self.schedule_graph_redraw()
+        if self.history_view is not None:
+            self.render_history()
+    
+    def highlight_button(self, buttons, selected, color):
+        for key, btn in buttons.items():
+            btn.configure(fg_color=color if key == selected else self.colors["bg_tertiary"])
+    
+    def create_standard_buttons(self, parent):
         # Memory buttons row
-        memory_frame = ctk.CTkFrame(self.button_frame, fg_color="transparent")
+        memory_frame = ctk.CTkFrame(parent, fg_color="transparent")
         memory_frame.pack(fill="x", pady=(0, 5))
         
         memory_buttons = [
@@ -187,18 +399,19 @@ class AdvancedCalculator:
                 text=text,
                 width=60,
                 height=35,
-                font=ctk.CTkFont(size=12),
+                font=self.styles.font(12),
                 command=cmd,
                 fg_color=self.colors["accent_purple"],
-                hover_color="#a855f7"
+                hover_color=self.colors["hover_purple"]
             )
+            self.styles.register_button(btn, "function")
             btn.grid(row=0, column=i, padx=2, pady=2, sticky="ew")
         
         for i in range(5):
             memory_frame.grid_columnconfigure(i, weight=1)
         
         # Main calculator grid
-        calc_frame = ctk.CTkFrame(self.button_frame, fg_color="transparent")
+        calc_frame = ctk.CTkFrame(parent, fg_color="transparent")
         calc_frame.pack(fill="both", expand=True)
         
         # Standard calculator layout
@@ -220,28 +433,42 @@ class AdvancedCalculator:
         for i in range(4):
             calc_frame.grid_columnconfigure(i, weight=1)
     
-    def create_scientific_buttons(self):
+    def create_scientific_buttons(self, parent):
         # Angle mode selector
-        angle_frame = ctk.CTkFrame(self.button_frame, fg_color="transparent")
+        angle_frame = ctk.CTkFrame(parent, fg_color="transparent")
         angle_frame.pack(fill="x", pady=(0, 5))
         
+        self.angle_buttons = {}
         for i, mode in enumerate(["DEG", "RAD", "GRAD"]):
             btn = ctk.CTkButton(
                 angle_frame,
                 text=mode,
                 width=60,
                 height=30,
-                font=ctk.CTkFont(size=10),
+                font=self.styles.font(10),
                 command=lambda m=mode: self.set_angle_mode(m),
-                fg_color=self.colors["accent_green"] if mode == self.angle_mode else self.colors["bg_tertiary"]
+                fg_color=self.colors["accent_green"] if mode == self.core.angle_mode else self.colors["bg_tertiary"]
             )
             btn.grid(row=0, column=i, padx=2, pady=2)
+            self.angle_buttons[mode] = btn
+        
+        # Float, Decimal with N digits or exact Fraction arithmetic
+        self.precision_menu = ctk.CTkOptionMenu(
+            angle_frame,
+            values=list(PRECISION_CHOICES),
+            width=100,
+            height=30,
+            font=self.styles.font(10),
+            command=self.set_precision
+        )
+        self.precision_menu.set(self.precision_choice())
+        self.precision_menu.grid(row=0, column=3, padx=2, pady=2)
         
-        for i in range(3):
+        for i in range(4):
             angle_frame.grid_columnconfigure(i, weight=1)
         
         # Scientific functions
-        sci_frame = ctk.CTkFrame(self.button_frame, fg_color="transparent")
+        sci_frame = ctk.CTkFrame(parent, fg_color="transparent")
         sci_frame.pack(fill="both", expand=True)
         
         # Extended scientific layout
@@ -266,28 +493,66 @@ class AdvancedCalculator:
         for i in range(4):
             sci_frame.grid_columnconfigure(i, weight=1)
     
-    def create_programming_buttons(self):
+    def create_programming_buttons(self, parent):
         # Base selector
-        base_frame = ctk.CTkFrame(self.button_frame, fg_color="transparent")
+        base_frame = ctk.CTkFrame(parent, fg_color="transparent")
         base_frame.pack(fill="x", pady=(0, 5))
         
+        self.base_buttons = {}
         for i, base in enumerate(["DEC", "HEX", "OCT", "BIN"]):
             btn = ctk.CTkButton(
                 base_frame,
                 text=base,
                 width=60,
                 height=30,
-                font=ctk.CTkFont(size=10),
+                font=self.styles.font(10),
                 command=lambda b=base: self.set_base_mode(b),
-                fg_color=self.colors["accent_orange"] if base == self.current_base else self.colors["bg_tertiary"]
+                fg_color=self.colors["accent_orange"] if base == self.core.current_base else self.colors["bg_tertiary"]
             )
             btn.grid(row=0, column=i, padx=2, pady=2)
+            self.base_buttons[base] = btn
         
         for i in range(4):
             base_frame.grid_columnconfigure(i, weight=1)
         
+        # Word size and signedness
+        word_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        word_frame.pack(fill="x", pady=(0, 5))
+        
+        self.word_size_menu = ctk.CTkOptionMenu(
+            word_frame,
+            values=[f"{bits}-bit" for bits in programmer.WORD_SIZES],
+            width=90,
+            height=26,
+            font=self.styles.font(10),
+            command=lambda value: self.set_word_size(int(value.split("-")[0]))
+        )
+        self.word_size_menu.set(f"{self.core.word_size}-bit")
+        self.word_size_menu.pack(side="left", padx=2)
+        
+        self.signed_var = ctk.BooleanVar(value=self.core.signed)
+        ctk.CTkCheckBox(
+            word_frame,
+            text="Signed",
+            font=self.styles.font(10),
+            variable=self.signed_var,
+            command=lambda: self.set_signed(self.signed_var.get())
+        ).pack(side="left", padx=8)
+        
+        # Result in all four bases
+        self.base_display = ctk.CTkLabel(
+            parent,
+            text="",
+            font=self.styles.font(10),
+            text_color=self.colors["text_secondary"],
+            justify="left",
+            anchor="w"
+        )
+        self.styles.register(self.base_display, text_color="text_secondary")
+        self.base_display.pack(fill="x", padx=4, pady=(0, 5))
+        
         # Programming calculator layout
-        prog_frame = ctk.CTkFrame(self.button_frame, fg_color="transparent")
+        prog_frame = ctk.CTkFrame(parent, fg_color="transparent")
         prog_frame.pack(fill="both", expand=True)
         
         # Add programming-specific buttons
@@ -312,12 +577,13 @@ class AdvancedCalculator:
         for i in range(4):
             prog_frame.grid_columnconfigure(i, weight=1)
     
-    def create_date_calculator(self):
+    def create_date_calculator(self, parent):
         # Date calculation interface
-        date_frame = ctk.CTkFrame(self.button_frame, fg_color=self.colors["bg_tertiary"])
+        date_frame = ctk.CTkFrame(parent, fg_color=self.colors["bg_tertiary"])
+        self.styles.register(date_frame, fg_color="bg_tertiary")
         date_frame.pack(fill="both", expand=True, padx=5, pady=5)
         
-        ctk.CTkLabel(date_frame, text="Date Calculator", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=10)
+        ctk.CTkLabel(date_frame, text="Date Calculator", font=self.styles.font(16, "bold")).pack(pady=10)
         
         # Date inputs
         ctk.CTkLabel(date_frame, text="From Date (YYYY-MM-DD):").pack()
@@ -328,20 +594,25 @@ class AdvancedCalculator:
         self.date2_entry = ctk.CTkEntry(date_frame, placeholder_text="2025-12-31")
         self.date2_entry.pack(pady=5)
         
+        ctk.CTkLabel(date_frame, text="Holidays (optional, comma-separated):").pack()
+        self.holidays_entry = ctk.CTkEntry(date_frame, placeholder_text="2025-12-25, 2025-12-26")
+        self.holidays_entry.pack(pady=5)
+        
         ctk.CTkButton(date_frame, text="Calculate Difference", command=self.calculate_date_difference).pack(pady=10)
         
         self.date_result = ctk.CTkLabel(date_frame, text="", wraplength=300)
         self.date_result.pack(pady=10)
     
-    def create_converter(self):
+    def create_converter(self, parent):
         # Unit converter interface
-        conv_frame = ctk.CTkFrame(self.button_frame, fg_color=self.colors["bg_tertiary"])
+        conv_frame = ctk.CTkFrame(parent, fg_color=self.colors["bg_tertiary"])
+        self.styles.register(conv_frame, fg_color="bg_tertiary")
         conv_frame.pack(fill="both", expand=True, padx=5, pady=5)
         
-        ctk.CTkLabel(conv_frame, text="Unit Converter", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=10)
+        ctk.CTkLabel(conv_frame, text="Unit Converter", font=self.styles.font(16, "bold")).pack(pady=10)
         
-        # Conversion type selector
-        self.conv_type = ctk.CTkOptionMenu(conv_frame, values=["Length", "Weight", "Temperature", "Volume"])
+        # Conversion type selector, repopulates the unit menus on change
+        self.conv_type = ctk.CTkOptionMenu(conv_frame, values=units.categories(), command=self.set_conversion_category)
         self.conv_type.pack(pady=5)
         
         # Input
@@ -349,17 +620,187 @@ class AdvancedCalculator:
         self.conv_input.pack(pady=5)
         
         # From and To units
-        self.from_unit = ctk.CTkOptionMenu(conv_frame, values=["meter", "kilometer", "centimeter", "inch", "foot"])
+        unit_names = units.units(units.categories()[0])
+        self.from_unit = ctk.CTkOptionMenu(conv_frame, values=unit_names)
         self.from_unit.pack(pady=5)
         
-        self.to_unit = ctk.CTkOptionMenu(conv_frame, values=["meter", "kilometer", "centimeter", "inch", "foot"])
+        self.to_unit = ctk.CTkOptionMenu(conv_frame, values=unit_names)
         self.to_unit.pack(pady=5)
         
         ctk.CTkButton(conv_frame, text="Convert", command=self.convert_units).pack(pady=10)
+        ctk.CTkButton(conv_frame, text="Convert CSV column...", command=self.convert_csv).pack()
         
         self.conv_result = ctk.CTkLabel(conv_frame, text="")
         self.conv_result.pack(pady=10)
     
+    def create_graph_panel(self, parent):
+        # Expressions in x, separated by ';', plotted over a pannable canvas
+        graph_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        graph_frame.pack(fill="x", pady=(0, 5))
+        
+        self.graph_entry = ctk.CTkEntry(graph_frame, placeholder_text="sin(x); x**2/10")
+        self.graph_entry.grid(row=0, column=0, padx=2, pady=2, sticky="ew")
+        self.graph_entry.bind("<Return>", lambda event: self.plot_expressions())
+        
+        for i, (text, cmd) in enumerate([("Plot", self.plot_expressions), ("Fit", self.fit_graph)], start=1):
+            ctk.CTkButton(
+                graph_frame,
+                text=text,
+                width=50,
+                height=30,
+                font=self.styles.font(10),
+                command=cmd
+            ).grid(row=0, column=i, padx=2, pady=2)
+        graph_frame.grid_columnconfigure(0, weight=1)
+        
+        self.graph_status = ctk.CTkLabel(
+            parent,
+            text="Drag to pan, scroll to zoom",
+            font=self.styles.font(10),
+            text_color=self.colors["text_secondary"]
+        )
+        self.styles.register(self.graph_status, text_color="text_secondary")
+        self.graph_status.pack(fill="x")
+        
+        self.graph_canvas = tkinter.Canvas(parent, bg=self.colors["bg_tertiary"], highlightthickness=0)
+        self.styles.register(self.graph_canvas, bg="bg_tertiary")
+        self.graph_canvas.pack(fill="both", expand=True, padx=5, pady=5)
+        # Axes and curve lines are created once and moved with coords() on redraw
+        self.axis_items = (self.graph_canvas.create_line(0, 0, 0, 0), self.graph_canvas.create_line(0, 0, 0, 0))
+        
+        self.graph_canvas.bind("<Configure>", lambda event: self.schedule_graph_redraw())
+        self.graph_canvas.bind("<ButtonPress-1>", self.start_graph_drag)
+        self.graph_canvas.bind("<B1-Motion>", self.drag_graph)
+        self.graph_canvas.bind("<MouseWheel>", lambda event: self.zoom_graph(event, event.delta < 0))
+        self.graph_canvas.bind("<Button-4>", lambda event: self.zoom_graph(event, False))
+        self.graph_canvas.bind("<Button-5>", lambda event: self.zoom_graph(event, True))
+    
+    def create_statistics_panel(self, parent):
+        # Numbers typed in, or a file summarized in one streaming pass
+        stats_frame = ctk.CTkFrame(parent, fg_color=self.colors["bg_tertiary"])
+        self.styles.register(stats_frame, fg_color="bg_tertiary")
+        stats_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        ctk.CTkLabel(stats_frame, text="Statistics", font=self.styles.font(16, "bold")).pack(pady=10)
+        
+        ctk.CTkLabel(stats_frame, text="Numbers (comma or space separated):").pack()
+        self.stats_input = ctk.CTkTextbox(stats_frame, height=80)
+        self.stats_input.pack(fill="x", padx=10, pady=5)
+        
+        ctk.CTkButton(stats_frame, text="Summarize", command=self.summarize_numbers).pack(pady=5)
+        ctk.CTkButton(stats_frame, text="Summarize file...", command=self.summarize_file).pack()
+        
+        self.stats_result = ctk.CTkLabel(stats_frame, text="", justify="left", font=self.styles.font(12))
+        self.stats_result.pack(pady=10)
+    
+    def create_matrix_panel(self, parent):
+        # Operands A and B, one operation, a text preview of the result
+        matrix_frame = ctk.CTkFrame(parent, fg_color=self.colors["bg_tertiary"])
+        self.styles.register(matrix_frame, fg_color="bg_tertiary")
+        matrix_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        operand_frame = ctk.CTkFrame(matrix_frame, fg_color="transparent")
+        operand_frame.pack(fill="x", pady=5)
+        self.matrix_labels = {}
+        for row, name in enumerate(("A", "B")):
+            ctk.CTkButton(
+                operand_frame,
+                text=f"Load {name}...",
+                width=80,
+                height=28,
+                font=self.styles.font(10),
+                command=lambda n=name: self.load_matrix(n)
+            ).grid(row=row, column=0, padx=2, pady=2)
+            self.matrix_labels[name] = ctk.CTkLabel(operand_frame, text=f"{name}: empty", font=self.styles.font(10))
+            self.matrix_labels[name].grid(row=row, column=1, padx=5, sticky="w")
+        
+        op_frame = ctk.CTkFrame(matrix_frame, fg_color="transparent")
+        op_frame.pack(fill="x", pady=5)
+        self.matrix_operation = ctk.CTkOptionMenu(op_frame, values=list(matrix.OPERATIONS), width=120, height=28)
+        self.matrix_operation.grid(row=0, column=0, padx=2)
+        # Used by f(A); a Scientific function name or an expression in x
+        self.matrix_function = ctk.CTkComboBox(op_frame, values=matrix.FUNCTIONS, width=100, height=28)
+        self.matrix_function.grid(row=0, column=1, padx=2)
+        ctk.CTkButton(op_frame, text="Run", width=50, height=28, command=self.run_matrix_operation).grid(row=0, column=2, padx=2)
+        
+        # One text widget holds the preview, whatever the size of the result
+        self.matrix_result = ctk.CTkTextbox(matrix_frame, font=self.styles.font(11), wrap="none")
+        self.matrix_result.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        store_frame = ctk.CTkFrame(matrix_frame, fg_color="transparent")
+        store_frame.pack(fill="x", pady=(0, 5))
+        actions = [
+            ("→ A", lambda: self.store_matrix_result("A")),
+            ("→ B", lambda: self.store_matrix_result("B")),
+            ("MS", lambda: self.store_matrix_result("M")),
+            ("MR", self.recall_matrix_memory),
+            ("Save...", self.save_matrix_result)
+        ]
+        for i, (text, cmd) in enumerate(actions):
+            ctk.CTkButton(store_frame, text=text, width=50, height=28, font=self.styles.font(10), command=cmd).grid(row=0, column=i, padx=2)
+            store_frame.grid_columnconfigure(i, weight=1)
+    
+    def create_calculus_panel(self, parent):
+        # Solve, integrate or differentiate an expression in x
+        calc_frame = ctk.CTkFrame(parent, fg_color=self.colors["bg_tertiary"])
+        self.styles.register(calc_frame, fg_color="bg_tertiary")
+        calc_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        ctk.CTkLabel(calc_frame, text="Calculus", font=self.styles.font(16, "bold")).pack(pady=10)
+        
+        ctk.CTkLabel(calc_frame, text="f(x) or equation:").pack()
+        self.calculus_entry = ctk.CTkEntry(calc_frame, placeholder_text="x**3 - 2*x = 5")
+        self.calculus_entry.pack(fill="x", padx=10, pady=5)
+        
+        self.calculus_operation = ctk.CTkOptionMenu(
+            calc_frame, values=list(CALCULUS_OPERATIONS), command=self.set_calculus_operation
+        )
+        self.calculus_operation.pack(pady=5)
+        
+        bounds_frame = ctk.CTkFrame(calc_frame, fg_color="transparent")
+        bounds_frame.pack(pady=5)
+        self.calculus_bound_label = ctk.CTkLabel(bounds_frame, text="From")
+        self.calculus_bound_label.grid(row=0, column=0, padx=2)
+        self.calculus_a = ctk.CTkEntry(bounds_frame, width=80, placeholder_text="-100")
+        self.calculus_a.grid(row=0, column=1, padx=2)
+        self.calculus_to_label = ctk.CTkLabel(bounds_frame, text="to")
+        self.calculus_to_label.grid(row=0, column=2, padx=2)
+        self.calculus_b = ctk.CTkEntry(bounds_frame, width=80, placeholder_text="100")
+        self.calculus_b.grid(row=0, column=3, padx=2)
+        
+        ctk.CTkButton(calc_frame, text="Compute", command=self.run_calculus).pack(pady=10)
+        
+        self.calculus_result = ctk.CTkLabel(calc_frame, text="", wraplength=300)
+        self.calculus_result.pack(pady=10)
+    
+    def create_worksheet_panel(self, parent):
+        # Definitions on the left, their values on the same lines on the right
+        sheet_frame = ctk.CTkFrame(parent, fg_color=self.colors["bg_tertiary"])
+        self.styles.register(sheet_frame, fg_color="bg_tertiary")
+        sheet_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        ctk.CTkLabel(
+            sheet_frame, text="rate = 0.07   f(x) = x**2 + rate", font=self.styles.font(10),
+            text_color=self.colors["text_secondary"]
+        ).grid(row=0, column=0, columnspan=2, pady=5)
+        
+        self.sheet_input = ctk.CTkTextbox(sheet_frame, font=self.styles.font(12), wrap="none")
+        self.sheet_input.grid(row=1, column=0, padx=(5, 2), pady=5, sticky="nsew")
+        self.sheet_input.bind("<KeyRelease>", lambda event: self.schedule_worksheet_refresh())
+        self.sheet_input.bind("<<Paste>>", lambda event: self.schedule_worksheet_refresh())
+        
+        self.sheet_output = ctk.CTkTextbox(
+            sheet_frame, font=self.styles.font(12), wrap="none", width=120,
+            text_color=self.colors["accent_blue"]
+        )
+        self.styles.register(self.sheet_output, text_color="accent_blue")
+        self.sheet_output.grid(row=1, column=1, padx=(2, 5), pady=5, sticky="nsew")
+        
+        sheet_frame.grid_rowconfigure(1, weight=1)
+        sheet_frame.grid_columnconfigure(0, weight=3)
+        sheet_frame.grid_columnconfigure(1, weight=2)
+    
+    @instrumentation.timed
     def create_calc_button(self, parent, text, row, col, command):
         # Determine button style based on text
         if text in ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "."]:
@@ -371,27 +812,24 @@ class AdvancedCalculator:
         else:
             style = "function"
         
-        colors = {
-            "number": {"fg": self.colors["bg_tertiary"], "hover": self.colors["accent_blue"]},
-            "operator": {"fg": self.colors["accent_orange"], "hover": "#fbbf24"},
-            "clear": {"fg": self.colors["accent_red"], "hover": "#f87171"},
-            "function": {"fg": self.colors["accent_purple"], "hover": "#a855f7"}
-        }
+        colors = self.styles.button_style(style)
         
         btn = ctk.CTkButton(
             parent,
             text=text,
             command=command,
-            font=ctk.CTkFont(size=14, weight="bold"),
+            font=self.styles.font(14, "bold"),
             height=50,
             corner_radius=10,
-            fg_color=colors[style]["fg"],
-            hover_color=colors[style]["hover"]
+            fg_color=colors["fg"],
+            hover_color=colors["hover"]
         )
+        self.styles.register_button(btn, style)
         btn.grid(row=row, column=col, padx=2, pady=2, sticky="nsew")
     
     # Calculator functions
     def add_to_expression(self, value):
+        self.cancel_evaluation()
         if self.current_expression == "0" or self.display_var.get() == "Error":
             self.current_expression = ""
         
@@ -399,6 +837,7 @@ class AdvancedCalculator:
         self.update_display()
     
     def add_function(self, func):
+        self.cancel_evaluation()
         if self.current_expression == "0" or self.display_var.get() == "Error":
             self.current_expression = ""
         
@@ -414,10 +853,24 @@ class AdvancedCalculator:
         self.update_display()
     
     def add_hex_digit(self, digit):
-        if self.current_base == "HEX":
+        if self.core.current_base == "HEX":
             self.add_to_expression(digit)
     
+    @instrumentation.timed
     def update_display(self):
+        # Schedule one refresh for the whole burst of input in this frame
+        if not self.display_pending:
+            self.display_pending = True
+            self.window.after(FRAME_MS, self.refresh_display)
+    
+    @instrumentation.timed
+    def refresh_display(self):
+        if not self.display_pending:
+            return  # Superseded by a direct display update
+        self.display_pending = False
+        self.redraw_count += 1
+        self.clear_lazy_result()
+        
         display_text = self.current_expression.replace("*", "×").replace("/", "÷")
         display_text = display_text.replace("math.pi", "π").replace("math.e", "e")
         self.expression_display.configure(text=display_text)
@@ -425,197 +878,1001 @@ class AdvancedCalculator:
         if len(display_text) > 15:
             display_text = "..." + display_text[-15:]
         self.display_var.set(display_text if display_text else "0")
+        self.update_preview()
+    
+    def update_preview(self):
+        # Programming mode uses integer semantics the float preview does not share
+        if self.current_mode == "Programming":
+            value = None
+        else:
+            value = self.preview.update(self.current_expression)
+        text = f"= {value}" if value is not None and str(value) != self.current_expression else ""
+        if text != self.preview_label.cget("text"):
+            self.preview_label.configure(text=text)
     
     def clear(self):
+        self.cancel_evaluation()
+        self.display_pending = False
         self.current_expression = ""
         self.display_var.set("0")
         self.expression_display.configure(text="")
+        self.update_preview()
     
     def clear_entry(self):
+        self.cancel_evaluation()
+        self.display_pending = False
         self.current_expression = ""
         self.display_var.set("0")
+        self.update_preview()
     
     def backspace(self):
+        self.cancel_evaluation()
         if self.current_expression:
             self.current_expression = self.current_expression[:-1]
         self.update_display()
     
     def toggle_sign(self):
+        self.cancel_evaluation()
         try:
             current = float(self.display_var.get())
             result = -current
+            self.display_pending = False
             self.current_expression = str(result)
             self.display_var.set(str(result))
-        except:
-            pass
+            self.update_preview()
+        except ValueError as exc:
+            instrumentation.error("toggle_sign", exc)
     
     def reciprocal(self):
         try:
             current = float(self.display_var.get())
             if current != 0:
-                result = 1 / current
-                self.current_expression = str(result)
-                self.display_var.set(str(result))
-        except:
-            pass
+                self.run_in_worker("reciprocal", (current,), self.show_result)
+        except ValueError as exc:
+            instrumentation.error("reciprocal", exc)
     
     def factorial(self):
         try:
             current = int(float(self.display_var.get()))
             if current >= 0:
-                result = math.factorial(current)
-                self.current_expression = str(result)
-                self.display_var.set(str(result))
-        except:
-            pass
+                self.run_in_worker("factorial", (current,), self.show_result)
+        except (ValueError, OverflowError) as exc:
+            instrumentation.error("factorial", exc)
     
+    @instrumentation.timed
     def calculate(self):
-        try:
-            if not self.current_expression:
-                return
-            
-            expression = self.current_expression
-            
-            # Handle angle conversions for trig functions
-            if self.angle_mode == "DEG":
-                expression = expression.replace("math.sin(", "math.sin(math.radians(")
-                expression = expression.replace("math.cos(", "math.cos(math.radians(")
-                expression = expression.replace("math.tan(", "math.tan(math.radians(")
-            elif self.angle_mode == "GRAD":
-                expression = expression.replace("math.sin(", "math.sin(math.radians(")
-                expression = expression.replace("math.cos(", "math.cos(math.radians(")
-                expression = expression.replace("math.tan(", "math.tan(math.radians(")
-                # Convert gradians to degrees first
-                # This is simplified - you'd need more complex parsing
-            
-            # Handle missing parentheses
-            open_parens = expression.count("(")
-            close_parens = expression.count(")")
-            missing_parens = open_parens - close_parens
-            expression += ")" * missing_parens
-            
-            # Evaluate
-            result = eval(expression)
-            
-            if result == float('inf') or result == float('-inf'):
-                raise ZeroDivisionError
-            
-            # Format result
-            if isinstance(result, float):
-                if result == int(result):
-                    result = int(result)
-                else:
-                    result = round(result, 10)
-                    result = f"{result:g}"
-            
-            # Add to history
-            self.history.append(f"{self.current_expression} = {result}")
-            if len(self.history) > 50:  # Keep last 50 calculations
-                self.history.pop(0)
+        if not self.current_expression:
+            return
+        
+        # Parsing, angle conversion and caching happen in the worker process
+        expression = self.current_expression
+        
+        if self.current_mode == "Programming":
+            def on_integer_result(results):
+                self.core.add_history(expression, results[self.core.current_base])
+                self.history_appended()
+                self.show_result(results[self.core.current_base])
+                self.show_bases(results)
+                self.expression_display.configure(text="")
             
-            self.current_expression = str(result)
-            self.display_var.set(str(result))
+            self.run_in_worker(
+                "evaluate_integer",
+                (expression, self.core.current_base, self.core.word_size, self.core.signed),
+                on_integer_result
+            )
+            return
+        
+        def on_result(result):
+            self.core.add_history(expression, result)
+            self.history_appended()
+            self.show_result(result)
             self.expression_display.configure(text="")
-            
-        except ZeroDivisionError:
-            self.display_var.set("Cannot divide by zero")
+        
+        sheet = self.core._worksheet  # None until the sheet is first used
+        if sheet is not None and sheet.references(expression):
+            # Only the definitions this expression needs travel to the worker
+            definitions = sheet.definitions_for(expression)
+            self.run_in_worker("evaluate_worksheet", (expression, self.core.angle_mode, definitions), on_result)
+            return
+        
+        precision_args = (self.core.angle_mode, self.core.precision, self.core.precision_digits)
+        self.run_in_worker("evaluate", (expression,) + precision_args, on_result)
+    
+    # Keyboard and clipboard input
+    def bind_keys(self):
+        self.window.bind("<Key>", self.on_key)
+        self.window.bind("<<Paste>>", self.paste)
+        self.window.bind("<Control-v>", self.paste)
+        # Hidden diagnostics window
+        self.window.bind("<Control-D>", lambda event: self.open_diagnostics())
+    
+    def on_key(self, event):
+        # Leave typing in the date/converter entry fields alone
+        if event.widget.winfo_class() in ("Entry", "Text"):
+            return None
+        
+        key = event.keysym
+        if key in ("Return", "KP_Enter") or event.char == "=":
+            self.calculate()
+        elif key == "BackSpace":
+            self.backspace()
+        elif key == "Escape":
+            self.clear()
+        elif key == "Delete":
+            self.clear_entry()
+        elif event.char and (event.state & CONTROL_MASK) == 0:
+            text = self.normalize_input(event.char)
+            if not text:
+                return None
+            self.add_to_expression(text)
+        else:
+            return None
+        return "break"
+    
+    def paste(self, event=None):
+        if event is not None and event.widget.winfo_class() in ("Entry", "Text"):
+            return None
+        try:
+            text = self.window.clipboard_get()
+        except TclError:
+            return "break"
+        text = self.normalize_input(text)
+        if text:
+            # One append and one display refresh for the whole paste
+            self.add_to_expression(text)
+        return "break"
+    
+    def normalize_input(self, text):
+        text = text.translate(INPUT_SYMBOLS)
+        if self.current_mode == "Programming":
+            allowed = PROGRAMMING_INPUT
+            if self.core.current_base == "HEX":
+                allowed = PROGRAMMING_INPUT | HEX_DIGITS
+                text = text.upper()
+        else:
+            allowed = EXPRESSION_INPUT
+            text = text.replace("^", "**")
+        return "".join(ch for ch in text if ch in allowed)
+    
+    # Worker helpers
+    def run_in_worker(self, task, args, on_result, on_error=None, timeout=None):
+        self.busy_indicator.configure(text="⏳")
+        started = time.perf_counter()
+        
+        def done(result):
+            instrumentation.record(f"worker.{task}", started)
+            self.busy_indicator.configure(text="")
+            on_result(result)
+        
+        def failed(error):
+            instrumentation.record(f"worker.{task}", started, failed=True)
+            self.busy_indicator.configure(text="")
+            (on_error or self.show_error)(error)
+        
+        self.worker.submit(task, args, done, failed, timeout)
+    
+    def cancel_evaluation(self):
+        if self.worker.busy:
+            self.worker.cancel()
+            self.busy_indicator.configure(text="")
+    
+    def show_result(self, result):
+        self.display_pending = False
+        if isinstance(result, LazyResult):
+            # Summary now, the full digits only when asked for
+            self.lazy_result = result
             self.current_expression = ""
-        except:
+            self.digits_button.pack(pady=(0, 6))
+        else:
+            self.clear_lazy_result()
+            self.current_expression = str(result)
+        self.display_var.set(str(result))
+        self.update_preview()
+    
+    def clear_lazy_result(self):
+        if self.lazy_result is not None:
+            self.lazy_result = None
+            self.digits_button.pack_forget()
+    
+    def show_all_digits(self):
+        if self.lazy_result is None:
+            return
+        result = self.lazy_result
+        self.run_in_worker(
+            "full_digits",
+            (result.value,),
+            lambda text: self.open_digits_window(result.summary, text),
+            lambda error: messagebox.showwarning("Digits unavailable", "Rendering all digits did not finish"),
+            timeout=FULL_DIGITS_TIMEOUT
+        )
+    
+    def open_digits_window(self, title, text):
+        window = ctk.CTkToplevel(self.window)
+        window.title(title)
+        window.geometry("480x360")
+        textbox = ctk.CTkTextbox(window, font=self.styles.font(11), wrap="char")
+        textbox.pack(fill="both", expand=True, padx=8, pady=(8, 4))
+        textbox.insert("1.0", text)
+        textbox.configure(state="disabled")
+        
+        def copy():
+            self.window.clipboard_clear()
+            self.window.clipboard_append(text)
+        
+        ctk.CTkButton(window, text="Copy", width=80, command=copy).pack(pady=(0, 8))
+    
+    # Diagnostics
+    def open_diagnostics(self):
+        window = ctk.CTkToplevel(self.window)
+        window.title("Diagnostics")
+        window.geometry("560x420")
+        textbox = ctk.CTkTextbox(window, font=self.styles.font(11, family="Courier"), wrap="none")
+        textbox.pack(fill="both", expand=True, padx=8, pady=(8, 4))
+        
+        def refresh():
+            textbox.delete("1.0", "end")
+            textbox.insert("1.0", instrumentation.format_report())
+        
+        def set_recording():
+            if recording.get():
+                instrumentation.enable()
+            else:
+                instrumentation.disable()
+        
+        def reset():
+            instrumentation.reset()
+            refresh()
+        
+        def export():
+            path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+            if path:
+                instrumentation.dump(path)
+        
+        def tick():
+            # Live while recording, one refresh per second
+            if window.winfo_exists():
+                if instrumentation.ENABLED:
+                    refresh()
+                window.after(1000, tick)
+        
+        controls = ctk.CTkFrame(window, fg_color="transparent")
+        controls.pack(pady=(0, 8))
+        recording = ctk.BooleanVar(value=instrumentation.ENABLED)
+        ctk.CTkSwitch(controls, text="Record", variable=recording, command=set_recording).grid(row=0, column=0, padx=4)
+        for i, (text, cmd) in enumerate([("Refresh", refresh), ("Reset", reset), ("Export JSON...", export)], start=1):
+            ctk.CTkButton(controls, text=text, width=90, command=cmd).grid(row=0, column=i, padx=4)
+        refresh()
+        window.after(1000, tick)
+    
+    def show_error(self, error):
+        self.display_pending = False
+        self.clear_lazy_result()
+        if error == ZERO_DIVISION:
+            self.display_var.set("Cannot divide by zero")
+        elif error == TIMEOUT:
+            self.display_var.set("Timed out")
+        elif error == TOO_LARGE:
+            self.display_var.set("Result too large")
+        else:
             self.display_var.set("Error")
-            self.current_expression = ""
+        self.current_expression = ""
+        self.update_preview()
     
     # Memory functions
     def memory_clear(self):
-        self.memory = 0
+        self.core.memory_clear()
         self.memory_indicator.configure(text="")
     
     def memory_recall(self):
-        self.current_expression = str(self.memory)
-        self.display_var.set(str(self.memory))
+        memory = self.core.memory_recall()
+        self.display_pending = False
+        self.current_expression = str(memory)
+        self.display_var.set(str(memory))
+        self.update_preview()
     
     def memory_add(self):
         try:
             current = float(self.display_var.get())
-            self.memory += current
+            self.core.memory_add(current)
             self.memory_indicator.configure(text="M")
-        except:
-            pass
+        except ValueError as exc:
+            instrumentation.error("memory_add", exc)
     
     def memory_subtract(self):
         try:
             current = float(self.display_var.get())
-            self.memory -= current
+            self.core.memory_subtract(current)
             self.memory_indicator.configure(text="M")
-        except:
-            pass
+        except ValueError as exc:
+            instrumentation.error("memory_subtract", exc)
     
     def memory_store(self):
         try:
             current = float(self.display_var.get())
-            self.memory = current
+            self.core.memory_store(current)
             self.memory_indicator.configure(text="M")
-        except:
-            pass
+        except ValueError as exc:
+            instrumentation.error("memory_store", exc)
+    
+    # History functions
+    def export_history(self):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            self.core.history.export(path)
+        except OSError as exc:
+            messagebox.showerror("Export failed", str(exc))
+    
+    def import_history(self):
+        path = filedialog.askopenfilename(
+            filetypes=[("JSON Lines", "*.jsonl"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            count = self.core.history.import_file(path)
+            self.history_appended()
+            messagebox.showinfo("History imported", f"{count} entries imported")
+        except OSError as exc:
+            messagebox.showerror("Import failed", str(exc))
+    
+    def create_history_drawer(self):
+        # Shown in place of the button panel; filter on top, rows below
+        self.history_frame = ctk.CTkFrame(self.button_frame, fg_color=self.colors["bg_tertiary"])
+        self.styles.register(self.history_frame, fg_color="bg_tertiary")
+        
+        self.history_search = ctk.CTkEntry(self.history_frame, placeholder_text="Filter history")
+        self.history_search.pack(fill="x", padx=5, pady=5)
+        self.history_search.bind("<KeyRelease>", lambda event: self.schedule_history_refresh())
+        
+        self.history_count = ctk.CTkLabel(
+            self.history_frame, text="", font=self.styles.font(10),
+            text_color=self.colors["text_secondary"]
+        )
+        self.styles.register(self.history_count, text_color="text_secondary")
+        self.history_count.pack(side="bottom", fill="x")
+        
+        self.history_scrollbar = ctk.CTkScrollbar(self.history_frame, command=self.scroll_history)
+        self.history_scrollbar.pack(side="right", fill="y", pady=5)
+        
+        self.history_canvas = tkinter.Canvas(self.history_frame, bg=self.colors["bg_tertiary"], highlightthickness=0)
+        self.styles.register(self.history_canvas, bg="bg_tertiary")
+        self.history_canvas.pack(fill="both", expand=True, padx=5, pady=5)
+        self.history_canvas.bind("<Configure>", lambda event: self.render_history())
+        self.history_canvas.bind("<Button-1>", self.recall_history)
+        self.history_canvas.bind("<MouseWheel>", lambda event: self.scroll_history("scroll", 3 if event.delta < 0 else -3, "units"))
+        self.history_canvas.bind("<Button-4>", lambda event: self.scroll_history("scroll", -3, "units"))
+        self.history_canvas.bind("<Button-5>", lambda event: self.scroll_history("scroll", 3, "units"))
+        
+        self.history_view = history.HistoryView(self.core.history)
+    
+    def toggle_history(self):
+        if self.history_open:
+            self.history_frame.pack_forget()
+            self.active_panel.pack(fill="both", expand=True)
+            self.history_open = False
+            return
+        if self.history_view is None:
+            self.create_history_drawer()
+        # Pick up entries loaded or imported since the drawer was last open
+        self.history_view.sync()
+        self.history_top = 0
+        self.active_panel.pack_forget()
+        self.history_frame.pack(fill="both", expand=True)
+        self.history_open = True
+        self.render_history()
+        self.history_search.focus_set()
+    
+    def history_appended(self):
+        # New entries become row 0; nothing is rebuilt, only visible rows redrawn
+        if self.history_view is None:
+            return
+        added = self.history_view.sync()
+        if added and self.history_top:
+            self.history_top += added  # Keep a scrolled view on the same rows
+        if self.history_open:
+            self.render_history()
+    
+    def schedule_history_refresh(self):
+        # Filter once per frame however fast the query is typed
+        if not self.history_pending:
+            self.history_pending = True
+            self.window.after(FRAME_MS, self.refresh_history)
+    
+    def refresh_history(self):
+        self.history_pending = False
+        self.history_view.sync()
+        self.history_view.set_query(self.history_search.get())
+        self.history_top = 0
+        self.render_history()
+    
+    def history_visible_rows(self):
+        return max(1, self.history_canvas.winfo_height() // HISTORY_ROW_HEIGHT)
+    
+    def scroll_history(self, action, amount, unit=None):
+        visible = self.history_visible_rows()
+        if action == "moveto":
+            top = int(float(amount) * len(self.history_view))
+        else:
+            # Scrollbar wheel steps may be fractional; move at least one row
+            step = max(1, abs(int(float(amount)))) * (1 if float(amount) > 0 else -1)
+            top = self.history_top + step * (visible if unit == "pages" else 1)
+        self.history_top = max(0, min(top, len(self.history_view) - visible))
+        self.render_history()
+    
+    def render_history(self):
+        canvas = self.history_canvas
+        width = canvas.winfo_width()
+        visible = self.history_visible_rows()
+        # The pool only grows with the canvas height; scrolling retexts it
+        while len(self.history_rows) <= visible:
+            y = len(self.history_rows) * HISTORY_ROW_HEIGHT + HISTORY_ROW_HEIGHT // 2
+            self.history_rows.append((
+                canvas.create_text(6, y, anchor="w", font=self.styles.font(11)),
+                canvas.create_text(width - 6, y, anchor="e", font=self.styles.font(11, "bold"))
+            ))
+        
+        view, top = self.history_view, self.history_top
+        chars = max(8, width // 8)  # Rough fit, expression gets 60%
+        for i, (expression_item, result_item) in enumerate(self.history_rows):
+            row = top + i
+            expression, result = view[row] if row < len(view) and i <= visible else ("", "")
+            if len(expression) > chars * 3 // 5:
+                expression = expression[:chars * 3 // 5 - 1] + "…"
+            if len(result) > chars * 2 // 5:
+                result = result[:chars * 2 // 5 - 1] + "…"
+            canvas.itemconfigure(expression_item, text=expression, fill=self.colors["text_secondary"])
+            canvas.itemconfigure(result_item, text=f"= {result}" if result else "", fill=self.colors["text_primary"])
+            canvas.coords(result_item, width - 6, i * HISTORY_ROW_HEIGHT + HISTORY_ROW_HEIGHT // 2)
+        
+        total = len(view)
+        if total:
+            self.history_scrollbar.set(top / total, min(1.0, (top + visible) / total))
+        else:
+            self.history_scrollbar.set(0.0, 1.0)
+        self.history_count.configure(text=f"{total:,} entries" if not view.query else f"{total:,} matches")
+    
+    def recall_history(self, event):
+        row = self.history_top + event.y // HISTORY_ROW_HEIGHT
+        if row >= len(self.history_view):
+            return
+        self.cancel_evaluation()
+        self.current_expression = self.history_view[row][0]
+        self.display_pending = True
+        self.refresh_display()
+        self.toggle_history()
     
     # Mode functions
     def set_angle_mode(self, mode):
-        self.angle_mode = mode
-        self.mode_label.configure(text=f"{self.current_mode} | {self.angle_mode}")
-        # Update button colors
-        self.switch_mode(self.current_mode)
+        self.core.angle_mode = mode
+        self.preview.set_angle_mode(mode)
+        self.update_preview()
+        self.mode_label.configure(text=f"{self.current_mode} | {self.core.angle_mode}")
+        # Update button colors in place
+        self.highlight_button(self.angle_buttons, mode, self.colors["accent_green"])
+        if self.graph is not None:
+            self.graph.set_angle_mode(mode)
+            self.schedule_graph_redraw()
+        if "Worksheet" in self.panels:
+            # The sheet recompiles for the new angle mode; re-render every line
+            self.sheet_lines = []
+            self.schedule_worksheet_refresh()
     
     def set_base_mode(self, base):
-        self.current_base = base
-        # Update button colors and availability
-        self.switch_mode(self.current_mode)
+        old_base = self.core.current_base
+        self.core.current_base = base
+        # Update button colors in place
+        self.highlight_button(self.base_buttons, base, self.colors["accent_orange"])
+        # Re-render a plain number in the new base
+        self.convert_displayed_number(old_base)
+    
+    def set_precision(self, choice):
+        self.core.precision, self.core.precision_digits = PRECISION_CHOICES[choice]
+    
+    def precision_choice(self):
+        for choice, setting in PRECISION_CHOICES.items():
+            if setting[0] == self.core.precision and (
+                    setting[0] != "decimal" or setting[1] == self.core.precision_digits):
+                return choice
+        return "Float"
+    
+    def set_word_size(self, bits):
+        self.core.word_size = bits
+        self.convert_displayed_number(self.core.current_base)
+    
+    def set_signed(self, signed):
+        self.core.signed = signed
+        self.convert_displayed_number(self.core.current_base)
+    
+    def convert_displayed_number(self, old_base):
+        try:
+            value = programmer.parse_value(
+                self.current_expression, old_base, self.core.word_size, self.core.signed
+            )
+        except ValueError:
+            return
+        results = programmer.format_all(value, self.core.word_size, self.core.signed)
+        self.show_result(results[self.core.current_base])
+        self.show_bases(results)
+    
+    def show_bases(self, results):
+        self.base_display.configure(
+            text="   ".join(f"{base} {results[base]}" for base in programmer.BASES)
+        )
     
     # Date calculator
+    @instrumentation.timed
     def calculate_date_difference(self):
         try:
-            date1_str = self.date1_entry.get()
-            date2_str = self.date2_entry.get()
-            
-            date1 = datetime.datetime.strptime(date1_str, "%Y-%m-%d")
-            date2 = datetime.datetime.strptime(date2_str, "%Y-%m-%d")
-            
-            diff = abs((date2 - date1).days)
-            years = diff // 365
-            months = (diff % 365) // 30
-            days = (diff % 365) % 30
+            holidays = [h for h in self.holidays_entry.get().replace(" ", "").split(",") if h]
+            diff = self.core.date_difference(
+                self.date1_entry.get(), self.date2_entry.get(), holidays
+            )
             
-            result = f"Difference: {diff} days\n({years} years, {months} months, {days} days)"
+            result = (f"Difference: {diff.total_days} days\n"
+                      f"({diff.years} years, {diff.months} months, {diff.days} days)\n"
+                      f"{diff.business_days} business days")
             self.date_result.configure(text=result)
-        except:
+        except ValueError as exc:
+            instrumentation.error("calculate_date_difference", exc)
             self.date_result.configure(text="Invalid date format")
     
     # Unit converter
+    @instrumentation.timed
     def convert_units(self):
         try:
             value = float(self.conv_input.get())
-            from_u = self.from_unit.get()
-            to_u = self.to_unit.get()
-            
-            # Simple length conversion (you'd expand this)
-            conversions = {
-                "meter": 1,
-                "kilometer": 1000,
-                "centimeter": 0.01,
-                "inch": 0.0254,
-                "foot": 0.3048
-            }
-            
-            if from_u in conversions and to_u in conversions:
-                meters = value * conversions[from_u]
-                result = meters / conversions[to_u]
+        except ValueError as exc:
+            instrumentation.error("convert_units", exc)
+            self.conv_result.configure(text="Invalid input")
+            return
+        category = self.conv_type.get()
+        from_u = self.from_unit.get()
+        to_u = self.to_unit.get()
+        
+        def on_result(result):
+            if result is not None:
                 self.conv_result.configure(text=f"{value} {from_u} = {result:.6g} {to_u}")
             else:
                 self.conv_result.configure(text="Conversion not available")
-        except:
-            self.conv_result.configure(text="Invalid input")
+        
+        def on_error(error):
+            self.conv_result.configure(text="Timed out" if error == TIMEOUT else "Invalid input")
+        
+        self.run_in_worker("convert_units", (value, from_u, to_u, category), on_result, on_error)
+    
+    def set_conversion_category(self, category):
+        unit_names = units.units(category)
+        self.from_unit.configure(values=unit_names)
+        self.from_unit.set(unit_names[0])
+        self.to_unit.configure(values=unit_names)
+        self.to_unit.set(unit_names[1] if len(unit_names) > 1 else unit_names[0])
+        self.conv_result.configure(text="")
+    
+    def convert_csv(self):
+        src = filedialog.askopenfilename(filetypes=[("CSV", "*.csv"), ("All files", "*.*")])
+        if not src:
+            return
+        column = ctk.CTkInputDialog(text="Column to convert:", title="Convert CSV").get_input()
+        if not column:
+            return
+        dst = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not dst:
+            return
+        category = self.conv_type.get()
+        from_u = self.from_unit.get()
+        to_u = self.to_unit.get()
+        self.conv_result.configure(text="Converting...")
+        
+        # Large files are converted on a thread; the result is posted back via after()
+        def run():
+            try:
+                rows = units.convert_csv(src, dst, column, from_u, to_u, category)
+                text = f"Converted {rows:,} rows to {to_u}"
+            except (OSError, ValueError, KeyError, StopIteration) as exc:
+                text = f"CSV conversion failed: {exc}"
+            self.window.after(0, lambda: self.conv_result.configure(text=text))
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    # Matrix mode
+    def load_matrix(self, name):
+        path = filedialog.askopenfilename(filetypes=[("Matrices", "*.csv *.npy"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            value = matrix.load(path)
+        except (OSError, ValueError, ImportError) as exc:
+            self.show_matrix_text(f"Cannot load {os.path.basename(path)}: {exc}")
+            return
+        self.core.matrix_store(name, value)
+        self.update_matrix_labels()
+    
+    def update_matrix_labels(self):
+        for name, label in self.matrix_labels.items():
+            value = self.core.matrix_recall(name)
+            if value is None:
+                shape = "empty"
+            else:
+                shape = "×".join(str(n) for n in getattr(value, "shape", ())) or "scalar"
+            label.configure(text=f"{name}: {shape}")
+    
+    def run_matrix_operation(self):
+        function, operands = matrix.OPERATIONS[self.matrix_operation.get()]
+        args = [self.core.matrix_recall(name) for name in ("A", "B")[:operands]]
+        if any(arg is None for arg in args):
+            self.show_matrix_text("Load " + " and ".join(("A", "B")[:operands]) + " first")
+            return
+        if function is matrix.apply:
+            args = [self.matrix_function.get().strip(), args[0], self.core.angle_mode]
+        self.show_matrix_text("Computing...")
+        
+        # LAPACK releases the GIL, so a thread keeps the mainloop responsive
+        def run():
+            try:
+                result = function(*args)
+                self.core.matrix_store("ANS", result)
+                text = matrix.preview(result)
+            except (ValueError, ArithmeticError, SyntaxError, MemoryError) as exc:
+                text = f"Error: {exc}"
+            self.window.after(0, lambda: self.show_matrix_text(text))
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def show_matrix_text(self, text):
+        self.matrix_result.delete("1.0", "end")
+        self.matrix_result.insert("1.0", text)
+    
+    def store_matrix_result(self, name):
+        result = self.core.matrix_recall("ANS")
+        if result is None:
+            return
+        self.core.matrix_store(name, result)
+        if name == "M":
+            self.memory_indicator.configure(text="M")
+        self.update_matrix_labels()
+    
+    def recall_matrix_memory(self):
+        memory = self.core.matrix_recall("M")
+        if memory is not None:
+            self.core.matrix_store("ANS", memory)
+            self.show_matrix_text(matrix.preview(memory))
+    
+    def save_matrix_result(self):
+        result = self.core.matrix_recall("ANS")
+        if result is None:
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".npy", filetypes=[("NumPy", "*.npy"), ("CSV", "*.csv")])
+        if not path:
+            return
+        try:
+            matrix.save(path, result)
+        except OSError as exc:
+            messagebox.showerror("Save failed", str(exc))
+    
+    # Worksheet
+    def schedule_worksheet_refresh(self):
+        # A burst of keystrokes is applied once per frame
+        if not self.sheet_pending:
+            self.sheet_pending = True
+            self.window.after(FRAME_MS, self.refresh_worksheet)
+    
+    def refresh_worksheet(self):
+        self.sheet_pending = False
+        sheet = self.core.worksheet
+        lines = self.sheet_input.get("1.0", "end-1c").split("\n")
+        old_lines = self.sheet_lines
+        
+        def name_of(line):
+            try:
+                return worksheet.parse_definition(line)[0]
+            except worksheet.WorksheetError:
+                return None
+        
+        names = [name_of(line) for line in lines]
+        if not old_lines:
+            # First refresh or angle change: the sheet may hold stale names
+            stale = set(sheet.cells)
+        else:
+            stale = {name_of(line) for line in old_lines} - {None}
+        recomputed = set()
+        for name in stale - set(names):
+            recomputed.update(sheet.remove(name))
+        
+        errors = {}
+        changed = set()
+        for i, line in enumerate(lines):
+            if i < len(old_lines) and old_lines[i] == line:
+                continue
+            changed.add(i)
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            try:
+                recomputed.update(sheet.define(line))
+            except worksheet.WorksheetError as exc:
+                errors[i] = str(exc)
+        
+        # Re-render only lines that changed or whose value was recomputed
+        results = self.sheet_results[:len(lines)] + [""] * (len(lines) - len(self.sheet_results))
+        for i, name in enumerate(names):
+            if i in changed or name in recomputed:
+                results[i] = errors.get(i) or self.render_sheet_cell(name)
+        self.sheet_lines, self.sheet_results = lines, results
+        
+        self.sheet_output.delete("1.0", "end")
+        self.sheet_output.insert("1.0", "\n".join(results))
+    
+    def render_sheet_cell(self, name):
+        cell = self.core.worksheet.cells.get(name)
+        if cell is None:
+            return ""
+        if cell.error is not None:
+            return cell.error
+        if cell.params is not None:
+            return f"{name}({', '.join(cell.params)})"
+        try:
+            value = engine.format_result(cell.value)
+        except (OverflowError, ValueError):
+            return str(cell.value)  # inf and nan
+        value = precision.render(value)
+        if isinstance(value, int):
+            return precision.full_digits(value)  # Past the 4300-digit str() limit
+        return str(value)  # Including a LazyResult summary
+    
+    # Calculus
+    def set_calculus_operation(self, choice):
+        operation, bound_label = CALCULUS_OPERATIONS[choice]
+        self.calculus_bound_label.configure(text=bound_label)
+        # A derivative needs a single point
+        if operation == "derivative":
+            self.calculus_to_label.grid_remove()
+            self.calculus_b.grid_remove()
+        else:
+            self.calculus_to_label.grid()
+            self.calculus_b.grid()
+        self.calculus_result.configure(text="")
+    
+    def run_calculus(self):
+        operation = CALCULUS_OPERATIONS[self.calculus_operation.get()][0]
+        expression = self.calculus_entry.get().translate(INPUT_SYMBOLS).replace("^", "**")
+        try:
+            a = float(self.calculus_a.get() or (0 if operation == "derivative" else -100))
+            b = float(self.calculus_b.get() or 100)
+        except ValueError:
+            self.calculus_result.configure(text="Invalid bounds")
+            return
+        if operation == "derivative":
+            args = (operation, expression, a, 1, self.core.angle_mode)
+        else:
+            args = (operation, expression, a, b, self.core.angle_mode)
+        
+        def on_result(result):
+            if operation == "solve":
+                roots = ", ".join(f"{root:.12g}" for root in result.values[:20])
+                text = f"x = {roots}" if roots else "No root found in range"
+                if len(result.values) > 20:
+                    text += f" ... ({len(result.values)} roots)"
+            else:
+                text = f"{result.value:.12g}  (± {result.error:.1g})"
+            self.calculus_result.configure(text=f"{text}\n{result.evaluations:,} evaluations")
+        
+        def on_error(error):
+            self.calculus_result.configure(text="Timed out" if error == TIMEOUT else "Error")
+        
+        self.calculus_result.configure(text="")
+        self.run_in_worker("calculus", args, on_result, on_error)
+    
+    # Statistics
+    def summarize_numbers(self):
+        try:
+            summary = stats.summarize_text(self.stats_input.get("1.0", "end"))
+        except ImportError:
+            self.stats_result.configure(text="Statistics require NumPy")
+            return
+        self.stats_result.configure(text=stats.format_summary(summary))
+    
+    def summarize_file(self):
+        path = filedialog.askopenfilename(filetypes=[("CSV", "*.csv"), ("Text", "*.txt"), ("All files", "*.*")])
+        if not path:
+            return
+        # Blank column: every number in the file counts
+        column = ctk.CTkInputDialog(text="CSV column (blank for all numbers):", title="Summarize file").get_input()
+        if column is None:
+            return
+        self.stats_result.configure(text="Summarizing...")
+        
+        # Big files are read on a thread with one process per core; the result is posted back via after()
+        def run():
+            try:
+                summary = stats.summarize_file(path, column.strip() or None, workers=os.cpu_count() or 1)
+                text = f"{os.path.basename(path)}\n{stats.format_summary(summary)}"
+            except (OSError, ValueError, ImportError) as exc:
+                text = f"Summary failed: {exc}"
+            self.window.after(0, lambda: self.stats_result.configure(text=text))
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    # Graph mode
+    def plot_expressions(self):
+        text = self.graph_entry.get().translate(INPUT_SYMBOLS).replace("^", "**")
+        expressions = [part.strip() for part in text.split(";") if part.strip()]
+        if not expressions:
+            return
+        try:
+            graph = graphing.Graph(expressions, self.core.angle_mode)
+        except (SyntaxError, ValueError) as exc:
+            self.graph_status.configure(text=f"Cannot plot: {exc}")
+            return
+        except ImportError:
+            self.graph_status.configure(text="Graphing requires NumPy")
+            return
+        if self.graph is not None:
+            # Keep the current view when the expressions change
+            graph.x0, graph.x1, graph.y0, graph.y1 = self.graph.x0, self.graph.x1, self.graph.y0, self.graph.y1
+        self.graph = graph
+        self.graph_status.configure(text="Drag to pan, scroll to zoom")
+        self.schedule_graph_redraw()
+    
+    def fit_graph(self):
+        if self.graph is not None:
+            self.graph.fit_y(self.graph_canvas.winfo_width())
+            self.schedule_graph_redraw()
+    
+    def start_graph_drag(self, event):
+        self.graph_drag = (event.x, event.y)
+    
+    def drag_graph(self, event):
+        if self.graph is None or self.graph_drag is None:
+            return
+        x, y = self.graph_drag
+        self.graph_drag = (event.x, event.y)
+        self.graph.pan(event.x - x, event.y - y, *self.graph_size())
+        self.schedule_graph_redraw()
+    
+    def zoom_graph(self, event, zoom_out):
+        if self.graph is None:
+            return
+        factor = graphing.ZOOM_STEP if zoom_out else 1 / graphing.ZOOM_STEP
+        self.graph.zoom(factor, event.x, event.y, *self.graph_size())
+        self.schedule_graph_redraw()
+    
+    def graph_size(self):
+        return max(self.graph_canvas.winfo_width(), 1), max(self.graph_canvas.winfo_height(), 1)
+    
+    def schedule_graph_redraw(self):
+        # Motion and wheel events between frames collapse into one redraw
+        if not self.graph_pending:
+            self.graph_pending = True
+            self.window.after(FRAME_MS, self.redraw_graph)
+    
+    def redraw_graph(self):
+        self.graph_pending = False
+        if self.graph is None:
+            return
+        canvas = self.graph_canvas
+        width, height = self.graph_size()
+        
+        x_axis, y_axis = self.graph.axes(width, height)
+        axis_color = self.colors["text_secondary"]
+        canvas.coords(self.axis_items[0], 0, x_axis, width, x_axis)
+        canvas.coords(self.axis_items[1], y_axis, 0, y_axis, height)
+        for item in self.axis_items:
+            canvas.itemconfigure(item, fill=axis_color)
+        
+        # Reuse existing line items, create or delete only the difference
+        used = 0
+        for i, segments in enumerate(self.graph.frame(width, height)):
+            color = self.colors[CURVE_COLORS[i % len(CURVE_COLORS)]]
+            for coords in segments:
+                if used < len(self.curve_items):
+                    item = self.curve_items[used]
+                    canvas.coords(item, coords)
+                    canvas.itemconfigure(item, fill=color)
+                else:
+                    self.curve_items.append(canvas.create_line(coords, fill=color, width=2))
+                used += 1
+        for item in self.curve_items[used:]:
+            canvas.delete(item)
+        del self.curve_items[used:]
+        if not self.graph.complete:
+            # Some tiles were drawn from a neighbouring zoom level
+            self.schedule_graph_redraw()
+    
+    # Session
+    def capture_ui(self):
+        """Window state for the session snapshot. Fields of panels not built
+        this run keep their saved values."""
+        panels = dict(self.panel_state)
+        for mode, fields in PANEL_FIELDS.items():
+            if mode in self.panels:
+                panels[mode] = {field: self.field_value(getattr(self, field)) for field in fields}
+        return {
+            "mode": self.current_mode,
+            "expression": self.current_expression,
+            "theme": self.styles.theme,
+            "geometry": self.window.geometry(),
+            "panels": panels
+        }
+    
+    def restore_panel(self, mode):
+        saved = self.panel_state.get(mode, {})
+        for field in PANEL_FIELDS.get(mode, ()):
+            if field in saved:
+                self.set_field_value(getattr(self, field), saved[field])
+        if mode == "Worksheet" and self.core._worksheet is not None and self.core._worksheet.cells:
+            # Names restored into the core (or defined from the display)
+            if "sheet_input" not in saved:
+                self.sheet_input.insert("1.0", self.core.worksheet.text())
+            self.refresh_worksheet()
+    
+    def field_value(self, widget):
+        if isinstance(widget, ctk.CTkTextbox):
+            return widget.get("1.0", "end-1c")
+        return widget.get()
+    
+    def set_field_value(self, widget, value):
+        if isinstance(widget, ctk.CTkTextbox):
+            widget.delete("1.0", "end")
+            widget.insert("1.0", value)
+        elif isinstance(widget, ctk.CTkEntry):
+            widget.delete(0, "end")
+            if value:
+                widget.insert(0, value)
+        elif widget is getattr(self, "conv_type", None):
+            if value in units.categories():
+                widget.set(value)
+                self.set_conversion_category(value)
+        elif widget is getattr(self, "calculus_operation", None):
+            if value in CALCULUS_OPERATIONS:
+                widget.set(value)
+                self.set_calculus_operation(value)
+        else:
+            widget.set(value)
+    
+    def save_session(self):
+        if self.autosaver is not None:
+            self.autosaver.save(self.core.snapshot(), self.capture_ui())
+    
+    def close(self):
+        # Snapshot while the widgets still exist, then end the mainloop
+        self.save_session()
+        self.window.destroy()
+    
+    def schedule_autosave(self):
+        self.save_session()
+        self.window.after(session.AUTOSAVE_INTERVAL_MS, self.schedule_autosave)
     
     def run(self):
-        self.window.mainloop()
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.window.after(session.AUTOSAVE_INTERVAL_MS, self.schedule_autosave)
+        try:
+            self.window.mainloop()
+        finally:
+            # The Autosaver writes the final snapshot before it stops
+            if self.autosaver is not None:
+                self.autosaver.close()
+            self.worker.close()
+            self.core.close()
 
-if __name__ == "__main__":
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in HEADLESS:
+        return run_headless(argv)
+    if argv and argv[0] == "--profile":
+        # calc.py --profile cpu|memory [report path]
+        mode = argv[1] if len(argv) > 1 else "cpu"
+        path = argv[2] if len(argv) > 2 else f"elite-calculator-{mode}.txt"
+        instrumentation.profile(lambda: AdvancedCalculator().run(), mode, path)
+        print(f"Profile written to {path} and {path}.json")
+        return 0
+    
     calculator = AdvancedCalculator()
     calculator.run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""GUI-free calculator core.
+
+Holds the evaluation, memory, history, unit conversion and date logic so it
+can be used from scripts and worker processes without customtkinter or a
+display. ``calc.AdvancedCalculator`` wraps one of these.
+
+Startup budget: ``import core`` plus the first ``evaluate`` call must finish
+within STARTUP_BUDGET_MS in a fresh interpreter (interpreter startup itself
+excluded). Heavy modules are imported lazily to keep it that way;
+benchmarks/bench_startup.py enforces the budget.
+"""
+STARTUP_BUDGET_MS = 50
+
+# Settings saved in session snapshots
+SNAPSHOT_FIELDS = ("memory", "angle_mode", "current_base", "word_size", "signed", "precision", "precision_digits")
+
+
+class CalculatorCore:
+    def __init__(self, history_path=None):
+        from history import HistoryStore
+
+        self.memory = 0
+        self.matrices = {}  # Matrix registers: A, B operands, ANS last result, M memory
+        # In-memory only unless a JSON-lines log path is given
+        self.history = HistoryStore(history_path)
+        self.angle_mode = "DEG"  # DEG, RAD, GRAD
+        self.current_base = "DEC"  # DEC, HEX, OCT, BIN
+        self.word_size = 64  # 8, 16, 32, 64 bits
+        self.signed = True
+        self.precision = "float"  # float, decimal, fraction
+        self.precision_digits = 50  # significant digits in decimal mode
+        self._worksheet = None  # Named variables and functions, created on first use
+
+    # Evaluation
+    def evaluate(self, expression):
+        """Evaluate ``expression`` and return the display-formatted result.
+
+        Raises ZeroDivisionError for division by zero (and infinite
+        results) and ValueError/ArithmeticError for anything else the
+        caller should report as "Error". Integers with more than
+        precision.LAZY_DIGITS digits come back as a ``LazyResult`` summary.
+        """
+        if self._worksheet is not None and self.worksheet.references(expression):
+            import engine
+            value = self.worksheet.evaluate(expression)
+            if isinstance(value, float) and value in (float("inf"), float("-inf")):
+                raise ZeroDivisionError
+            result = engine.format_result(value)
+        elif self.precision == "float":
+            import engine
+            result = engine.format_result(engine.evaluate(expression, self.angle_mode))
+        else:
+            import precision
+            result = precision.evaluate(expression, self.angle_mode, self.precision, self.precision_digits)
+        if isinstance(result, int) and result.bit_length() > 16384:
+            # Only ints this long can exceed LAZY_DIGITS
+            import precision
+            result = precision.render(result)
+        self.add_history(expression, result)
+        return result
+
+    def evaluate_integer(self, expression):
+        """Programming-mode evaluation in ``current_base`` with the
+        selected word size. Returns the result rendered in every base."""
+        import programmer
+
+        value = programmer.evaluate(expression, self.current_base, self.word_size, self.signed)
+        results = programmer.format_all(value, self.word_size, self.signed)
+        self.add_history(expression, results[self.current_base])
+        return results
+
+    # Session state
+    def snapshot(self):
+        """JSON-ready settings for session.py; history has its own log."""
+        state = {field: getattr(self, field) for field in SNAPSHOT_FIELDS}
+        if self._worksheet is not None and self._worksheet.cells:
+            state["worksheet"] = self._worksheet.text()
+        return state
+
+    def restore(self, state):
+        for field in SNAPSHOT_FIELDS:
+            if field in state:
+                setattr(self, field, state[field])
+        if state.get("worksheet"):
+            self.worksheet.load(state["worksheet"])
+
+    # Worksheet
+    @property
+    def worksheet(self):
+        """The variables/functions sheet, following ``angle_mode``."""
+        if self._worksheet is None:
+            from worksheet import Worksheet
+            self._worksheet = Worksheet(self.angle_mode)
+        self._worksheet.set_angle_mode(self.angle_mode)
+        return self._worksheet
+
+    def define(self, line):
+        """Add or replace ``name = expr`` / ``f(x) = expr``; returns the names
+        recomputed. Raises worksheet.WorksheetError for a malformed line."""
+        return self.worksheet.define(line)
+
+    def add_history(self, expression, result):
+        self.history.append(expression, result)
+
+    def close(self):
+        # Flush pending history writes
+        self.history.close()
+
+    # Memory functions
+    def memory_clear(self):
+        self.memory = 0
+        self.matrix_clear("M")
+
+    def memory_recall(self):
+        return self.memory
+
+    def memory_add(self, value):
+        self.memory += value
+
+    def memory_subtract(self, value):
+        self.memory -= value
+
+    def memory_store(self, value):
+        self.memory = value
+
+    def matrix_store(self, name, value):
+        self.matrices[name] = value
+
+    def matrix_recall(self, name):
+        """The matrix (or determinant) in register ``name``, None if empty."""
+        return self.matrices.get(name)
+
+    def matrix_clear(self, name):
+        self.matrices.pop(name, None)
+
+    # Unit converter
+    def convert_units(self, value, from_unit, to_unit, category=None):
+        """Convert ``value``; returns None when the pair is not available."""
+        import units
+
+        try:
+            return units.convert(value, from_unit, to_unit, category)
+        except KeyError:
+            return None
+
+    # Date calculator
+    def date_difference(self, date1_str, date2_str, holidays=()):
+        """Return a dates.DateDifference (exact calendar years/months/days
+        and business days) between two YYYY-MM-DD strings. Raises
+        ValueError on malformed input."""
+        import dates
+
+        return dates.difference(date1_str, date2_str, holidays)
@@ -0,0 +1,180 @@
+"""Expression engine for the calculator.
+
+Expressions are parsed once into an AST, checked against a whitelist of
+nodes, rewritten for the active angle mode and compiled to a code object.
+Compiled code is kept in a bounded LRU keyed by (expression, angle mode), so
+repeated and recalled expressions skip parsing entirely.
+"""
+import ast
+import math
+from functools import lru_cache
+from typing import Any, Dict
+
+ANGLE_MODES = ("DEG", "RAD", "GRAD")
+CACHE_SIZE = 1024
+
+# Functions reachable from the Scientific layout (add_function emits math.<name>)
+FUNCTIONS = {
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "asin": math.asin,
+    "acos": math.acos,
+    "atan": math.atan,
+    "log": math.log,
+    "log10": math.log10,
+    "sqrt": math.sqrt,
+    "factorial": math.factorial,
+    "radians": math.radians,
+    "degrees": math.degrees,
+}
+CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+}
+TRIG_FUNCTIONS = ("sin", "cos", "tan")
+INVERSE_TRIG_FUNCTIONS = ("asin", "acos", "atan")
+
+# Multiply an angle by this to get radians, and divide a radian result by it
+ANGLE_FACTORS = {
+    "DEG": math.pi / 180,
+    "RAD": 1.0,
+    "GRAD": math.pi / 200,
+}
+
+_BIN_OPS = (
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.LShift, ast.RShift, ast.BitOr, ast.BitXor, ast.BitAnd,
+)
+_UNARY_OPS = (ast.UAdd, ast.USub, ast.Invert)
+
+_NAMESPACE: Dict[str, Any] = {"__builtins__": {}}
+_NAMESPACE.update(FUNCTIONS)
+_NAMESPACE.update(CONSTANTS)
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+def balance_parentheses(expression: str) -> str:
+    # Close any parentheses left open, e.g. "math.sin(30" -> "math.sin(30)"
+    missing = expression.count("(") - expression.count(")")
+    if missing > 0:
+        expression += ")" * missing
+    return expression
+
+
+class _Validator(ast.NodeTransformer):
+    """Rejects anything outside the calculator grammar and folds the
+    ``math.`` prefix and angle-mode conversions into the tree."""
+
+    def __init__(self, angle_mode: str, variables=(), functions=()):
+        self.factor = ANGLE_FACTORS[angle_mode]
+        self.variables = frozenset(variables)
+        # User-defined functions (worksheet); callable, never angle-scaled
+        self.functions = frozenset(functions)
+
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ExpressionError(f"Unsupported literal: {node.value!r}")
+        return node
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _BIN_OPS):
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        self.generic_visit(node)
+        return node
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, _UNARY_OPS):
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        self.generic_visit(node)
+        return node
+
+    def visit_Attribute(self, node):
+        # math.pi / math.e / math.sin ... -> bare names in the engine namespace
+        if not (isinstance(node.value, ast.Name) and node.value.id == "math"):
+            raise ExpressionError("Only math.<name> attributes are allowed")
+        if node.attr not in FUNCTIONS and node.attr not in CONSTANTS:
+            raise ExpressionError(f"Unknown name: math.{node.attr}")
+        return ast.copy_location(ast.Name(id=node.attr, ctx=ast.Load()), node)
+
+    def visit_Name(self, node):
+        if (node.id in CONSTANTS or node.id in FUNCTIONS or node.id in self.variables
+                or node.id in self.functions):
+            return node
+        raise ExpressionError(f"Unknown name: {node.id}")
+
+    def visit_Call(self, node):
+        if node.keywords:
+            raise ExpressionError("Keyword arguments are not allowed")
+        func = self.visit(node.func)
+        if not isinstance(func, ast.Name) or (func.id not in FUNCTIONS and func.id not in self.functions):
+            raise ExpressionError("Only calculator functions can be called")
+        args = [self.visit(arg) for arg in node.args]
+        call = ast.copy_location(ast.Call(func=func, args=args, keywords=[]), node)
+
+        if self.factor == 1.0 or func.id in self.functions:
+            return call
+        if func.id in TRIG_FUNCTIONS and len(args) == 1:
+            call.args = [self._scale(args[0], ast.Mult())]
+        elif func.id in INVERSE_TRIG_FUNCTIONS:
+            call = self._scale(call, ast.Div())
+        return call
+
+    def _scale(self, node, op):
+        return ast.copy_location(
+            ast.BinOp(left=node, op=op, right=ast.Constant(self.factor)), node
+        )
+
+    def generic_visit(self, node):
+        allowed = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.operator,
+                   ast.unaryop, ast.expr_context)
+        if not isinstance(node, allowed):
+            raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+        return super().generic_visit(node)
+
+
+def parse(expression: str, angle_mode: str = "DEG", variables=(), functions=()) -> ast.Expression:
+    if angle_mode not in ANGLE_FACTORS:
+        raise ExpressionError(f"Unknown angle mode: {angle_mode}")
+    try:
+        tree = ast.parse(balance_parentheses(expression), mode="eval")
+    except SyntaxError as exc:
+        raise ExpressionError(str(exc)) from None
+    tree = _Validator(angle_mode, variables, functions).visit(tree)
+    return ast.fix_missing_locations(tree)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(expression: str, angle_mode: str = "DEG", variables=()):
+    # variables must be hashable (a tuple of names) to be part of the cache key
+    return compile(parse(expression, angle_mode, variables), "<expression>", "eval")
+
+
+def evaluate(expression: str, angle_mode: str = "DEG"):
+    result = eval(compile_expression(expression, angle_mode), _NAMESPACE)
+    if isinstance(result, float) and math.isinf(result):
+        raise ZeroDivisionError
+    return result
+
+
+def format_result(result):
+    if isinstance(result, float):
+        if result == int(result):
+            return int(result)
+        return f"{round(result, 10):g}"
+    return result
+
+
+def cache_info():
+    return compile_expression.cache_info()
+
+
+def clear_cache():
+    compile_expression.cache_clear()
@@ -0,0 +1,339 @@
+"""Function plotting: vectorized adaptive sampling, tile cache, decimation.
+
+A ``Curve`` samples one Scientific-mode expression in ``x`` (honoring the
+angle mode) in tiles. A tile at level L covers TILE_SAMPLES base intervals of
+width 2**L, and a view uses the level whose spacing is just finer than one
+pixel / OVERSAMPLE. Panning only samples the tiles that scroll into view,
+and zooming within a factor of two of the last level reuses every cached
+tile; tiles live in a per-curve LRU cache. A tile at a new level first
+looks up the samples of the cached tiles one level coarser and finer,
+which share its x positions, so crossing a level evaluates only the points
+those tiles do not already have. ``Graph.frame`` also caps the time spent
+sampling new tiles at SAMPLE_BUDGET_MS: past it, a missing tile is drawn
+from those cached neighbours for this frame and sampled in a later one
+(``Graph.complete`` is False until then).
+
+Inside a tile, adaptive refinement bisects only the intervals where the
+curve bends sharply (second difference), leaves its domain, or jumps, for
+up to REFINE_DEPTH vectorized passes. Jumps that survive the finest
+bisection are treated as discontinuities and break the line.
+
+``decimate`` reduces samples to at most four points per pixel column
+(first, min, max, last), which draws the same picture as the full set.
+``Graph`` ties curves and a view rectangle together and produces canvas
+coordinates for each frame.
+"""
+from collections import OrderedDict
+import math
+import time
+
+import engine
+import vectorized
+
+TILE_SAMPLES = 256
+OVERSAMPLE = 2
+REFINE_DEPTH = 6
+BEND_TOLERANCE = 1e-3  # Second difference, as a fraction of the tile's y spread
+JUMP_FRACTION = 0.2  # Jumps this large at the finest spacing break the line
+TILE_CACHE_SIZE = 512
+MAX_TILE_POINTS = TILE_SAMPLES * 8
+ZOOM_STEP = 1.25
+FRAME_BUDGET_MS = 33  # Pan/zoom frames, curves sampled and decimated
+SAMPLE_BUDGET_MS = 8  # New tiles sampled per frame, across all curves
+
+
+def _numpy():
+    import numpy as np
+    return np
+
+
+class Curve:
+    def __init__(self, expression, angle_mode="DEG"):
+        # Compile now so a bad expression is reported before any drawing
+        engine.compile_expression(expression, angle_mode, ("x",))
+        self.expression = expression
+        self.angle_mode = angle_mode
+        self._tiles = OrderedDict()  # (level, index) -> (xs, ys, sampled)
+        self.evaluations = 0
+        self.deferred = 0  # Tiles the last samples() call drew from a neighbouring level
+
+    def evaluate(self, xs):
+        np = _numpy()
+        self.evaluations += len(xs)
+        try:
+            ys = np.asarray(vectorized.evaluate_array(self.expression, self.angle_mode, x=xs), dtype=float)
+        except (ArithmeticError, TypeError, ValueError):
+            return np.full(len(xs), np.nan)
+        return np.broadcast_to(ys, xs.shape)
+
+    def samples(self, x0, x1, width, deadline=None):
+        """Sorted (xs, ys) covering [x0, x1] for a view ``width`` pixels wide,
+        including one sample beyond each end. NaN in ys marks a break.
+
+        Once perf_counter() passes ``deadline``, missing tiles after the
+        first that the neighbouring levels cover are taken from them instead
+        of sampled; ``deferred`` counts them."""
+        np = _numpy()
+        level = self.level(x0, x1, width)
+        span = TILE_SAMPLES * 2.0 ** level
+        first, last = math.floor(x0 / span), math.floor(x1 / span)
+
+        self.deferred = 0
+        missing = 0
+        xs_parts, ys_parts = [], []
+        for index in range(first, last + 1):
+            tile = None
+            if (level, index) not in self._tiles:
+                # Every call samples at least one missing tile, so a view
+                # is always completed within a few frames
+                if missing and deadline is not None and time.perf_counter() > deadline:
+                    tile = self._stand_in(level, index)
+                    self.deferred += tile is not None
+                missing += 1
+            xs, ys, _ = tile or self._tile(level, index)
+            # Neighbouring tiles share their boundary sample
+            skip = 1 if xs_parts else 0
+            xs_parts.append(xs[skip:])
+            ys_parts.append(ys[skip:])
+        xs, ys = np.concatenate(xs_parts), np.concatenate(ys_parts)
+
+        start = max(np.searchsorted(xs, x0, "right") - 1, 0)
+        stop = np.searchsorted(xs, x1, "left") + 1
+        return xs[start:stop], ys[start:stop]
+
+    @staticmethod
+    def level(x0, x1, width):
+        spacing = (x1 - x0) / (max(width, 1) * OVERSAMPLE)
+        return min(max(math.floor(math.log2(spacing)), -1000), 1000)
+
+    def _tile(self, level, index):
+        key = (level, index)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            return tile
+        tile = self._sample_tile(level, index)
+        self._tiles[key] = tile
+        if len(self._tiles) > TILE_CACHE_SIZE:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def _stand_in(self, level, index):
+        """Tile (level, index) cut from the cached tile one level coarser, or
+        joined from the two one level finer; None if they are not cached."""
+        np = _numpy()
+        parent = self._tiles.get((level + 1, index // 2))
+        if parent is not None:
+            xs, ys, sampled = parent
+            span = TILE_SAMPLES * 2.0 ** level
+            start = np.searchsorted(xs, index * span, "left")
+            stop = np.searchsorted(xs, (index + 1) * span, "right")
+            return xs[start:stop], ys[start:stop], sampled[start:stop]
+        left, right = self._tiles.get((level - 1, 2 * index)), self._tiles.get((level - 1, 2 * index + 1))
+        if left is None or right is None:
+            return None
+        # The two halves share their middle sample
+        return tuple(np.concatenate((a, b[1:])) for a, b in zip(left, right))
+
+    def _known(self, level, index):
+        """Sorted (xs, ys) already evaluated in the cached tiles one level
+        coarser and finer that overlap tile (level, index), or None."""
+        np = _numpy()
+        keys = ((level + 1, index // 2), (level - 1, 2 * index), (level - 1, 2 * index + 1))
+        tiles = [self._tiles[key] for key in keys if key in self._tiles]
+        if not tiles:
+            return None
+        xs = np.concatenate([xs[sampled] for xs, _, sampled in tiles])
+        ys = np.concatenate([ys[sampled] for _, ys, sampled in tiles])
+        order = np.argsort(xs, kind="stable")
+        return xs[order], ys[order]
+
+    def _lookup(self, xs, known):
+        """Evaluate at ``xs``, taking the values found in ``known``."""
+        np = _numpy()
+        if known is None:
+            return self.evaluate(xs)
+        known_xs, known_ys = known
+        where = np.minimum(np.searchsorted(known_xs, xs), len(known_xs) - 1)
+        hit = known_xs[where] == xs
+        ys = np.empty(len(xs))
+        ys[hit] = known_ys[where[hit]]
+        missing = ~hit
+        if missing.any():
+            ys[missing] = self.evaluate(xs[missing])
+        return ys
+
+    def _sample_tile(self, level, index):
+        np = _numpy()
+        spacing = 2.0 ** level
+        xs = (index * TILE_SAMPLES + np.arange(TILE_SAMPLES + 1)) * spacing
+        # Grid points and bisection midpoints are exact binary fractions, so
+        # the neighbouring levels' samples match them exactly
+        known = self._known(level, index)
+        ys = self._lookup(xs, known)
+
+        finite = np.isfinite(ys)
+        if finite.any():
+            low, high = np.percentile(ys[finite], [5, 95])
+            scale = high - low or max(abs(high), 1.0)
+        else:
+            scale = 1.0
+        min_width = spacing / 2 ** REFINE_DEPTH
+
+        for _ in range(REFINE_DEPTH):
+            flag = self._needs_refinement(xs, ys, scale, min_width)
+            if not flag.any() or len(xs) + flag.sum() > MAX_TILE_POINTS:
+                break
+            where = np.flatnonzero(flag)
+            mids = (xs[where] + xs[where + 1]) / 2
+            xs = np.insert(xs, where + 1, mids)
+            ys = np.insert(ys, where + 1, self._lookup(mids, known))
+
+        # Jumps still present at the finest spacing are discontinuities
+        with np.errstate(invalid="ignore"):
+            jumps = np.abs(np.diff(ys)) > JUMP_FRACTION * scale
+        jumps &= np.diff(xs) <= min_width * 1.5
+        sampled = np.ones(len(xs), dtype=bool)
+        if jumps.any():
+            where = np.flatnonzero(jumps) + 1
+            xs = np.insert(xs, where, (xs[where - 1] + xs[where]) / 2)
+            ys = np.insert(ys, where, np.nan)
+            sampled = np.insert(sampled, where, False)  # Breaks, not samples
+        return xs, ys, sampled
+
+    @staticmethod
+    def _needs_refinement(xs, ys, scale, min_width):
+        np = _numpy()
+        finite = np.isfinite(ys)
+        with np.errstate(invalid="ignore"):
+            dy = np.diff(ys)
+            bend = np.abs(np.diff(dy)) > BEND_TOLERANCE * scale
+            flag = np.abs(dy) > JUMP_FRACTION * scale
+        # A sharp bend at point i involves the intervals on both sides
+        flag[:-1] |= bend
+        flag[1:] |= bend
+        # Domain edges, e.g. sqrt(x) around 0
+        flag |= finite[:-1] != finite[1:]
+        flag &= np.diff(xs) > min_width
+        return flag
+
+    def cache_info(self):
+        return {"tiles": len(self._tiles), "evaluations": self.evaluations}
+
+
+def decimate(xs, ys, x0, x1, width):
+    """Keep at most the first, min, max and last sample of every pixel
+    column (and of every run between NaN breaks). Returns (xs, ys) with NaN
+    rows separating runs."""
+    np = _numpy()
+    if len(xs) <= 4 * width:
+        return xs, ys
+
+    finite = np.isfinite(ys)
+    if not finite.any():
+        return xs[:0], ys[:0]
+    xs, ys = xs[finite], ys[finite]
+    # Runs of consecutive finite samples; a gap starts a new run
+    run = np.cumsum(np.diff(np.flatnonzero(finite), prepend=-2) > 1)
+    column = np.clip(((xs - x0) * (width / (x1 - x0))).astype(np.int64), -1, width)
+    group = run * (width + 2) + column
+    starts = np.flatnonzero(np.diff(group, prepend=group[0] - 1))
+    ends = np.append(starts[1:], len(group)) - 1
+
+    index = np.arange(len(ys))
+    sizes = np.diff(np.append(starts, len(ys)))
+    low = np.repeat(np.minimum.reduceat(ys, starts), sizes)
+    high = np.repeat(np.maximum.reduceat(ys, starts), sizes)
+    past_end = len(ys)
+    argmin = np.minimum.reduceat(np.where(ys == low, index, past_end), starts)
+    argmax = np.minimum.reduceat(np.where(ys == high, index, past_end), starts)
+
+    keep = np.sort(np.stack([starts, argmin, argmax, ends], axis=1), axis=1).ravel()
+    keep = keep[np.diff(keep, prepend=-1) > 0]
+
+    xs, ys, runs = xs[keep], ys[keep], run[keep]
+    breaks = np.flatnonzero(np.diff(runs)) + 1
+    return np.insert(xs, breaks, np.nan), np.insert(ys, breaks, np.nan)
+
+
+class Graph:
+    """Curves plus the visible rectangle, in data coordinates."""
+
+    def __init__(self, expressions=(), angle_mode="DEG", x_range=(-10.0, 10.0), y_range=(-10.0, 10.0)):
+        self.angle_mode = angle_mode
+        self.curves = [Curve(expression, angle_mode) for expression in expressions]
+        self.x0, self.x1 = x_range
+        self.y0, self.y1 = y_range
+        self.complete = True  # False while the last frame has tiles left to sample
+
+    def set_angle_mode(self, angle_mode):
+        if angle_mode != self.angle_mode:
+            # Cached samples depend on the angle mode
+            self.angle_mode = angle_mode
+            self.curves = [Curve(curve.expression, angle_mode) for curve in self.curves]
+
+    def pan(self, dx_pixels, dy_pixels, width, height):
+        dx = dx_pixels * (self.x1 - self.x0) / width
+        dy = dy_pixels * (self.y1 - self.y0) / height
+        self.x0, self.x1 = self.x0 - dx, self.x1 - dx
+        self.y0, self.y1 = self.y0 + dy, self.y1 + dy
+
+    def zoom(self, factor, px, py, width, height):
+        """Scale the view by ``factor`` (> 1 zooms out) around pixel (px, py)."""
+        x = self.x0 + px / width * (self.x1 - self.x0)
+        y = self.y1 - py / height * (self.y1 - self.y0)
+        self.x0, self.x1 = x + (self.x0 - x) * factor, x + (self.x1 - x) * factor
+        self.y0, self.y1 = y + (self.y0 - y) * factor, y + (self.y1 - y) * factor
+
+    def fit_y(self, width):
+        """Fit the y range to the bulk of the visible values."""
+        np = _numpy()
+        values = [curve.samples(self.x0, self.x1, width)[1] for curve in self.curves]
+        values = np.concatenate(values) if values else np.empty(0)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        low, high = np.percentile(values, [2, 98])
+        if high - low < 1e-12:
+            low, high = low - 1, high + 1
+        margin = (high - low) * 0.1
+        self.y0, self.y1 = low - margin, high + margin
+
+    def frame(self, width, height):
+        """Canvas coordinates for the current view: one list per curve of flat
+        [x0, y0, x1, y1, ...] lists, one per unbroken line segment.
+
+        Sampling new tiles stops after SAMPLE_BUDGET_MS; ``complete`` is then
+        False and another frame samples the rest."""
+        np = _numpy()
+        frames = []
+        x_scale = width / (self.x1 - self.x0)
+        y_scale = height / (self.y1 - self.y0)
+        deadline = time.perf_counter() + SAMPLE_BUDGET_MS / 1000
+        for curve in self.curves:
+            xs, ys = curve.samples(self.x0, self.x1, width, deadline)
+            xs, ys = decimate(xs, ys, self.x0, self.x1, width)
+            px = (xs - self.x0) * x_scale
+            # Off-screen values are clamped so Tk never sees huge coordinates
+            py = np.clip((self.y1 - ys) * y_scale, -height, 2 * height)
+            frames.append(_segments(px, py))
+        self.complete = not any(curve.deferred for curve in self.curves)
+        return frames
+
+    def axes(self, width, height):
+        """Pixel positions of the x axis (y = 0) and y axis (x = 0)."""
+        x_axis = (self.y1 / (self.y1 - self.y0)) * height
+        y_axis = (-self.x0 / (self.x1 - self.x0)) * width
+        return x_axis, y_axis
+
+
+def _segments(px, py):
+    np = _numpy()
+    breaks = np.flatnonzero(np.isnan(py) | np.isnan(px))
+    segments = []
+    start = 0
+    for stop in list(breaks) + [len(px)]:
+        if stop - start >= 2:
+            segments.append(np.column_stack((px[start:stop], py[start:stop])).ravel().tolist())
+        start = stop + 1
+    return segments
@@ -0,0 +1,260 @@
+"""Persistent calculation history.
+
+Entries are kept three ways:
+
+* an append-only JSON-lines log on disk, written in batches by a background
+  thread so the UI never waits on file I/O,
+* a ring buffer (``deque`` with maxlen) holding the most recent entries,
+* a trigram index over expressions and results, so substring and prefix
+  searches over millions of entries only look at candidate rows.
+
+``HistoryView`` is the filtered, newest-first list the history drawer
+scrolls through. It holds entry ids, not entries, and no ids at all when
+there is no filter.
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from collections import deque
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".elite_calculator", "history.jsonl")
+RECENT_LIMIT = 50
+FLUSH_INTERVAL = 1.0  # seconds
+FLUSH_BATCH = 256
+LOAD_CHUNK = 1000  # entries indexed per lock hold during a background load
+
+_EMPTY = array("I")
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class HistoryStore:
+    def __init__(self, path=None, recent_limit=RECENT_LIMIT):
+        self.path = path
+        self.recent = deque(maxlen=recent_limit)
+        self._entries = []  # (expression, result), oldest first
+        self._keys = []  # lowercased "expression\nresult" used for matching
+        self._index = {}  # trigram -> array of entry ids
+        self._lock = threading.Lock()
+        self._pending = []
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = None
+        self._loading = None  # entries appended while a background load runs
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        # Iterates the recent window, newest last
+        return iter(list(self.recent))
+
+    def __getitem__(self, i):
+        return self._entries[i]
+
+    # Appending
+    def append(self, expression, result):
+        entry = (expression, str(result))
+        with self._lock:
+            if self._loading is not None:
+                self._loading.append(entry)
+            else:
+                self._add(entry)
+            if self.path:
+                self._pending.append(entry)
+                if len(self._pending) >= FLUSH_BATCH:
+                    self._wake.set()
+        if self.path and self._flusher is None:
+            self._start_flusher()
+
+    def _add(self, entry):
+        entry_id = len(self._entries)
+        key = f"{entry[0]}\n{entry[1]}".lower()
+        self._entries.append(entry)
+        self._keys.append(key)
+        self.recent.append(entry)
+        for gram in _trigrams(key):
+            postings = self._index.get(gram)
+            if postings is None:
+                postings = self._index[gram] = array("I")
+            postings.append(entry_id)
+
+    # Searching
+    def search(self, query, limit=100):
+        """Return up to ``limit`` entries containing ``query`` in the
+        expression or result, newest first."""
+        query = query.lower()
+        matches = []
+        keys = self._keys
+        for entry_id in reversed(self._candidates(query)):
+            if query in keys[entry_id]:
+                matches.append(self._entries[entry_id])
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def matching_ids(self, query, end=None):
+        """Ids (below ``end``, oldest first) of every entry containing the
+        lowercased ``query``."""
+        keys = self._keys
+        end = len(keys) if end is None else end
+        return array("I", (i for i in self._candidates(query) if i < end and query in keys[i]))
+
+    def _candidates(self, query):
+        # Ascending ids that may contain query; too short for the index: all
+        if len(query) < 3:
+            return range(len(self._keys))
+        return min((self._index.get(gram, _EMPTY) for gram in _trigrams(query)), key=len)
+
+    # Persistence
+    def load(self, background=False):
+        """Read the on-disk log into memory. With ``background=True`` the
+        file is read on a thread and indexed LOAD_CHUNK entries per lock
+        hold, so ``append`` never waits long; entries appended meanwhile are
+        indexed after the loaded ones. Only the bytes present when the load
+        starts are read: the flusher may append those same entries to the
+        file while it is being read."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        if not background:
+            for entry in self._read(self.path):
+                self._add(entry)
+            return
+
+        with self._lock:
+            self._loading = []
+            size = os.path.getsize(self.path)
+
+        def run():
+            loaded = list(self._read(self.path, size))
+            for start in range(0, len(loaded), LOAD_CHUNK):
+                with self._lock:
+                    for entry in loaded[start:start + LOAD_CHUNK]:
+                        self._add(entry)
+            with self._lock:
+                for entry in self._loading:
+                    self._add(entry)
+                self._loading = None
+
+        threading.Thread(target=run, daemon=True).start()
+
+    @staticmethod
+    def _read(path, size=None):
+        """(expression, result) records from the log, from its first ``size``
+        bytes when given."""
+        with open(path, "rb") as f:
+            remaining = size
+            for line in f:
+                if remaining is not None:
+                    if remaining <= 0:
+                        break
+                    line, remaining = line[:remaining], remaining - len(line)
+                try:
+                    record = json.loads(line)
+                    yield record["expression"], record["result"]
+                except (ValueError, KeyError, TypeError):
+                    continue  # e.g. a partial last line after a crash
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        now = time.time()
+        lines = "".join(
+            json.dumps({"expression": expression, "result": result, "time": now}) + "\n"
+            for expression, result in batch
+        )
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _start_flusher(self):
+        def run():
+            while not self._closed:
+                self._wake.wait(FLUSH_INTERVAL)
+                self._wake.clear()
+                self.flush()
+
+        self._flusher = threading.Thread(target=run, daemon=True)
+        self._flusher.start()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        if self.path:
+            self.flush()
+
+    # Export / import
+    def export(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for expression, result in self._entries:
+                f.write(json.dumps({"expression": expression, "result": result}) + "\n")
+
+    def import_file(self, path):
+        count = 0
+        for expression, result in self._read(path):
+            self.append(expression, result)
+            count += 1
+        return count
+
+
+class HistoryView:
+    """Entries of a HistoryStore matching a query, newest first.
+
+    Row 0 is the newest match. Without a query rows map straight onto the
+    store; with one, the matching ids are kept in an ``array``. A query that
+    extends the previous one only filters the previous matches. ``sync``
+    takes in entries appended to the store since the last call, at constant
+    cost per entry.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.query = ""
+        self._ids = None  # matching entry ids, oldest first; None = all
+        self._end = len(store._keys)  # entries seen so far
+
+    def __len__(self):
+        return self._end if self._ids is None else len(self._ids)
+
+    def __getitem__(self, row):
+        if self._ids is None:
+            return self.store[self._end - 1 - row]
+        return self.store[self._ids[-1 - row]]
+
+    def set_query(self, query):
+        query = query.lower()
+        if query == self.query:
+            return
+        if not query:
+            self._ids = None
+        elif self._ids is not None and self.query in query and (
+                len(self._ids) <= len(self.store._candidates(query))):
+            # Narrowing: every match of query is a match of the old one
+            keys = self.store._keys
+            self._ids = array("I", (i for i in self._ids if query in keys[i]))
+        else:
+            self._ids = self.store.matching_ids(query, self._end)
+        self.query = query
+
+    def sync(self):
+        """Take in entries appended since the last call; returns how many
+        rows were added at the top."""
+        # _keys is appended after _entries, so ids below its length are complete
+        end = len(self.store._keys)
+        start, self._end = self._end, end
+        if self._ids is None:
+            return end - start
+        keys, added = self.store._keys, 0
+        for entry_id in range(start, end):
+            if self.query in keys[entry_id]:
+                self._ids.append(entry_id)
+                added += 1
+        return added
@@ -0,0 +1,232 @@
+"""Opt-in timings, counters and profiling for the GUI hot paths.
+
+Methods wrapped with ``timed`` record their call count, error count and a
+latency histogram while instrumentation is enabled. Disabled (the default),
+the wrapper is one global lookup and a branch before the real call, and
+the widget counters are not installed at all: ``enable`` patches
+tkinter's widget constructor and ``destroy`` to count widgets per class,
+and ``disable`` puts the originals back.
+
+Enable with ELITE_CALCULATOR_INSTRUMENT=1, the switch in the diagnostics
+window (Ctrl+Shift+D), or by profiling a whole session::
+
+    python calc.py --profile cpu profile.txt      # cProfile, by cumulative time
+    python calc.py --profile memory profile.txt   # tracemalloc, top allocations
+
+Both write the counters next to the report as ``profile.txt.json``.
+"""
+import bisect
+import json
+import os
+import time
+from functools import wraps
+
+ENABLED = False
+# Upper bounds of the latency histogram buckets, in milliseconds; the last
+# bucket counts everything slower
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+PROFILE_LINES = 60
+
+_operations = {}
+counters = {}
+_originals = None  # tkinter methods replaced while enabled
+
+
+class Operation:
+    __slots__ = ("calls", "errors", "total_ms", "max_ms", "histogram")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+
+    def record(self, ms):
+        self.calls += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.histogram[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile."""
+        if not self.calls:
+            return 0.0
+        rank, seen = q / 100 * self.calls, 0
+        for bound, count in zip(BUCKETS_MS, self.histogram):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max_ms
+
+    def to_dict(self):
+        labels = [f"<={bound}" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+            "histogram_ms": dict(zip(labels, self.histogram))
+        }
+
+
+def operation(name):
+    op = _operations.get(name)
+    if op is None:
+        op = _operations[name] = Operation()
+    return op
+
+
+# Recording
+def timed(func):
+    """Decorator: time every call of ``func`` under its name while enabled.
+    Exceptions are counted as errors and re-raised."""
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            operation(name).errors += 1
+            raise
+        finally:
+            operation(name).record((time.perf_counter() - start) * 1000)
+    return wrapper
+
+
+def record(name, started, failed=False):
+    """Record an operation that began at perf_counter() ``started``, such as
+    a worker round trip that completes in a callback."""
+    if ENABLED:
+        op = operation(name)
+        op.record((time.perf_counter() - started) * 1000)
+        if failed:
+            op.errors += 1
+
+
+def error(name, exc):
+    """Count an exception that ``name`` handled instead of raising."""
+    if ENABLED:
+        operation(name).errors += 1
+        count(f"errors.{type(exc).__name__}")
+
+
+def count(name, amount=1):
+    if ENABLED:
+        counters[name] = counters.get(name, 0) + amount
+
+
+# Switching
+def enable():
+    global ENABLED, _originals
+    ENABLED = True
+    if _originals is not None:
+        return
+    try:
+        import tkinter
+    except ImportError:
+        return
+    widget = tkinter.BaseWidget
+    _originals = (widget.__init__, widget.destroy)
+    init, destroy = _originals
+
+    def counted_init(self, *args, **kwargs):
+        count(f"widgets.created.{type(self).__name__}")
+        init(self, *args, **kwargs)
+
+    def counted_destroy(self):
+        count(f"widgets.destroyed.{type(self).__name__}")
+        destroy(self)
+
+    widget.__init__, widget.destroy = counted_init, counted_destroy
+
+
+def disable():
+    global ENABLED, _originals
+    ENABLED = False
+    if _originals is not None:
+        import tkinter
+        tkinter.BaseWidget.__init__, tkinter.BaseWidget.destroy = _originals
+        _originals = None
+
+
+def reset():
+    _operations.clear()
+    counters.clear()
+
+
+if os.environ.get("ELITE_CALCULATOR_INSTRUMENT", "") not in ("", "0"):
+    enable()  # Also installs the widget counters
+
+
+# Reporting
+def report():
+    """Everything recorded so far, JSON-ready."""
+    return {
+        "enabled": ENABLED,
+        "operations": {name: op.to_dict() for name, op in sorted(_operations.items())},
+        "counters": dict(sorted(counters.items()))
+    }
+
+
+def format_report():
+    lines = [f"{'operation':<26}{'calls':>8}{'errors':>8}{'mean':>9}{'p99':>9}{'max':>9}  (ms)"]
+    for name, op in sorted(_operations.items()):
+        data = op.to_dict()
+        lines.append(
+            f"{name:<26}{op.calls:>8}{op.errors:>8}{data['mean_ms']:>9.3f}{data['p99_ms']:>9.3g}{op.max_ms:>9.3f}"
+        )
+    if counters:
+        lines.append("")
+        lines.extend(f"{name:<44}{value:>8}" for name, value in sorted(counters.items()))
+    return "\n".join(lines)
+
+
+def dump(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report(), f, indent=2)
+
+
+def profile(run, mode, path):
+    """Run ``run()`` with instrumentation enabled under cProfile (``mode``
+    "cpu") or tracemalloc ("memory"). Writes the report to ``path`` and the
+    counters to ``path + ".json"``."""
+    if mode not in ("cpu", "memory"):
+        raise ValueError(f"Unknown profile mode: {mode}")
+    enable()
+    try:
+        if mode == "cpu":
+            import cProfile
+            import pstats
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                return run()
+            finally:
+                profiler.disable()
+                with open(path, "w", encoding="utf-8") as f:
+                    pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        else:
+            import tracemalloc
+
+            tracemalloc.start(10)
+            try:
+                return run()
+            finally:
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(f"current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n")
+                    for stat in snapshot.statistics("lineno")[:PROFILE_LINES]:
+                        f.write(f"{stat}\n")
+    finally:
+        dump(path + ".json")
@@ -0,0 +1,112 @@
+"""Matrix operations for Matrix mode.
+
+Matrices are plain NumPy arrays. ``load`` reads CSV files or ``.npy`` files;
+``.npy`` files larger than MMAP_BYTES are memory-mapped read-only, so a
+transpose or a preview of a huge matrix never reads the whole file.
+Every operation is a single NumPy/LAPACK call, and ``apply`` runs a
+Scientific function (or any expression in ``x``) over all elements through
+``vectorized.evaluate_array``, honoring the angle mode.
+
+``preview`` renders only the corners of a large result as text, so the UI
+shows one text widget whatever the size of the matrix.
+"""
+import os
+
+MMAP_BYTES = 64 * 1024 * 1024
+PREVIEW_EDGE = 4  # Rows/columns shown at each edge of a summarized matrix
+PREVIEW_ELEMENTS = 400  # Matrices with more elements are summarized
+
+# Scientific functions offered for element-wise application
+FUNCTIONS = ["sin", "cos", "tan", "asin", "acos", "atan", "log", "log10", "sqrt"]
+
+
+def _numpy():
+    import numpy as np
+    return np
+
+
+def load(path):
+    """Read a 2-D matrix from ``.npy`` or CSV. A non-numeric first CSV row
+    is treated as a header. Raises ValueError for anything else."""
+    np = _numpy()
+    if path.lower().endswith(".npy"):
+        mmap_mode = "r" if os.path.getsize(path) > MMAP_BYTES else None
+        matrix = np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+    else:
+        try:
+            matrix = np.loadtxt(path, delimiter=",", ndmin=2)
+        except ValueError:
+            matrix = np.loadtxt(path, delimiter=",", ndmin=2, skiprows=1)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a 2-D matrix, got {matrix.ndim} dimensions")
+    return matrix
+
+
+def save(path, matrix):
+    np = _numpy()
+    if path.lower().endswith(".npy"):
+        np.save(path, matrix)
+    else:
+        np.savetxt(path, np.atleast_2d(matrix), delimiter=",", fmt="%.17g")
+
+
+def multiply(a, b):
+    return _numpy().matmul(a, b)
+
+
+def transpose(a):
+    # A view, also for memory-mapped matrices
+    return a.T
+
+
+def inverse(a):
+    return _numpy().linalg.inv(a)
+
+
+def determinant(a):
+    return float(_numpy().linalg.det(a))
+
+
+def solve(a, b):
+    """Solve ``a @ x = b`` for x."""
+    return _numpy().linalg.solve(a, b)
+
+
+def apply(function, a, angle_mode="DEG"):
+    """Element-wise ``function`` (a name from FUNCTIONS or an expression in
+    ``x``) over ``a``."""
+    import vectorized
+
+    expression = f"{function}(x)" if function in FUNCTIONS else function
+    return vectorized.evaluate_array(expression, angle_mode, x=_numpy().asarray(a, dtype=float))
+
+
+# Matrix-mode operation label -> (function, number of matrix operands)
+OPERATIONS = {
+    "A × B": (multiply, 2),
+    "Aᵀ": (transpose, 1),
+    "A⁻¹": (inverse, 1),
+    "det A": (determinant, 1),
+    "Solve A·X = B": (solve, 2),
+    "f(A)": (apply, 1),
+}
+
+
+def preview(value):
+    """Text for the result area: the whole matrix when small, otherwise a
+    shape header and the PREVIEW_EDGE rows and columns at each edge."""
+    np = _numpy()
+    if np.ndim(value) == 0:
+        return f"{float(value):.12g}"
+    shape = "×".join(str(n) for n in np.shape(value))
+    body = np.array2string(
+        value,
+        threshold=PREVIEW_ELEMENTS,
+        edgeitems=PREVIEW_EDGE,
+        precision=6,
+        max_line_width=200,
+        suppress_small=True
+    )
+    return f"{shape} matrix\n{body}"
@@ -0,0 +1,373 @@
+"""Arbitrary-precision evaluation and lazy rendering of huge results.
+
+Three precision modes share the calculator function set:
+
+* ``float``    -- the regular engine, binary floats.
+* ``decimal``  -- ``decimal.Decimal`` with a configurable number of
+  significant digits; literals are taken exactly as typed.
+* ``fraction`` -- exact ``fractions.Fraction`` arithmetic. Functions with
+  irrational results (sin, sqrt of a non-square, ...) are computed in
+  Decimal at the configured digits and converted back to a Fraction.
+
+Huge integer results are not converted to text up front: ``summarize``
+gives a scientific-notation summary and the exact digit count in constant
+time, and ``LazyResult`` carries the value so the full digit string can be
+produced later, off the UI thread.
+"""
+import ast
+import decimal
+import math
+import sys
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+
+import engine
+
+PRECISION_MODES = ("float", "decimal", "fraction")
+DEFAULT_DIGITS = 50
+LAZY_DIGITS = 5000  # Results with more digits are rendered lazily
+SUMMARY_DIGITS = 12
+_GUARD_DIGITS = 10
+
+
+# Decimal functions (series from the decimal module documentation, with
+# argument reduction so they converge quickly)
+@lru_cache(maxsize=16)
+def _pi(prec):
+    with decimal.localcontext() as ctx:
+        ctx.prec = prec + _GUARD_DIGITS
+        three = Decimal(3)
+        lasts, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+        while s != lasts:
+            lasts = s
+            n, na = n + na, na + 8
+            d, da = d + da, da + 32
+            t = (t * n) / d
+            s += t
+    with decimal.localcontext() as ctx:
+        ctx.prec = prec
+        return +s
+
+
+def _cos_sin(x):
+    ctx = decimal.getcontext()
+    two_pi = 2 * _pi(ctx.prec)
+    x = x.remainder_near(two_pi)
+    # cos and sin together, Taylor series
+    x2 = x * x
+    i, lasts = 0, 0
+    cos, sin = Decimal(1), x
+    ct, st = Decimal(1), x
+    while cos != lasts:
+        lasts = cos
+        i += 2
+        ct = -ct * x2 / (i * (i - 1))
+        st = -st * x2 / ((i + 1) * i)
+        cos += ct
+        sin += st
+    return cos, sin
+
+
+def _atan(x):
+    if x.is_nan():
+        raise ValueError("math domain error")
+    if x.is_infinite():
+        return _pi(decimal.getcontext().prec) / 2 * (1 if x > 0 else -1)
+    # atan(x) = 2 * atan(x / (1 + sqrt(1 + x*x))) halves the argument
+    halvings = 0
+    while abs(x) > Decimal("0.1"):
+        x = x / (1 + (1 + x * x).sqrt())
+        halvings += 1
+    x2 = x * x
+    total, term, n, lasts = x, x, 1, 0
+    while total != lasts:
+        lasts = total
+        term = -term * x2
+        n += 2
+        total += term / n
+    return total * (2 ** halvings)
+
+
+def _asin(x):
+    if abs(x) > 1:
+        raise ValueError("math domain error")
+    if abs(x) == 1:
+        return _pi(decimal.getcontext().prec) / 2 * x
+    return _atan(x / (1 - x * x).sqrt())
+
+
+class _DecimalFunctions:
+    def __init__(self, digits, angle_mode):
+        self.digits = digits
+        with decimal.localcontext() as ctx:
+            ctx.prec = digits + _GUARD_DIGITS
+            pi = _pi(ctx.prec)
+            self.factor = {"DEG": pi / 180, "RAD": Decimal(1), "GRAD": pi / 200}[angle_mode]
+        self.pi = pi
+
+    def to_radians(self, x):
+        return Decimal(x) * self.factor
+
+    def from_radians(self, x):
+        return x / self.factor
+
+    def namespace(self):
+        d = Decimal
+        return {
+            "sin": lambda x: _cos_sin(self.to_radians(x))[1],
+            "cos": lambda x: _cos_sin(self.to_radians(x))[0],
+            "tan": self._tan,
+            "asin": lambda x: self.from_radians(_asin(d(x))),
+            "acos": lambda x: self.from_radians(self.pi / 2 - _asin(d(x))),
+            "atan": lambda x: self.from_radians(_atan(d(x))),
+            "log": lambda x, base=None: d(x).ln() if base is None else d(x).ln() / d(base).ln(),
+            "log10": lambda x: d(x).log10(),
+            "sqrt": lambda x: d(x).sqrt(),
+            "factorial": self._factorial,
+            "radians": lambda x: d(x) * self.pi / 180,
+            "degrees": lambda x: d(x) * 180 / self.pi,
+            "pi": self.pi,
+            "e": Decimal(1).exp(),
+        }
+
+    def _tan(self, x):
+        cos, sin = _cos_sin(self.to_radians(x))
+        return sin / cos
+
+    @staticmethod
+    def _factorial(x):
+        value = Decimal(x)
+        if value != value.to_integral_value() or value < 0:
+            raise ValueError("factorial() only accepts integral values")
+        return Decimal(math.factorial(int(value)))
+
+
+class _LiteralRewriter(ast.NodeTransformer):
+    """Route numeric literals through _num() and ** through _pow() so the
+    precision namespace decides how they are represented."""
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            text = str(node.value) if isinstance(node.value, int) else repr(node.value)
+            return ast.copy_location(
+                ast.Call(func=ast.Name(id="_num", ctx=ast.Load()),
+                         args=[ast.Constant(text)], keywords=[]),
+                node
+            )
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            return ast.copy_location(
+                ast.Call(func=ast.Name(id="_pow", ctx=ast.Load()),
+                         args=[node.left, node.right], keywords=[]),
+                node
+            )
+        return node
+
+
+@lru_cache(maxsize=engine.CACHE_SIZE)
+def _compile(expression):
+    # Angle conversion happens inside the precise functions, so parse as RAD
+    tree = _LiteralRewriter().visit(engine.parse(expression, "RAD"))
+    return compile(ast.fix_missing_locations(tree), "<expression>", "eval")
+
+
+def _decimal_namespace(digits, angle_mode):
+    namespace = _DecimalFunctions(digits, angle_mode).namespace()
+    namespace["__builtins__"] = {}
+    namespace["_num"] = Decimal
+    namespace["_pow"] = lambda a, b: Decimal(a) ** Decimal(b)
+    return namespace
+
+
+def _fraction_namespace(digits, angle_mode):
+    decimal_functions = _DecimalFunctions(digits, angle_mode).namespace()
+
+    def exact(name):
+        function = decimal_functions[name]
+
+        def wrapper(*args):
+            with decimal.localcontext() as ctx:
+                ctx.prec = digits + _GUARD_DIGITS
+                result = function(*(_to_decimal(a) for a in args))
+            return _rounded_fraction(result, digits)
+        return wrapper
+
+    def sqrt(x):
+        x = Fraction(x)
+        if x >= 0:
+            num, den = math.isqrt(x.numerator), math.isqrt(x.denominator)
+            if num * num == x.numerator and den * den == x.denominator:
+                return Fraction(num, den)
+        return exact("sqrt")(x)
+
+    def power(a, b):
+        a, b = Fraction(a), Fraction(b)
+        if b.denominator == 1:
+            return a ** b.numerator
+        return exact_pow(a, b)
+
+    def exact_pow(a, b):
+        with decimal.localcontext() as ctx:
+            ctx.prec = digits + _GUARD_DIGITS
+            result = _to_decimal(a) ** _to_decimal(b)
+        return _rounded_fraction(result, digits)
+
+    def factorial(x):
+        x = Fraction(x)
+        if x.denominator != 1 or x < 0:
+            raise ValueError("factorial() only accepts integral values")
+        return Fraction(math.factorial(x.numerator))
+
+    namespace = {name: exact(name) for name in engine.FUNCTIONS}
+    namespace.update({
+        "__builtins__": {},
+        "sqrt": sqrt,
+        "factorial": factorial,
+        "pi": _rounded_fraction(decimal_functions["pi"], digits),
+        "e": _rounded_fraction(decimal_functions["e"], digits),
+        "_num": Fraction,
+        "_pow": power,
+    })
+    return namespace
+
+
+def _rounded_fraction(value, digits):
+    # Drop the guard digits so sin(30) comes out as exactly 1/2
+    with decimal.localcontext() as ctx:
+        ctx.prec = digits
+        return Fraction(+value)
+
+
+def _to_decimal(value):
+    if isinstance(value, Fraction):
+        return Decimal(value.numerator) / Decimal(value.denominator)
+    return Decimal(value)
+
+
+def evaluate(expression, angle_mode="DEG", mode="float", digits=DEFAULT_DIGITS):
+    """Evaluate ``expression`` in the given precision mode and return the
+    display-formatted result (an int for integral results, otherwise text).
+
+    Raises ZeroDivisionError for division by zero and ValueError /
+    ArithmeticError for other errors, like engine.evaluate.
+    """
+    if mode == "float":
+        return engine.format_result(engine.evaluate(expression, angle_mode))
+
+    code = _compile(expression)
+    with decimal.localcontext() as ctx:
+        ctx.prec = digits + _GUARD_DIGITS
+        # Exponents are cheap in Decimal, so 2**10**9 needs no special case
+        ctx.Emax, ctx.Emin = decimal.MAX_EMAX, decimal.MIN_EMIN
+        if mode == "decimal":
+            result = eval(code, _decimal_namespace(digits, angle_mode))
+        elif mode == "fraction":
+            result = eval(code, _fraction_namespace(digits, angle_mode))
+        else:
+            raise ValueError(f"Unknown precision mode: {mode}")
+    return format_result(result, digits)
+
+
+def format_result(result, digits=DEFAULT_DIGITS):
+    if isinstance(result, Fraction):
+        if result.denominator == 1:
+            return result.numerator
+        return f"{result.numerator}/{result.denominator}"
+    if isinstance(result, Decimal):
+        with decimal.localcontext() as ctx:
+            ctx.prec = digits
+            ctx.Emax, ctx.Emin = decimal.MAX_EMAX, decimal.MIN_EMIN
+            result = (+result).normalize()
+        if result == result.to_integral_value() and result.adjusted() < digits:
+            return int(result)
+        return str(result)
+    return engine.format_result(result)
+
+
+# Lazy rendering
+_LOG_PREC = 60
+_TOP_BITS = 160  # log10 of the top bits is exact to ~48 significant digits
+
+
+def _log10(value):
+    # log10(top * 2**shift) with the top bits of value, in Decimal
+    shift = max(value.bit_length() - _TOP_BITS, 0)
+    with decimal.localcontext() as ctx:
+        ctx.prec = _LOG_PREC
+        return Decimal(value >> shift).log10() + shift * Decimal(2).log10()
+
+
+def digit_count(value):
+    """Exact number of decimal digits of an int without converting it."""
+    value = abs(value)
+    if value < 10:
+        return 1
+    log = _log10(value)
+    nearest = int(log.to_integral_value())
+    if abs(log - nearest) > Decimal("1e-40"):
+        return int(log) + 1
+    # Right next to a power of ten, settle it exactly
+    return nearest + 1 if value >= 10 ** nearest else nearest
+
+
+def summarize(value):
+    """Scientific-notation summary like '2.84625968091e+35659 [35,660 digits]'.
+
+    Digit count and leading digits come from a high-precision logarithm of
+    the top bits, so the cost does not grow with the size of ``value``.
+    """
+    digits = digit_count(value)
+    with decimal.localcontext() as ctx:
+        ctx.prec = _LOG_PREC
+        # The nudge keeps an exact 9 from truncating to 8.99999999999
+        mantissa = Decimal(10) ** (_log10(abs(value)) - (digits - 1)) + Decimal("1e-45")
+    # Within rounding error of a power of ten the digit count decides
+    if mantissa < 1:
+        mantissa = Decimal(1)
+    elif mantissa >= 10:
+        mantissa = Decimal("9.9999999999999999999")
+    leading = format(mantissa, "f").replace(".", "")[:SUMMARY_DIGITS].rstrip("0") or "0"
+    mantissa = leading[0] + ("." + leading[1:] if len(leading) > 1 else "")
+    sign = "-" if value < 0 else ""
+    return f"{sign}{mantissa}e+{digits - 1} [{digits:,} digits]"
+
+
+class LazyResult:
+    """A huge integer result shown as a summary; ``full_text`` produces all
+    the digits (slow, meant for a worker process)."""
+
+    def __init__(self, value):
+        self.value = value
+        self.summary = summarize(value)
+
+    def __str__(self):
+        return self.summary
+
+    def full_text(self):
+        return full_digits(self.value)
+
+
+def full_digits(value):
+    """All the digits of ``value``, bypassing the int-to-str length limit."""
+    if hasattr(sys, "set_int_max_str_digits"):
+        previous = sys.get_int_max_str_digits()
+        sys.set_int_max_str_digits(0)
+        try:
+            return str(value)
+        finally:
+            sys.set_int_max_str_digits(previous)
+    return str(value)
+
+
+def render(value, lazy_digits=LAZY_DIGITS):
+    """Return ``value`` unchanged, or a LazyResult when it is an int with
+    more than ``lazy_digits`` digits."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        # bit_length * log10(2) bounds the digit count without math on the value
+        if value.bit_length() * 0.30103 > lazy_digits:
+            return LazyResult(value)
+    return value
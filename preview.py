@@ -0,0 +1,299 @@
+"""Live result preview with incremental re-evaluation.
+
+The expression is lexed and reduced with an operator-precedence parser whose
+stacks are immutable linked lists, so the parser state after every token
+can be kept as a snapshot at O(1) cost. When the text changes, only the
+tokens after the longest common prefix are re-lexed, starting from the last
+snapshot before the edit. Closed parentheses and completed operations are
+already reduced to numbers inside the snapshots, so typing one more digit
+re-evaluates just the tail. Computing the preview value then closes the
+pending operators on a copy of the state, which costs O(nesting depth)
+rather than O(length).
+
+The grammar and angle-mode handling follow ``engine``. Operations that
+could stall the UI thread (huge powers, shifts and factorials) yield no
+preview rather than being computed, and integers too long for ``str()``
+are previewed as a ``precision.LazyResult`` summary.
+"""
+import math
+import operator
+import re
+
+import engine
+import precision
+
+PREVIEW_BUDGET_MS = 1.0  # per keystroke, on a 1,000-character expression
+MAX_PREVIEW_BITS = 1 << 15
+MAX_PREVIEW_FACTORIAL = 1000
+SUMMARY_DIGITS = 4000  # Longer ints are summarized; str() stops at 4300 digits
+
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d*)?)"
+    r"|(?P<name>[A-Za-z_][A-Za-z_0-9]*(?:\.[A-Za-z_][A-Za-z_0-9]*)?\.?)"
+    r"|(?P<op>\*\*|//|<<?|>>?|[-+*/%&|^~(),])"
+    r")"
+)
+
+# Binary operator -> (precedence, function); ** is the only right-associative one
+_BINARY = {
+    "|": (1, operator.or_),
+    "^": (2, operator.xor),
+    "&": (3, operator.and_),
+    "<<": (4, operator.lshift),
+    ">>": (4, operator.rshift),
+    "+": (5, operator.add),
+    "-": (5, operator.sub),
+    "*": (6, operator.mul),
+    "/": (6, operator.truediv),
+    "//": (6, operator.floordiv),
+    "%": (6, operator.mod),
+    "**": (8, operator.pow),
+}
+_UNARY_PRECEDENCE = 7
+_UNARY = {"-": operator.neg, "+": operator.pos, "~": operator.invert}
+
+
+class PreviewUnavailable(Exception):
+    pass
+
+
+# Immutable stacks: None or (head, tail)
+def _push(stack, item):
+    return (item, stack)
+
+
+class _State:
+    __slots__ = ("values", "ops", "expect_operand", "error")
+
+    def __init__(self, values=None, ops=None, expect_operand=True, error=False):
+        self.values = values
+        self.ops = ops
+        self.expect_operand = expect_operand
+        self.error = error
+
+
+_ERROR = _State(error=True)
+
+
+def _check_cost(op, left, right):
+    # Keep the UI thread away from runaway big-int work
+    if isinstance(left, int) and isinstance(right, int):
+        if op == "**" and right > 0 and left.bit_length() * right > MAX_PREVIEW_BITS:
+            raise PreviewUnavailable
+        if op == "<<" and right > MAX_PREVIEW_BITS:
+            raise PreviewUnavailable
+        if op == "*" and left.bit_length() + right.bit_length() > MAX_PREVIEW_BITS:
+            raise PreviewUnavailable
+
+
+class IncrementalPreview:
+    def __init__(self, angle_mode="DEG"):
+        self.angle_mode = angle_mode
+        self.factor = engine.ANGLE_FACTORS[angle_mode]
+        self.text = ""
+        # Parallel lists: end offset of each token and the state after it
+        self._ends = []
+        self._states = []
+
+    def set_angle_mode(self, angle_mode):
+        if angle_mode != self.angle_mode:
+            # Function results in the snapshots depend on the angle mode
+            self.__init__(angle_mode)
+
+    def update(self, text):
+        """Bring the parse state up to date with ``text`` and return the
+        preview value (display-formatted), or None when there is none."""
+        self._advance(text)
+        return self.value()
+
+    def _advance(self, text):
+        old = self.text
+        if text.startswith(old):
+            common = len(old)
+        elif old.startswith(text):
+            common = len(text)
+        else:
+            common = 0
+            for a, b in zip(old, text):
+                if a != b:
+                    break
+                common += 1
+
+        # Drop every token that touches the edit, it may lex differently now
+        ends = self._ends
+        while ends and ends[-1] >= common:
+            ends.pop()
+            self._states.pop()
+
+        position = ends[-1] if ends else 0
+        state = self._states[-1] if self._states else _State()
+        while position < len(text) and not state.error:
+            match = _TOKEN.match(text, position)
+            if match is None or match.end() == position:
+                if text[position:].strip():
+                    state = _ERROR
+                position = len(text)
+            else:
+                state = self._feed(state, match)
+                position = match.end()
+            ends.append(position)
+            self._states.append(state)
+        self.text = text
+
+    # Parsing
+    def _feed(self, state, match):
+        kind = match.lastgroup
+        token = match.group(kind)
+        try:
+            if kind == "number":
+                return self._operand(state, self._number(token))
+            if kind == "name":
+                return self._name(state, token)
+            return self._operator(state, token)
+        except PreviewUnavailable:
+            return _ERROR
+        except (ArithmeticError, ValueError, TypeError):
+            return _ERROR
+
+    @staticmethod
+    def _number(token):
+        text = token.rstrip("eE+-")
+        if "." in text or "e" in text or "E" in text:
+            return float(text)
+        return int(text)
+
+    def _operand(self, state, value):
+        if not state.expect_operand:
+            return _ERROR
+        return _State(_push(state.values, value), state.ops, False)
+
+    def _name(self, state, token):
+        if token.endswith("."):
+            return _ERROR if token != "math." else state  # partial "math."
+        name = token[5:] if token.startswith("math.") else token
+        if name in engine.CONSTANTS:
+            return self._operand(state, engine.CONSTANTS[name])
+        if name in engine.FUNCTIONS and state.expect_operand:
+            return _State(state.values, _push(state.ops, ("fname", name)), True)
+        return _ERROR
+
+    def _operator(self, state, token):
+        ops = state.ops
+        top = ops[0] if ops else None
+
+        if top is not None and top[0] == "fname" and token != "(":
+            return _ERROR
+
+        if token == "(":
+            if top is not None and top[0] == "fname":
+                return _State(state.values, _push(ops[1], ("call", top[1], ())), True)
+            if not state.expect_operand:
+                return _ERROR
+            return _State(state.values, _push(ops, ("paren",)), True)
+
+        if token in (")", ","):
+            if state.expect_operand:
+                return _ERROR
+            values, ops = self._reduce(state.values, ops, 0)
+            if ops is None or ops[0][0] not in ("paren", "call"):
+                return _ERROR
+            marker = ops[0]
+            if token == ",":
+                if marker[0] != "call":
+                    return _ERROR
+                value, values = values
+                return _State(values, _push(ops[1], ("call", marker[1], marker[2] + (value,))), True)
+            value, values = values
+            if marker[0] == "call":
+                value = self._call(marker[1], marker[2] + (value,))
+            return _State(_push(values, value), ops[1], False)
+
+        if state.expect_operand:
+            if token in _UNARY:
+                return _State(state.values, _push(ops, ("unary", token)), True)
+            return _ERROR
+
+        if token in ("<", ">"):
+            # First half of a shift operator
+            return _State(state.values, _push(ops, ("partial", token)), True)
+        if token not in _BINARY:
+            return _ERROR  # "~" after an operand
+        precedence = _BINARY[token][0]
+        # ** is right-associative: only reduce strictly higher precedence
+        limit = precedence + 1 if token == "**" else precedence
+        values, ops = self._reduce(state.values, ops, limit)
+        return _State(values, _push(ops, ("binary", token)), True)
+
+    def _reduce(self, values, ops, limit):
+        """Apply stacked operators with precedence >= limit."""
+        while ops is not None:
+            entry = ops[0]
+            if entry[0] == "binary":
+                if _BINARY[entry[1]][0] < limit:
+                    break
+                right, values = values
+                left, values = values
+                _check_cost(entry[1], left, right)
+                values = _push(values, _BINARY[entry[1]][1](left, right))
+            elif entry[0] == "unary":
+                if _UNARY_PRECEDENCE < limit:
+                    break
+                value, values = values
+                values = _push(values, _UNARY[entry[1]](value))
+            else:
+                break
+            ops = ops[1]
+        return values, ops
+
+    def _call(self, name, args):
+        if name == "factorial" and args and isinstance(args[0], int) and args[0] > MAX_PREVIEW_FACTORIAL:
+            raise PreviewUnavailable
+        function = engine.FUNCTIONS[name]
+        if self.factor != 1.0:
+            if name in engine.TRIG_FUNCTIONS and len(args) == 1:
+                return function(args[0] * self.factor)
+            if name in engine.INVERSE_TRIG_FUNCTIONS:
+                return function(*args) / self.factor
+        return function(*args)
+
+    # Preview value
+    def value(self):
+        state = self._states[-1] if self._states else None
+        if state is None or state.error:
+            return None
+        values, ops = state.values, state.ops
+        try:
+            # Ignore a dangling operator / open call at the end ("1+", "sin(")
+            expect_operand = state.expect_operand
+            while expect_operand and ops is not None:
+                entry = ops[0]
+                ops = ops[1]
+                if entry[0] == "binary" or entry[0] == "partial":
+                    expect_operand = False
+                elif entry[0] == "call" and entry[2]:
+                    value = self._call(entry[1], entry[2])
+                    values = _push(values, value)
+                    expect_operand = False
+            if values is None:
+                return None
+
+            # Close everything still open
+            while True:
+                values, ops = self._reduce(values, ops, 0)
+                if ops is None:
+                    break
+                entry = ops[0]
+                ops = ops[1]
+                if entry[0] == "call":
+                    value, values = values
+                    values = _push(values, self._call(entry[1], entry[2] + (value,)))
+                elif entry[0] != "paren":
+                    return None
+
+            result = values[0]
+            if isinstance(result, float) and math.isinf(result):
+                return None
+            return precision.render(engine.format_result(result), SUMMARY_DIGITS)
+        except (PreviewUnavailable, ArithmeticError, ValueError, TypeError):
+            return None
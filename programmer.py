@@ -0,0 +1,182 @@
+"""Fixed-width integer engine for Programming mode.
+
+Operands are written in the active base (``FF & 0F`` in HEX, ``1010 << 2``
+in BIN), every intermediate result is wrapped to the selected word size
+with two's-complement semantics, and results are rendered in all four bases
+at once. ``/`` is integer division truncating toward zero, as on a
+hardware ALU; ``%`` follows the sign of the dividend to match.
+
+``apply`` runs the bitwise operators over whole NumPy integer arrays, for
+decoding register dumps and similar bulk data.
+"""
+import ast
+import operator
+import re
+
+BASES = {"HEX": 16, "DEC": 10, "OCT": 8, "BIN": 2}
+WORD_SIZES = (8, 16, 32, 64)
+
+_OPERAND = re.compile(r"[0-9A-Za-z_]+")
+
+
+def wrap(value, bits=64, signed=True):
+    value &= (1 << bits) - 1
+    if signed and value >> (bits - 1):
+        value -= 1 << bits
+    return value
+
+
+def _truncating_div(a, b):
+    quotient = abs(a) // abs(b)
+    return quotient if (a < 0) == (b < 0) else -quotient
+
+
+def _truncating_mod(a, b):
+    return a - b * _truncating_div(a, b)
+
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: _truncating_div,
+    ast.FloorDiv: _truncating_div,
+    ast.Mod: _truncating_mod,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+}
+
+
+class _Evaluator:
+    def __init__(self, bits, signed):
+        self.bits = bits
+        self.signed = signed
+
+    def wrap(self, value):
+        return wrap(value, self.bits, self.signed)
+
+    def visit(self, node):
+        if isinstance(node, ast.Expression):
+            return self.visit(node.body)
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            return self.wrap(node.value)
+        if isinstance(node, ast.UnaryOp):
+            operand = self.visit(node.operand)
+            if isinstance(node.op, ast.Invert):
+                return self.wrap(~operand)
+            if isinstance(node.op, ast.USub):
+                return self.wrap(-operand)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+        if isinstance(node, ast.BinOp):
+            left, right = self.visit(node.left), self.visit(node.right)
+            op = type(node.op)
+            if op in _BIN_OPS:
+                return self.wrap(_BIN_OPS[op](left, right))
+            if op in (ast.LShift, ast.RShift):
+                if right < 0:
+                    raise ValueError("negative shift count")
+                if op is ast.LShift:
+                    return self.wrap(left << min(right, self.bits))
+                return self.wrap(left >> min(right, self.bits))
+            if op is ast.Pow:
+                if right < 0:
+                    raise ValueError("negative exponent")
+                # Modular power keeps the intermediate within the word
+                return self.wrap(pow(left, right, 1 << self.bits))
+        raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+
+
+def to_decimal_expression(expression, base="DEC"):
+    """Rewrite every operand from ``base`` to a decimal literal."""
+    radix = BASES[base]
+    return _OPERAND.sub(lambda m: str(int(m.group(0), radix)), expression)
+
+
+def evaluate(expression, base="DEC", bits=64, signed=True):
+    """Evaluate an integer expression written in ``base``.
+
+    Raises ZeroDivisionError for division by zero and ValueError for
+    anything that is not a valid fixed-width integer expression.
+    """
+    if bits not in WORD_SIZES:
+        raise ValueError(f"Unsupported word size: {bits}")
+    if expression.count("(") > expression.count(")"):
+        expression += ")" * (expression.count("(") - expression.count(")"))
+    try:
+        tree = ast.parse(to_decimal_expression(expression, base), mode="eval")
+    except SyntaxError as exc:
+        raise ValueError(str(exc)) from None
+    return _Evaluator(bits, signed).visit(tree)
+
+
+def format_value(value, base, bits=64, signed=True):
+    if base == "DEC":
+        return str(wrap(value, bits, signed))
+    # Other bases show the raw two's-complement bit pattern
+    pattern = value & ((1 << bits) - 1)
+    if base == "HEX":
+        return format(pattern, "X")
+    if base == "OCT":
+        return format(pattern, "o")
+    return format(pattern, "b")
+
+
+def format_all(value, bits=64, signed=True):
+    return {base: format_value(value, base, bits, signed) for base in BASES}
+
+
+def parse_value(text, base, bits=64, signed=True):
+    """Parse a single number shown in ``base`` back to its wrapped value."""
+    return wrap(int(text, BASES[base]), bits, signed)
+
+
+# Vectorized operations
+_BATCH_OPS = ("&", "|", "^", "~", "<<", ">>", "%")
+
+
+def _dtype(bits, signed):
+    import numpy as np
+    return np.dtype(f"{'int' if signed else 'uint'}{bits}")
+
+
+def apply(op, a, b=None, bits=32, signed=False):
+    """Apply ``op`` element-wise over integer arrays of the given word size.
+
+    ``a`` and ``b`` are cast (with wraparound) to the word's dtype. Shift
+    counts outside [0, bits) saturate instead of giving platform-dependent
+    results: ``<<`` gives 0 and ``>>`` gives 0, or -1 for an arithmetic
+    shift of a negative value. ``% 0`` gives 0.
+    """
+    import numpy as np
+
+    if op not in _BATCH_OPS:
+        raise ValueError(f"Unsupported operator: {op}")
+    dtype = _dtype(bits, signed)
+    a = np.asarray(a).astype(dtype, copy=False)
+    if op == "~":
+        return np.invert(a)
+
+    if op in ("<<", ">>"):
+        counts = np.asarray(b).astype(np.int64, copy=False)
+        too_far = (counts < 0) | (counts >= bits)
+        counts = np.where(too_far, bits - 1, counts).astype(dtype, copy=False)
+        if op == "<<":
+            return np.where(too_far, 0, np.left_shift(a, counts)).astype(dtype, copy=False)
+        shifted = np.right_shift(a, counts)
+        if signed:
+            # Shifting by bits-1 already fills with the sign bit
+            return shifted
+        return np.where(too_far, 0, shifted).astype(dtype, copy=False)
+
+    b = np.asarray(b).astype(dtype, copy=False)
+    if op == "&":
+        return np.bitwise_and(a, b)
+    if op == "|":
+        return np.bitwise_or(a, b)
+    if op == "^":
+        return np.bitwise_xor(a, b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.fmod(a, np.where(b == 0, 1, b).astype(dtype, copy=False))
+    return np.where(b == 0, 0, result).astype(dtype, copy=False)
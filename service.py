@@ -0,0 +1,487 @@
+"""Local JSON-RPC 2.0 calculation service over HTTP.
+
+    python calc.py --serve --port 8765 --workers 4
+    curl -d '{"jsonrpc": "2.0", "id": 1, "method": "evaluate",
+              "params": {"expression": "sin(30)*2"}}' http://127.0.0.1:8765/
+
+Methods (params by name or position):
+
+- ``evaluate(expression, angle_mode="DEG", precision="float", digits=50)``
+- ``convert(value, from_unit, to_unit, category=None)``
+- ``date_difference(date1, date2, holidays=[])``
+- ``programming(expression, base="DEC", bits=64, signed=True)``
+
+The asyncio front end keeps one coroutine per connection (HTTP/1.1
+keep-alive, JSON-RPC batch arrays accepted). Calls are not run one by one:
+``Batcher`` collects them for up to BATCH_WINDOW_MS (or BATCH_SIZE calls)
+and sends each batch to a process pool, split into one slice per worker.
+Within a slice, unit conversions with the same units are one
+``units.convert_array`` call and date differences one
+``dates.difference_arrays`` call. Results are kept in an LRU shared by all
+clients, and identical calls already in flight wait on the same future,
+so a popular expression is computed once.
+
+Calls get the same budgets as the display (see ``worker``). Each worker is
+a one-process pool running one slice at a time; a slice that runs past
+EVALUATION_TIMEOUT has its process killed and the pool replaced, and its
+calls are run again one at a time to find the one that stalled, which is
+answered "Timed out". Integer results beyond MAX_RESULT_BITS are answered
+"Result too large". A client waits at most REQUEST_TIMEOUT for an answer.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import worker
+
+HOST = "127.0.0.1"
+PORT = 8765
+BATCH_WINDOW_MS = 2
+BATCH_SIZE = 512
+RESULT_CACHE_SIZE = 10000
+REQUEST_TIMEOUT = 10.0  # seconds
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+TIMED_OUT = "Timed out"
+TOO_LARGE = "Result too large"
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+CALCULATION_ERROR = -32000
+
+_PARAMETERS = {
+    "evaluate": ("expression", "angle_mode", "precision", "digits"),
+    "convert": ("value", "from_unit", "to_unit", "category"),
+    "date_difference": ("date1", "date2", "holidays"),
+    "programming": ("expression", "base", "bits", "signed"),
+}
+_DEFAULTS = {
+    "evaluate": (None, "DEG", "float", 50),
+    "convert": (None, None, None, None),
+    "date_difference": (None, None, ()),
+    "programming": (None, "DEC", 64, True),
+}
+_SCALARS = (str, int, float, bool, type(None))
+
+
+class CalculationError(Exception):
+    """Reported to the client as a JSON-RPC error with CALCULATION_ERROR."""
+
+
+def bind_params(method, params):
+    """JSON-RPC params (list or dict) -> a hashable tuple of arguments.
+    Raises TypeError for missing, unknown or malformed parameters."""
+    names, defaults = _PARAMETERS[method], _DEFAULTS[method]
+    if params is None:
+        params = []
+    if isinstance(params, list):
+        if len(params) > len(names):
+            raise TypeError("Too many parameters")
+        values = list(params) + list(defaults[len(params):])
+    elif isinstance(params, dict):
+        unknown = set(params) - set(names)
+        if unknown:
+            raise TypeError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+        values = [params.get(name, default) for name, default in zip(names, defaults)]
+    else:
+        raise TypeError("params must be an array or an object")
+    for name, value, default in zip(names, values, defaults):
+        if value is None and default is None and not (method == "convert" and name == "category"):
+            raise TypeError(f"Missing parameter: {name}")
+        # Only holidays is a list (of dates); objects and nested arrays
+        # cannot be a cache key
+        if name == "holidays":
+            if not isinstance(value, (list, tuple)) or not all(isinstance(day, str) for day in value):
+                raise TypeError("holidays must be an array of strings")
+        elif not isinstance(value, _SCALARS):
+            raise TypeError(f"Invalid parameter: {name}")
+    # Lists (holidays) become tuples so the call can be a cache key
+    return tuple(tuple(value) if isinstance(value, list) else value for value in values)
+
+
+# Pool side
+def _jsonable(value):
+    import precision
+
+    if isinstance(value, int) and not isinstance(value, bool):
+        if value.bit_length() > worker.MAX_RESULT_BITS:
+            raise worker.ResultTooLarge
+        value = precision.render(value)
+        if isinstance(value, precision.LazyResult):
+            return value.summary
+        # JSON numbers beyond 2**53 lose precision in most clients
+        return value if abs(value) < 2 ** 53 else precision.full_digits(value)
+    if isinstance(value, float):
+        return value
+    return str(value)
+
+
+def _evaluate(expression, angle_mode, precision_mode, digits):
+    import engine
+    import precision
+    if precision_mode == "float":
+        # The engine's value, not the display-rounded text ("0.333333")
+        result = engine.evaluate(expression, angle_mode)
+        if isinstance(result, float):
+            if not math.isfinite(result):
+                raise CalculationError("Result is not a finite number")  # No JSON for inf/nan
+            return result
+        return _jsonable(result)
+    return _jsonable(precision.evaluate(expression, angle_mode, precision_mode, digits))
+
+
+def _programming(expression, base, bits, signed):
+    import programmer
+    return programmer.format_all(programmer.evaluate(expression, base, bits, signed), bits, signed)
+
+
+def _date_difference(date1, date2, holidays):
+    import dates
+    return dates.difference(date1, date2, holidays)._asdict()
+
+
+def _convert(value, from_unit, to_unit, category):
+    import units
+    try:
+        return units.convert(float(value), from_unit, to_unit, category)
+    except KeyError:
+        raise CalculationError("Conversion not available") from None
+
+
+_CALLS = {
+    "evaluate": _evaluate,
+    "convert": _convert,
+    "date_difference": _date_difference,
+    "programming": _programming,
+}
+
+
+def _outcome(function, args):
+    try:
+        return function(*args), None
+    except ZeroDivisionError:
+        return None, "Cannot divide by zero"
+    except worker.ResultTooLarge:
+        return None, TOO_LARGE
+    except CalculationError as exc:
+        return None, str(exc)
+    except Exception as exc:
+        return None, f"Error: {exc}" if str(exc) else "Error"
+
+
+def _convert_group(calls):
+    """Vectorized conversions: every call shares (from_unit, to_unit, category)."""
+    import numpy as np
+    import units
+
+    _, from_unit, to_unit, category = calls[0]
+    try:
+        values = np.array([float(value) for value, *_ in calls])
+        converted = units.convert_array(values, from_unit, to_unit, category)
+    except (KeyError, TypeError, ValueError):
+        return [_outcome(_convert, args) for args in calls]
+    return [(value, None) for value in converted.tolist()]
+
+
+def _date_group(calls):
+    """Vectorized date differences: every call shares its holiday list."""
+    import dates
+
+    try:
+        fields = dates.difference_arrays([c[0] for c in calls], [c[1] for c in calls], calls[0][2])
+    except (TypeError, ValueError):
+        return [_outcome(_date_difference, args) for args in calls]
+    columns = {name: values.tolist() for name, values in fields.items()}
+    return [({name: column[i] for name, column in columns.items()}, None) for i in range(len(calls))]
+
+
+def run_batch(calls):
+    """Pool entry point: [(method, args)] -> [(result, error)] in order."""
+    outcomes = [None] * len(calls)
+    groups = {}
+    for i, (method, args) in enumerate(calls):
+        if method == "convert":
+            groups.setdefault(("convert",) + tuple(args[1:]), []).append(i)
+        elif method == "date_difference":
+            groups.setdefault(("date_difference", args[2]), []).append(i)
+        else:
+            outcomes[i] = _outcome(_CALLS[method], args)
+
+    for key, indexes in groups.items():
+        args = [calls[i][1] for i in indexes]
+        if len(indexes) == 1:
+            results = [_outcome(_CALLS[key[0]], args[0])]
+        elif key[0] == "convert":
+            results = _convert_group(args)
+        else:
+            results = _date_group(args)
+        for i, result in zip(indexes, results):
+            outcomes[i] = result
+    return outcomes
+
+
+def _terminate(pool):
+    """Kill ``pool``'s processes, running calls included."""
+    terminate = getattr(pool, "terminate_workers", None)  # Python 3.14+
+    if terminate is not None:
+        terminate()
+        return
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False)
+
+
+# Front end
+class Batcher:
+    """Collects calls for a short window and runs them in batches on
+    ``workers`` one-process pools."""
+
+    def __init__(self, workers, cache_size=RESULT_CACHE_SIZE, timeout=worker.EVALUATION_TIMEOUT):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.timeout = timeout
+        # One process each, so killing a stalled slice kills nothing else
+        self.pools = [ProcessPoolExecutor(max_workers=1) for _ in range(workers)]
+        self.idle = asyncio.Queue()
+        for pool in self.pools:
+            self.idle.put_nowait(pool)
+        self.cache = OrderedDict()  # (method, args) -> (result, error)
+        self.in_flight = {}  # (method, args) -> Future
+        self.pending = []
+        self.flush_handle = None
+        self.stats = {"calls": 0, "cache_hits": 0, "batches": 0, "pools_recycled": 0}
+
+    async def call(self, method, args):
+        key = (method, args)
+        self.stats["calls"] += 1
+        outcome = self.cache.get(key)
+        if outcome is not None:
+            self.stats["cache_hits"] += 1
+            self.cache.move_to_end(key)
+            return outcome
+        future = self.in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self.in_flight[key] = loop.create_future()
+            self.pending.append(key)
+            if len(self.pending) >= BATCH_SIZE:
+                self.flush()
+            elif self.flush_handle is None:
+                self.flush_handle = loop.call_later(BATCH_WINDOW_MS / 1000, self.flush)
+        else:
+            self.stats["cache_hits"] += 1
+        return await asyncio.wait_for(asyncio.shield(future), REQUEST_TIMEOUT)
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        keys, self.pending = self.pending, []
+        if not keys:
+            return
+        # One slice per worker so a large batch uses every core
+        size = -(-len(keys) // self.workers)
+        for start in range(0, len(keys), size):
+            self.stats["batches"] += 1
+            asyncio.ensure_future(self._run(keys[start:start + size]))
+
+    async def _run(self, keys):
+        try:
+            for key, outcome, cache in await self._attempt(keys):
+                if cache:
+                    self.cache[key] = outcome
+                    if len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+                future = self.in_flight.pop(key)
+                if not future.done():
+                    future.set_result(outcome)
+        finally:
+            # Whatever went wrong, no caller is left waiting on these keys
+            for key in keys:
+                future = self.in_flight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result((None, "Error"))
+
+    async def _attempt(self, keys):
+        """[(key, outcome, cacheable)] for ``keys``, run within the budget."""
+        loop = asyncio.get_running_loop()
+        # The budget starts once a worker is free, not while waiting for one
+        pool = await self.idle.get()
+        try:
+            outcomes = await asyncio.wait_for(loop.run_in_executor(pool, run_batch, keys), self.timeout)
+            return [(key, outcome, True) for key, outcome in zip(keys, outcomes)]
+        except (asyncio.TimeoutError, BrokenProcessPool) as exc:
+            timed_out = isinstance(exc, asyncio.TimeoutError)
+            pool = self._recycle(pool)
+        except Exception as exc:
+            # Not an answer worth caching
+            return [(key, (None, f"Error: {exc}"), False) for key in keys]
+        finally:
+            self.idle.put_nowait(pool)
+        if len(keys) > 1:
+            # One of these stalled or killed its worker: run each on its own to find it
+            parts = await asyncio.gather(*(self._attempt([key]) for key in keys))
+            return [item for part in parts for item in part]
+        return [(keys[0], (None, TIMED_OUT if timed_out else "Error"), False)]
+
+    def _recycle(self, pool):
+        """Kill ``pool`` and return the new pool that replaces it."""
+        _terminate(pool)
+        self.stats["pools_recycled"] += 1
+        replacement = ProcessPoolExecutor(max_workers=1)
+        self.pools[self.pools.index(pool)] = replacement
+        return replacement
+
+    def close(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        for pool in self.pools:
+            _terminate(pool)
+
+
+def _error(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+async def handle_call(batcher, request):
+    """One JSON-RPC request object -> response object (None for notifications)."""
+    if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or "method" not in request:
+        return _error(None, INVALID_REQUEST, "Invalid request")
+    request_id = request.get("id")
+    method = request["method"]
+    if method not in _CALLS:
+        return _error(request_id, METHOD_NOT_FOUND, f"Method not found: {method}")
+    try:
+        args = bind_params(method, request.get("params"))
+    except TypeError as exc:
+        return _error(request_id, INVALID_PARAMS, str(exc))
+    try:
+        result, error = await batcher.call(method, args)
+    except asyncio.TimeoutError:
+        result, error = None, TIMED_OUT
+    if "id" not in request:
+        return None
+    if error is not None:
+        return _error(request_id, CALCULATION_ERROR, error)
+    return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+
+async def handle_body(batcher, body):
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return _error(None, PARSE_ERROR, "Parse error")
+    if isinstance(payload, list):
+        if not payload:
+            return _error(None, INVALID_REQUEST, "Empty batch")
+        responses = await asyncio.gather(*(handle_call(batcher, request) for request in payload))
+        return [response for response in responses if response is not None] or None
+    return await handle_call(batcher, payload)
+
+
+async def _read_request(reader):
+    """(method, path, headers, body) or None at end of connection."""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_BYTES:
+        raise ValueError("Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def _response(status, payload=None, keep_alive=True):
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def handle_connection(batcher, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                writer.write(_response("400 Bad Request", keep_alive=False))
+                break
+            if request is None:
+                break
+            method, path, headers, body = request
+            keep_alive = headers.get("connection", "").lower() != "close"
+            if method != "POST":
+                writer.write(_response("405 Method Not Allowed", keep_alive=keep_alive))
+            elif path not in ("/", "/rpc"):
+                writer.write(_response("404 Not Found", keep_alive=keep_alive))
+            else:
+                payload = await handle_body(batcher, body)
+                status = "200 OK" if payload is not None else "204 No Content"
+                writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=HOST, port=PORT, workers=None, ready=None):
+    """Run the service until cancelled. ``ready`` is called with the bound
+    port once the socket is listening (useful with ``port=0``)."""
+    workers = workers or os.cpu_count() or 1
+    batcher = Batcher(workers)
+    try:
+        server = await asyncio.start_server(
+            lambda reader, writer: handle_connection(batcher, reader, writer), host, port
+        )
+        bound_port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready(bound_port)
+        async with server:
+            await server.serve_forever()
+    finally:
+        # Killed rather than joined, so a runaway call cannot hold up shutdown
+        batcher.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve calculator operations as JSON-RPC over HTTP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    def ready(port):
+        print(f"Serving on http://{args.host}:{port}/", file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
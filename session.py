@@ -0,0 +1,124 @@
+"""Session snapshots: save the calculator's state, restore it at startup.
+
+A snapshot is one compact JSON document::
+
+    {"version": 1, "core": {...}, "ui": {...}}
+
+``core`` is ``CalculatorCore.snapshot()`` (memory, angle mode, base, word
+size, precision, worksheet text) and ``ui`` the window state (mode,
+expression, theme, converter and date fields, ...). History is not part of
+the snapshot; it already has its own append-only log.
+
+``write`` is atomic: the document goes to a temporary file in the same
+directory, is fsynced and then renamed over the old snapshot, so a crash
+leaves either the old or the new one. ``Autosaver`` runs the writes on a
+background thread: the Tk thread only hands over a dict, and a snapshot
+equal to the last one written is skipped. Snapshots from older versions
+are upgraded by MIGRATIONS; unreadable or newer ones are ignored.
+"""
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".elite_calculator", "session.json")
+VERSION = 1
+AUTOSAVE_INTERVAL_MS = 30000
+
+# version -> function upgrading a snapshot of that version to version + 1
+MIGRATIONS = {}
+
+
+def encode(core_state, ui_state):
+    snapshot = {"version": VERSION, "core": core_state, "ui": ui_state}
+    return json.dumps(snapshot, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def write(path, data):
+    """Atomically replace ``path`` with the bytes ``data``."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".session-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read(path):
+    """The snapshot at ``path`` upgraded to VERSION, or None if there is no
+    usable snapshot."""
+    try:
+        with open(path, "rb") as f:
+            snapshot = json.loads(f.read())
+        version = snapshot["version"]
+        while version < VERSION:
+            snapshot = MIGRATIONS[version](snapshot)
+            version = snapshot["version"]
+        if version != VERSION:
+            return None
+        snapshot.setdefault("core", {})
+        snapshot.setdefault("ui", {})
+        return snapshot
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+class Autosaver:
+    """Writes snapshots on a background thread, newest wins."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = None
+        self._last = None
+        self._closed = False
+        self.writes = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def save(self, core_state, ui_state):
+        """Queue a snapshot; returns immediately."""
+        with self._lock:
+            self._pending = (core_state, ui_state)
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            # Read before writing: a close() during the write wakes us again
+            closed = self._closed
+            self._write_pending()
+            if closed:
+                return
+
+    def _write_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        data = encode(*pending)
+        if data == self._last:
+            return
+        try:
+            write(self.path, data)
+        except OSError:
+            return  # Try again with the next snapshot
+        self._last = data
+        self.writes += 1
+
+    def close(self):
+        """Write whatever is queued and stop the thread."""
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
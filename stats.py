@@ -0,0 +1,321 @@
+"""Streaming one-pass statistics.
+
+``Summary`` accumulates count, sum, min, max and the running mean and sum of
+squared deviations (Welford; whole chunks are folded in with Chan's update),
+plus a ``QuantileSketch`` for approximate quantiles. Memory is constant in
+the number of values, and two summaries of disjoint data ``merge`` into the
+summary of their union, so chunks can be processed independently.
+
+``summarize_file`` reads a file through ``mmap`` in chunks of whole lines;
+with ``workers > 1`` the file is split at line boundaries into one byte
+range per worker process and the partial summaries are merged.
+``summarize_stream`` does the same for a pipe, and ``summarize_text`` for
+numbers typed into the Statistics panel.
+
+    python stats.py data.csv --column price --workers 8
+    cat numbers.txt | python calc.py --stats -
+
+Without a column every whitespace-separated token is a value; with a column
+the first line is a CSV header. Cells that are not finite numbers are
+skipped.
+"""
+import argparse
+import csv
+import math
+import mmap
+import os
+import sys
+
+CHUNK_BYTES = 1 << 24
+RELATIVE_ACCURACY = 0.005  # Quantile sketch error, relative to the value
+REPORT_QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+
+def _numpy():
+    import numpy as np
+    return np
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic buckets (bucket k holds magnitudes in
+    (gamma**(k-1), gamma**k]), so any reported quantile is within
+    RELATIVE_ACCURACY of a true sample at that rank. The bucket count grows
+    only with the logarithm of the value range, about 140,000 buckets even
+    for the full float64 range, regardless of how many values are added.
+    """
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}  # bucket -> count
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add_array(self, values):
+        np = _numpy()
+        self.count += len(values)
+        self.zeros += int(np.count_nonzero(values == 0))
+        for store, magnitudes in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            if not len(magnitudes):
+                continue
+            keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+            keys, counts = np.unique(keys, return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                store[key] = store.get(key, 0) + count
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Approximate ``q``-quantile (0 <= q <= 1), None when empty."""
+        if not self.count:
+            return None
+        rank = round(q * (self.count - 1))
+        seen = 0
+        # Most negative first: largest negative magnitudes come first
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+    def _value(self, key):
+        # Midpoint of the bucket in relative terms
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+
+class Summary:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.sketch = QuantileSketch()
+
+    def add(self, value):
+        self.add_array(_numpy().asarray([value], dtype=float))
+
+    def add_array(self, values):
+        """Fold a chunk of values in. Non-finite values are skipped."""
+        np = _numpy()
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        n = len(values)
+        if not n:
+            return self
+        total = float(values.sum())
+        mean = total / n
+        m2 = float(np.square(values - mean).sum())
+        self._combine(n, total, mean, m2, float(values.min()), float(values.max()))
+        self.sketch.add_array(values)
+        return self
+
+    def merge(self, other):
+        """Fold in the summary of another, disjoint part of the data."""
+        if other.count:
+            self._combine(other.count, other.total, other.mean, other.m2, other.minimum, other.maximum)
+            self.sketch.merge(other.sketch)
+        return self
+
+    def _combine(self, n, total, mean, m2, minimum, maximum):
+        count = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / count
+        self.m2 += m2 + delta * delta * self.count * n / count
+        self.count = count
+        self.total += total
+        self.minimum = min(self.minimum, minimum)
+        self.maximum = max(self.maximum, maximum)
+
+    def variance(self, ddof=1):
+        """Sample variance by default; ``ddof=0`` for the population."""
+        if self.count <= ddof:
+            return None
+        return self.m2 / (self.count - ddof)
+
+    def stddev(self, ddof=1):
+        variance = self.variance(ddof)
+        return None if variance is None else math.sqrt(variance)
+
+    def quantile(self, q):
+        value = self.sketch.quantile(q)
+        # Bucket midpoints can fall just outside the observed range
+        return None if value is None else min(max(value, self.minimum), self.maximum)
+
+    def as_dict(self):
+        empty = not self.count
+        result = {
+            "count": self.count,
+            "sum": self.total,
+            "mean": None if empty else self.mean,
+            "variance": self.variance(),
+            "stddev": self.stddev(),
+            "min": None if empty else self.minimum,
+            "max": None if empty else self.maximum,
+        }
+        for q in REPORT_QUANTILES:
+            result[f"p{q * 100:g}"] = self.quantile(q)
+        return result
+
+
+def _parse_cells(cells):
+    np = _numpy()
+    try:
+        # NumPy parses the whole chunk at once when every cell is numeric
+        return np.array(cells, dtype=np.float64)
+    except ValueError:
+        return np.array([_parse_cell(cell) for cell in cells], dtype=np.float64)
+
+
+def _parse_cell(cell):
+    try:
+        return float(cell)
+    except ValueError:
+        return float("nan")
+
+
+def _parse_chunk(data, index=None):
+    """Values in a chunk of whole lines; ``index`` selects a CSV column."""
+    if index is None:
+        return _parse_cells(data.split())
+    lines = data.splitlines()
+    if b'"' in data:
+        rows = csv.reader(line.decode("utf-8") for line in lines)
+    else:
+        rows = (line.split(b",") for line in lines if line)
+    return _parse_cells([row[index] if index < len(row) else "" for row in rows])
+
+
+def _column_index(header, column):
+    if isinstance(header, bytes):
+        header = header.decode("utf-8")
+    return next(csv.reader([header])).index(column)
+
+
+def _summarize_range(path, start, stop, index, chunk_bytes):
+    summary = Summary()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        position = start
+        while position < stop:
+            end = min(position + chunk_bytes, stop)
+            if end < stop:
+                # Extend to the end of the line; ranges themselves end on one
+                newline = data.find(b"\n", end, stop)
+                end = stop if newline < 0 else newline + 1
+            summary.add_array(_parse_chunk(data[position:end], index))
+            position = end
+    return summary
+
+
+def _line_ranges(path, start, size, parts):
+    """Split [start, size) into ``parts`` ranges that begin on line starts."""
+    bounds = [start]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for i in range(1, parts):
+            target = max(start + (size - start) * i // parts, bounds[-1])
+            newline = data.find(b"\n", target)
+            bounds.append(size if newline < 0 else newline + 1)
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def summarize_file(path, column=None, workers=1, chunk_bytes=CHUNK_BYTES):
+    """One-pass Summary of a file, reading ``chunk_bytes`` at a time.
+
+    With ``column`` the file is a CSV with a header row. With
+    ``workers > 1`` byte ranges are summarized in a process pool and merged.
+    """
+    size = os.path.getsize(path)
+    if not size:
+        return Summary()
+    start, index = 0, None
+    if column is not None:
+        with open(path, "rb") as f:
+            header = f.readline()
+        start, index = len(header), _column_index(header, column)
+
+    if workers <= 1:
+        return _summarize_range(path, start, size, index, chunk_bytes)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    ranges = _line_ranges(path, start, size, workers)
+    summary = Summary()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_summarize_range, path, a, b, index, chunk_bytes) for a, b in ranges]
+        for future in futures:
+            summary.merge(future.result())
+    return summary
+
+
+def summarize_stream(stream, column=None, chunk_bytes=CHUNK_BYTES):
+    """One-pass Summary of a binary stream such as ``sys.stdin.buffer``."""
+    summary = Summary()
+    index = None
+    if column is not None:
+        index = _column_index(stream.readline(), column)
+    remainder = b""
+    while True:
+        block = stream.read(chunk_bytes)
+        if not block:
+            break
+        block = remainder + block
+        cut = block.rfind(b"\n") + 1
+        remainder = block[cut:]
+        summary.add_array(_parse_chunk(block[:cut], index))
+    if remainder:
+        summary.add_array(_parse_chunk(remainder, index))
+    return summary
+
+
+def summarize_text(text):
+    """Summary of numbers separated by commas, semicolons or whitespace."""
+    tokens = text.replace(",", " ").replace(";", " ").split()
+    return Summary().add_array(_parse_cells(tokens))
+
+
+def format_summary(summary):
+    lines = []
+    for name, value in summary.as_dict().items():
+        lines.append(f"{name}: {'n/a' if value is None else f'{value:.10g}'}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a column of numbers in one pass.")
+    parser.add_argument("input", nargs="?", default="-", help="data file, '-' for stdin")
+    parser.add_argument("--column", help="CSV column name (the first line is a header)")
+    parser.add_argument("--workers", type=int, default=1, help="process pool size for files")
+    parser.add_argument("--chunk-bytes", type=int, default=CHUNK_BYTES)
+    args = parser.parse_args(argv)
+
+    if args.input == "-":
+        summary = summarize_stream(sys.stdin.buffer, args.column, args.chunk_bytes)
+    else:
+        summary = summarize_file(args.input, args.column, args.workers, args.chunk_bytes)
+    print(format_summary(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
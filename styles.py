@@ -0,0 +1,106 @@
+"""Shared fonts and button styles for the calculator widgets.
+
+A StyleRegistry creates each CTkFont and each button color style once and
+hands out the shared instances. Widgets register which palette keys they
+use, so switching theme reconfigures the existing widgets in place rather
+than rebuilding them.
+"""
+import customtkinter as ctk
+
+THEMES = {
+    "dark": {
+        "bg_primary": "#0a0a0a",
+        "bg_secondary": "#1a1a1a",
+        "bg_tertiary": "#2a2a2a",
+        "accent_blue": "#00d4ff",
+        "accent_purple": "#8b5cf6",
+        "accent_green": "#10b981",
+        "accent_orange": "#f59e0b",
+        "accent_red": "#ef4444",
+        "hover_purple": "#a855f7",
+        "hover_orange": "#fbbf24",
+        "hover_red": "#f87171",
+        "text_primary": "#ffffff",
+        "text_secondary": "#a1a1aa"
+    },
+    "light": {
+        "bg_primary": "#f4f4f5",
+        "bg_secondary": "#ffffff",
+        "bg_tertiary": "#e4e4e7",
+        "accent_blue": "#0284c7",
+        "accent_purple": "#7c3aed",
+        "accent_green": "#059669",
+        "accent_orange": "#d97706",
+        "accent_red": "#dc2626",
+        "hover_purple": "#8b5cf6",
+        "hover_orange": "#f59e0b",
+        "hover_red": "#ef4444",
+        "text_primary": "#18181b",
+        "text_secondary": "#52525b"
+    }
+}
+
+# Button style -> (fg palette key, hover palette key)
+BUTTON_STYLES = {
+    "number": ("bg_tertiary", "accent_blue"),
+    "operator": ("accent_orange", "hover_orange"),
+    "clear": ("accent_red", "hover_red"),
+    "function": ("accent_purple", "hover_purple")
+}
+
+
+class StyleRegistry:
+    def __init__(self, theme="dark"):
+        self.theme = theme
+        # Mutated in place on theme switch so existing references stay valid
+        self.colors = dict(THEMES[theme])
+        self._fonts = {}
+        self._button_styles = {}
+        self._widgets = []  # (widget, {option: palette key})
+
+    def font(self, size, weight="normal", family=None):
+        """Shared font; ``family`` None is the theme's default family."""
+        key = (family, size, weight)
+        font = self._fonts.get(key)
+        if font is None:
+            options = {} if family is None else {"family": family}
+            font = self._fonts[key] = ctk.CTkFont(size=size, weight=weight, **options)
+        return font
+
+    def button_style(self, style):
+        colors = self._button_styles.get(style)
+        if colors is None:
+            fg, hover = BUTTON_STYLES[style]
+            colors = self._button_styles[style] = {"fg": self.colors[fg], "hover": self.colors[hover]}
+        return colors
+
+    def register(self, widget, **options):
+        """Remember that ``widget`` takes ``option=palette key`` colors, e.g.
+        ``register(frame, fg_color="bg_secondary")``. Returns the widget."""
+        self._widgets.append((widget, options))
+        return widget
+
+    def register_button(self, widget, style):
+        fg, hover = BUTTON_STYLES[style]
+        return self.register(widget, fg_color=fg, hover_color=hover)
+
+    def set_theme(self, theme):
+        self.theme = theme
+        self.colors.clear()
+        self.colors.update(THEMES[theme])
+        self._button_styles.clear()
+
+        alive = []
+        for widget, options in self._widgets:
+            if not widget.winfo_exists():
+                continue
+            widget.configure(**{option: self.colors[key] for option, key in options.items()})
+            alive.append((widget, options))
+        self._widgets = alive
+
+    def stats(self):
+        return {
+            "fonts": len(self._fonts),
+            "button_styles": len(self._button_styles),
+            "themed_widgets": len(self._widgets)
+        }
@@ -0,0 +1,152 @@
+"""Table-driven unit conversion.
+
+Every unit is stored as ``(scale, offset)`` relative to its category's base
+unit (``base = value * scale + offset``), which covers affine units such as
+temperature as well as plain factors. Coefficients for every unit pair are
+precomputed once at import, so a conversion is one multiply-add.
+
+``convert_array`` and ``convert_csv`` apply the same coefficients to a whole
+NumPy array or CSV column in one vectorized call.
+"""
+import csv
+
+CATEGORIES = {
+    "Length": {  # meter
+        "meter": (1.0, 0.0),
+        "kilometer": (1000.0, 0.0),
+        "centimeter": (0.01, 0.0),
+        "millimeter": (0.001, 0.0),
+        "mile": (1609.344, 0.0),
+        "yard": (0.9144, 0.0),
+        "foot": (0.3048, 0.0),
+        "inch": (0.0254, 0.0)
+    },
+    "Weight": {  # kilogram
+        "kilogram": (1.0, 0.0),
+        "gram": (0.001, 0.0),
+        "milligram": (1e-6, 0.0),
+        "tonne": (1000.0, 0.0),
+        "pound": (0.45359237, 0.0),
+        "ounce": (0.028349523125, 0.0),
+        "stone": (6.35029318, 0.0)
+    },
+    "Temperature": {  # kelvin
+        "celsius": (1.0, 273.15),
+        "fahrenheit": (5 / 9, 273.15 - 32 * 5 / 9),
+        "kelvin": (1.0, 0.0),
+        "rankine": (5 / 9, 0.0)
+    },
+    "Volume": {  # liter
+        "liter": (1.0, 0.0),
+        "milliliter": (0.001, 0.0),
+        "cubic meter": (1000.0, 0.0),
+        "gallon": (3.785411784, 0.0),
+        "quart": (0.946352946, 0.0),
+        "pint": (0.473176473, 0.0),
+        "cup": (0.2365882365, 0.0),
+        "fluid ounce": (0.0295735295625, 0.0)
+    }
+}
+
+CSV_CHUNK_ROWS = 100000
+
+# (category, from, to) -> (a, b) with result = value * a + b
+_PAIRS = {}
+# unit -> category, for callers that do not pass one
+_UNIT_CATEGORY = {}
+
+for _category, _units in CATEGORIES.items():
+    for _from, (_s1, _o1) in _units.items():
+        _UNIT_CATEGORY.setdefault(_from, _category)
+        for _to, (_s2, _o2) in _units.items():
+            _PAIRS[(_category, _from, _to)] = (_s1 / _s2, (_o1 - _o2) / _s2)
+
+
+def categories():
+    return list(CATEGORIES)
+
+
+def units(category):
+    return list(CATEGORIES[category])
+
+
+def coefficients(from_unit, to_unit, category=None):
+    """Return (a, b) such that ``to = from * a + b``.
+
+    Raises KeyError when the units are unknown or belong to different
+    categories.
+    """
+    if category is None:
+        category = _UNIT_CATEGORY[from_unit]
+    return _PAIRS[(category, from_unit, to_unit)]
+
+
+def convert(value, from_unit, to_unit, category=None):
+    a, b = coefficients(from_unit, to_unit, category)
+    return value * a + b
+
+
+def convert_array(values, from_unit, to_unit, category=None):
+    """Convert a NumPy array (or anything array-like) in one vectorized
+    multiply-add. Returns a float64 ndarray."""
+    import numpy as np
+
+    a, b = coefficients(from_unit, to_unit, category)
+    result = np.asarray(values, dtype=np.float64) * a
+    if b:
+        result += b
+    return result
+
+
+def convert_csv(src_path, dst_path, column, from_unit, to_unit, category=None,
+                chunk_rows=CSV_CHUNK_ROWS):
+    """Copy a CSV file, adding a converted copy of ``column``.
+
+    The file is streamed in chunks of ``chunk_rows`` rows and each chunk's
+    column is converted with one vectorized call. Cells that are not numbers
+    are left empty in the new column. Returns the number of data rows.
+    """
+    import numpy as np
+
+    a, b = coefficients(from_unit, to_unit, category)
+    rows = 0
+    with open(src_path, newline="", encoding="utf-8") as src, \
+            open(dst_path, "w", newline="", encoding="utf-8") as dst:
+        reader = csv.reader(src)
+        writer = csv.writer(dst)
+        header = next(reader)
+        index = header.index(column)
+        writer.writerow(header + [f"{column} ({to_unit})"])
+
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                _write_chunk(writer, chunk, index, a, b, np)
+                rows += len(chunk)
+                chunk = []
+        if chunk:
+            _write_chunk(writer, chunk, index, a, b, np)
+            rows += len(chunk)
+    return rows
+
+
+def _parse_cell(cell):
+    try:
+        return float(cell)
+    except ValueError:
+        return float("nan")
+
+
+def _write_chunk(writer, chunk, index, a, b, np):
+    cells = [row[index] if index < len(row) else "" for row in chunk]
+    try:
+        # NumPy parses the whole column at once when every cell is numeric
+        values = np.array(cells, dtype=np.float64)
+    except ValueError:
+        values = np.array([_parse_cell(cell) for cell in cells], dtype=np.float64)
+    converted = values * a + b
+    writer.writerows(
+        row + ["" if value != value else value]
+        for row, value in zip(chunk, converted.tolist())
+    )
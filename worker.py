@@ -0,0 +1,208 @@
+"""Off-UI-thread evaluation.
+
+Heavy work (``9**9**9``, ``math.factorial(100000)``) runs in a separate
+worker process so the Tk mainloop never blocks. Results are delivered back
+on the Tk thread by polling through the ``after`` callable passed in (the
+window's ``after``). A job that exceeds its time budget, or that is
+cancelled because the user pressed another key, is stopped by terminating
+the worker process; a fresh one is started for the next job. Integer
+results over ``precision.LAZY_DIGITS`` digits come back as a
+``precision.LazyResult`` summary, as in ``CalculatorCore``; the ``full_digits`` task renders all their digits on request.
+"""
+import itertools
+import math
+import multiprocessing
+import sys
+import time
+
+EVALUATION_TIMEOUT = 5.0  # seconds
+MAX_RESULT_DIGITS = 10000
+MAX_RESULT_BITS = 1 << 28  # Larger ints are not even sent back
+FULL_DIGITS_TIMEOUT = 120.0  # seconds
+POLL_INTERVAL_MS = 15
+
+# Error kinds handed to on_error
+ZERO_DIVISION = "zero"
+TIMEOUT = "timeout"
+TOO_LARGE = "too_large"
+ERROR = "error"
+
+
+class ResultTooLarge(ArithmeticError):
+    pass
+
+
+def _evaluate(expression, angle_mode, precision_mode="float", digits=50):
+    import precision
+    return precision.evaluate(expression, angle_mode, precision_mode, digits)
+
+
+def _evaluate_integer(expression, base, bits, signed):
+    import programmer
+    value = programmer.evaluate(expression, base, bits, signed)
+    return programmer.format_all(value, bits, signed)
+
+
+def _reciprocal(value):
+    return 1 / value
+
+
+def _full_digits(value):
+    import precision
+    return precision.full_digits(value)
+
+
+def _convert_units(value, from_unit, to_unit, category=None):
+    import units
+    try:
+        return units.convert(value, from_unit, to_unit, category)
+    except KeyError:
+        return None  # Pair not available, same as CalculatorCore
+
+
+def _evaluate_worksheet(expression, angle_mode, definitions):
+    import engine
+    from worksheet import Worksheet
+    # definitions carries only what the expression needs, values inlined
+    sheet = Worksheet(angle_mode, max_bits=None)  # The worker has its own budget
+    sheet.load(definitions)
+    value = sheet.evaluate(expression)
+    if isinstance(value, float) and math.isinf(value):
+        raise ZeroDivisionError
+    return engine.format_result(value)
+
+
+def _calculus(operation, *args):
+    import calculus
+    return getattr(calculus, operation)(*args)
+
+
+TASKS = {
+    "evaluate": _evaluate,
+    "evaluate_integer": _evaluate_integer,
+    "factorial": math.factorial,
+    "reciprocal": _reciprocal,
+    "convert_units": _convert_units,
+    "full_digits": _full_digits,
+    "calculus": _calculus,
+    "evaluate_worksheet": _evaluate_worksheet,
+}
+
+
+def _render(value, max_digits):
+    # Big ints are turned into text here so that cost stays in the worker
+    if isinstance(value, int) and not isinstance(value, bool):
+        if value.bit_length() > MAX_RESULT_BITS:
+            raise ResultTooLarge
+        import precision
+        # Summarized past LAZY_DIGITS like CalculatorCore; render's estimate
+        # can be one digit short, and str() stops at max_digits
+        value = precision.render(value, min(precision.LAZY_DIGITS, max_digits - 1))
+        return value if isinstance(value, precision.LazyResult) else str(value)
+    return value
+
+
+def _serve(conn, max_digits):
+    if hasattr(sys, "set_int_max_str_digits"):
+        sys.set_int_max_str_digits(max(max_digits, 640))
+    while True:
+        try:
+            job_id, task, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            reply = (job_id, None, _render(TASKS[task](*args), max_digits))
+        except ZeroDivisionError:
+            reply = (job_id, ZERO_DIVISION, None)
+        except ResultTooLarge:
+            reply = (job_id, TOO_LARGE, None)
+        except Exception:
+            reply = (job_id, ERROR, None)
+        conn.send(reply)
+
+
+class EvaluationWorker:
+    def __init__(self, after, timeout=EVALUATION_TIMEOUT, max_digits=MAX_RESULT_DIGITS):
+        self.after = after
+        self.timeout = timeout
+        self.max_digits = max_digits
+        self._process = None
+        self._conn = None
+        self._job = None  # (job_id, deadline, on_result, on_error)
+        self._ids = itertools.count()
+
+    @property
+    def busy(self):
+        return self._job is not None
+
+    def submit(self, task, args, on_result, on_error, timeout=None):
+        """Run TASKS[task](*args) in the worker; exactly one of the callbacks
+        is later called on the Tk thread, unless the job is cancelled."""
+        self.cancel()
+        self._ensure_process()
+        job_id = next(self._ids)
+        deadline = time.monotonic() + (timeout or self.timeout)
+        self._job = (job_id, deadline, on_result, on_error)
+        self._conn.send((job_id, task, args))
+        self.after(POLL_INTERVAL_MS, self._poll)
+
+    def cancel(self):
+        """Stop the job in flight, if any. Its callbacks are never called."""
+        if self._job is None:
+            return
+        self._job = None
+        self._stop_process()
+
+    def close(self):
+        self._job = None
+        self._stop_process()
+
+    def _poll(self):
+        if self._job is None:
+            return
+        job_id, deadline, on_result, on_error = self._job
+
+        try:
+            ready = self._conn.poll()
+            if ready:
+                reply_id, error, value = self._conn.recv()
+        except (EOFError, OSError):
+            # The process died (e.g. killed for memory); the next job starts a new one
+            self._job = None
+            self._stop_process()
+            on_error(ERROR)
+            return
+        if ready:
+            if reply_id != job_id:
+                self.after(POLL_INTERVAL_MS, self._poll)
+                return
+            self._job = None
+            if error is None:
+                on_result(value)
+            else:
+                on_error(error)
+        elif time.monotonic() > deadline:
+            self.cancel()
+            on_error(TIMEOUT)
+        else:
+            self.after(POLL_INTERVAL_MS, self._poll)
+
+    def _ensure_process(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        parent_conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(child_conn, self.max_digits), daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+    def _stop_process(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(timeout=1)
+            self._process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,394 @@
+"""Named variables, user functions and dependency-tracked recomputation.
+
+A worksheet is a set of definitions, one per line::
+
+    rate = 0.07
+    f(x) = x**2 + rate
+    price = f(3) * 100
+
+Each definition is parsed and compiled once by the engine (with the names
+it references bound as variables or callables) and re-compiled only when
+its own text changes. The sheet keeps, for every name, the set of
+definitions that reference it. When a definition changes, the affected
+set is found by walking those reverse edges from it, ordered
+topologically by a depth-first search, and only those definitions are
+re-evaluated; the rest of the sheet is never touched. Names may be used
+before they are defined, and cycles are reported as errors on every
+definition in the cycle.
+
+Values live in one namespace dict shared by all definitions, and user
+functions are real Python functions whose globals are that dict, so a
+function always sees the current values of the variables it uses.
+
+The sheet is evaluated on the UI thread, so like the live preview it
+refuses integer work that could stall it: ``**``, ``<<``, ``*`` and
+``factorial`` are compiled into checked calls, and a result over
+``max_bits`` fails with "Result too large" before it is computed.
+"""
+import ast
+import math
+import operator
+import re
+
+import engine
+
+_DEFINITION = re.compile(r"^\s*([A-Za-z_]\w*)\s*(?:\(([^()]*)\))?\s*=(?!=)(.*)$")
+MAX_VALUE_BITS = 1 << 17  # factorial(10000) fits, 9**9**9 does not
+# Checked stand-ins for the operators that can build huge integers
+_GUARDED = {ast.Pow: "_power", ast.LShift: "_lshift", ast.Mult: "_multiply"}
+RESERVED = (frozenset(engine.FUNCTIONS) | frozenset(engine.CONSTANTS) | {"math"}
+            | frozenset(_GUARDED.values()))
+
+
+class WorksheetError(ValueError):
+    pass
+
+
+class ResultTooLarge(ArithmeticError):
+    pass
+
+
+class _Cell:
+    __slots__ = ("name", "params", "expression", "code", "references", "value", "error")
+
+    def __init__(self, name, params, expression):
+        self.name = name
+        self.params = params  # None for a variable, a tuple for a function
+        self.expression = expression
+        self.code = None
+        self.references = frozenset()
+        self.value = None
+        self.error = None
+
+    @property
+    def source(self):
+        if self.params is None:
+            return f"{self.name} = {self.expression}"
+        return f"{self.name}({', '.join(self.params)}) = {self.expression}"
+
+
+def parse_definition(line):
+    """``name = expr`` or ``name(a, b) = expr`` -> (name, params, expr)."""
+    match = _DEFINITION.match(line)
+    if not match:
+        raise WorksheetError(f"Not a definition: {line.strip()}")
+    name, params, expression = match.group(1), match.group(2), match.group(3).strip()
+    if name in RESERVED:
+        raise WorksheetError(f"{name} is a built-in name")
+    if not expression:
+        raise WorksheetError(f"Missing expression for {name}")
+    if params is not None:
+        params = tuple(p.strip() for p in params.split(",") if p.strip())
+        if not all(p.isidentifier() and p not in RESERVED for p in params):
+            raise WorksheetError(f"Invalid parameters for {name}")
+    return name, params, expression
+
+
+def _names(expression):
+    """(called names, other names) referenced by ``expression``."""
+    try:
+        tree = ast.parse(engine.balance_parentheses(expression), mode="eval")
+    except SyntaxError as exc:
+        raise engine.ExpressionError(str(exc)) from None
+    called, names = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            called.add(node.func.id)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+    names -= called
+    return called - RESERVED, names - RESERVED
+
+
+def _constant(node, types):
+    return isinstance(node, ast.Constant) and isinstance(node.value, types)
+
+
+def _checked(node):
+    """True for a BinOp that could build a huge integer."""
+    name = _GUARDED.get(type(node.op))
+    if name is None:
+        return False
+    # Float operands cannot, and a product grows only by the size of a
+    # literal factor
+    if _constant(node.left, float) or _constant(node.right, float):
+        return False
+    return name != "_multiply" or not (_constant(node.left, int) or _constant(node.right, int))
+
+
+class _CostGuard(ast.NodeTransformer):
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if not _checked(node):
+            return node
+        call = ast.Call(func=ast.Name(id=_GUARDED[type(node.op)], ctx=ast.Load()),
+                        args=[node.left, node.right], keywords=[])
+        return ast.copy_location(call, node)
+
+
+def _guard(tree):
+    # Most definitions have nothing to check; skip rebuilding those
+    if any(isinstance(node, ast.BinOp) and _checked(node) for node in ast.walk(tree)):
+        tree = ast.fix_missing_locations(_CostGuard().visit(tree))
+    return tree
+
+
+def _guards(max_bits):
+    """Namespace entries for _CostGuard's calls and a checked factorial."""
+    def check(bits):
+        if bits > max_bits:
+            raise ResultTooLarge
+
+    def power(a, b):
+        if isinstance(a, int) and isinstance(b, int) and b > 0:
+            check(a.bit_length() * b)
+        return a ** b
+
+    def lshift(a, b):
+        if isinstance(a, int) and isinstance(b, int):
+            check(a.bit_length() + b)
+        return a << b
+
+    def multiply(a, b):
+        if isinstance(a, int) and isinstance(b, int):
+            check(a.bit_length() + b.bit_length())
+        return a * b
+
+    def factorial(n):
+        if isinstance(n, int) and n > 1:
+            check(math.lgamma(n + 1) / math.log(2))
+        return engine.FUNCTIONS["factorial"](n)
+
+    return {"_power": power, "_lshift": lshift, "_multiply": multiply, "factorial": factorial}
+
+
+_UNCHECKED = {"_power": operator.pow, "_lshift": operator.lshift, "_multiply": operator.mul}
+
+
+class Worksheet:
+    def __init__(self, angle_mode="DEG", max_bits=MAX_VALUE_BITS):
+        """``max_bits`` limits integer results (None: no limit, for a
+        worker process that has its own budget)."""
+        self.angle_mode = angle_mode
+        self.max_bits = max_bits
+        self.cells = {}  # name -> _Cell, in definition order
+        self.dependents = {}  # name -> names of cells that reference it
+        self.namespace = self._new_namespace()
+        self.evaluations = 0
+
+    # Editing
+    def define(self, line):
+        """Add or replace the definition on ``line``. Returns the names that
+        were recomputed, in the order they were evaluated."""
+        name, params, expression = parse_definition(line)
+        cell = self.cells.get(name)
+        if cell is not None and cell.params == params and cell.expression == expression:
+            return []
+        if cell is None:
+            cell = self.cells[name] = _Cell(name, params, expression)
+        else:
+            cell.params, cell.expression = params, expression
+        self._compile(cell)
+        return self._recompute(name)
+
+    def remove(self, name):
+        """Delete ``name``; its dependents are recomputed (and now fail)."""
+        cell = self.cells.pop(name, None)
+        if cell is None:
+            return []
+        self._link(cell, frozenset())
+        self.namespace.pop(name, None)
+        return [n for n in self._recompute(name) if n != name]
+
+    def load(self, text):
+        """Replace the sheet with the definitions in ``text``, one per line
+        (blank lines and ``#`` comments are skipped). Evaluates everything
+        once. Returns {line number: error} for lines that are not definitions."""
+        self.cells.clear()
+        self.dependents.clear()
+        self.namespace = self._new_namespace()
+        problems = {}
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            try:
+                name, params, expression = parse_definition(line)
+            except WorksheetError as exc:
+                problems[number] = str(exc)
+                continue
+            cell = self.cells[name] = _Cell(name, params, expression)
+            self._compile(cell)
+        for name in self._order(list(self.cells)):
+            self._evaluate(self.cells[name])
+        return problems
+
+    def set_angle_mode(self, angle_mode):
+        if angle_mode != self.angle_mode:
+            # Trig calls are compiled with the angle mode: rebuild everything
+            self.angle_mode = angle_mode
+            self.load(self.text())
+
+    # Reading
+    def value(self, name):
+        """Value of variable ``name``; raises WorksheetError if it failed."""
+        cell = self.cells.get(name)
+        if cell is None:
+            raise WorksheetError(f"Undefined: {name}")
+        if cell.error is not None:
+            raise WorksheetError(cell.error)
+        return cell.value
+
+    def text(self):
+        return "\n".join(cell.source for cell in self.cells.values())
+
+    def references(self, expression):
+        """True when ``expression`` uses a name defined on this sheet."""
+        try:
+            called, names = _names(expression)
+        except engine.ExpressionError:
+            return False
+        return not (called | names).isdisjoint(self.cells)
+
+    def evaluate(self, expression):
+        """Evaluate a one-off expression against the sheet's names."""
+        called, names = _names(expression)
+        tree = _guard(engine.parse(expression, self.angle_mode, names, called))
+        self.evaluations += 1
+        try:
+            return eval(compile(tree, "<expression>", "eval"), self.namespace)
+        except NameError as exc:
+            raise WorksheetError(f"Undefined: {exc.name}") from None
+
+    def definitions_for(self, expression):
+        """The smallest standalone sheet text that can evaluate ``expression``:
+        referenced variables as their current values, referenced functions
+        with their source (and, recursively, what they use). Values with no
+        literal form (inf, nan, a function alias like ``g = f``) are sent as
+        their source too. For evaluating in another process."""
+        lines, seen = [], set()
+        pending = list(set().union(*_names(expression)))
+        while pending:
+            name = pending.pop()
+            cell = self.cells.get(name)
+            if name in seen or cell is None:
+                continue
+            seen.add(name)
+            literal = _literal(cell.value) if cell.params is None else None
+            if cell.params is None and cell.error is not None:
+                continue
+            if literal is not None:
+                lines.append(f"{name} = {literal}")
+            else:
+                lines.append(cell.source)
+                pending.extend(cell.references)
+        return "\n".join(lines)
+
+    # Internals
+    def _new_namespace(self):
+        namespace = dict(engine._NAMESPACE)
+        namespace.update(_UNCHECKED if self.max_bits is None else _guards(self.max_bits))
+        return namespace
+
+    def _compile(self, cell):
+        try:
+            called, names = _names(cell.expression)
+            params = cell.params or ()
+            names -= set(params)
+            tree = engine.parse(cell.expression, self.angle_mode, names | set(params), called)
+            tree = _guard(tree)
+            if cell.params is not None:
+                arguments = ast.arguments(
+                    posonlyargs=[], args=[ast.arg(arg=p) for p in params],
+                    kwonlyargs=[], kw_defaults=[], defaults=[]
+                )
+                tree = ast.Expression(body=ast.Lambda(args=arguments, body=tree.body))
+            cell.code = compile(ast.fix_missing_locations(tree), "<worksheet>", "eval")
+            cell.error = None
+            references = frozenset(called | names)
+        except (engine.ExpressionError, SyntaxError) as exc:
+            cell.code = None
+            cell.error = f"Syntax error: {exc}"
+            references = frozenset()
+        self._link(cell, references)
+
+    def _link(self, cell, references):
+        for name in cell.references - references:
+            dependents = self.dependents.get(name)
+            if dependents is not None:
+                dependents.discard(cell.name)
+        for name in references - cell.references:
+            self.dependents.setdefault(name, set()).add(cell.name)
+        cell.references = references
+
+    def _recompute(self, name):
+        order = self._order([name])
+        for affected in order:
+            cell = self.cells.get(affected)
+            if cell is not None:
+                self._evaluate(cell)
+        return order
+
+    def _order(self, roots):
+        """``roots`` and everything downstream of them, dependencies first.
+        Cells on a cycle are marked as errors and left out."""
+        order, state = [], {}  # state: 1 = on the DFS path, 2 = done
+        cyclic = set()
+        for root in roots:
+            if root in state:
+                continue
+            # Iterative DFS over reverse edges, post-order
+            stack = [(root, iter(self.dependents.get(root, ())))]
+            state[root] = 1
+            while stack:
+                name, children = stack[-1]
+                for child in children:
+                    if state.get(child) == 1:
+                        cyclic.update(n for n, _ in stack[[n for n, _ in stack].index(child):])
+                    elif child not in state:
+                        state[child] = 1
+                        stack.append((child, iter(self.dependents.get(child, ()))))
+                        break
+                else:
+                    stack.pop()
+                    state[name] = 2
+                    order.append(name)
+        order.reverse()
+        for name in cyclic:
+            cell = self.cells.get(name)
+            if cell is not None:
+                cell.error = "Circular reference"
+                cell.value = None
+                self.namespace.pop(name, None)
+        return [name for name in order if name not in cyclic]
+
+    def _evaluate(self, cell):
+        if cell.code is None:
+            self.namespace.pop(cell.name, None)
+            return
+        self.evaluations += 1
+        try:
+            value = eval(cell.code, self.namespace)
+        except NameError as exc:
+            cell.value, cell.error = None, f"Undefined: {exc.name}"
+        except ZeroDivisionError:
+            cell.value, cell.error = None, "Cannot divide by zero"
+        except ResultTooLarge:
+            cell.value, cell.error = None, "Result too large"
+        except (ArithmeticError, ValueError, TypeError, RecursionError) as exc:
+            cell.value, cell.error = None, f"Error: {exc}"
+        else:
+            cell.value, cell.error = value, None
+            self.namespace[cell.name] = value
+            return
+        self.namespace.pop(cell.name, None)
+
+
+def _literal(value):
+    """Source text that evaluates to ``value``, or None if there is none."""
+    # Hex keeps big ints exact and is not subject to the 4300-digit
+    # int/str conversion limit
+    if isinstance(value, int) and not isinstance(value, bool):
+        return hex(value)
+    if isinstance(value, float) and math.isfinite(value):
+        return repr(value)
+    return None